@@ -0,0 +1,77 @@
+'''
+Benchmarks for coffeepot.
+
+Benchmarks are registered with the benchmark() decorator on a function that
+builds whatever is being measured.  The runner times that function (the
+construction cost), times run() on what it returned (the render cost) and
+records the peak memory of doing both:
+
+    @benchmark('many_scripts')
+    def many_scripts():
+        g = Generator()
+        ...
+        return g
+
+Run the suite, save the results and compare them with an earlier run:
+
+    python -m coffeepot.benchmarks run -o after.json
+    python -m coffeepot.benchmarks compare before.json after.json
+'''
+try:
+    from collections import OrderedDict
+except ImportError:
+    OrderedDict = dict
+
+# Modules that register benchmarks when they are imported
+SUITES = [
+    'coffeepot.benchmarks.shapes',
+    'coffeepot.benchmarks.encoder',
+    'coffeepot.benchmarks.concurrency',
+    'coffeepot.benchmarks.ir',
+    'coffeepot.benchmarks.depth',
+    'coffeepot.benchmarks.arrays',
+    'coffeepot.benchmarks.flat',
+    'coffeepot.benchmarks.methods',
+    'coffeepot.benchmarks.cold',
+]
+
+BENCHMARKS = OrderedDict()
+
+
+def render_cold(tree):
+    '''
+    Renders a tree with every cached string thrown away first.
+    '''
+    tree.clear_cache()
+    return tree.render()
+
+
+class Benchmark(object):
+
+    def __init__(self, name, build, run, description=None):
+        self.name = name
+        self.build = build
+        self.run = run
+        self.description = description
+
+    def __repr__(self):
+        return '<Benchmark %s>' % self.name
+
+
+def benchmark(name, run=render_cold):
+    '''
+    Registers the decorated function as the build step of a benchmark.
+    '''
+    def decorator(build):
+        BENCHMARKS[name] = Benchmark(name, build, run, (build.__doc__ or '').strip())
+        return build
+    return decorator
+
+
+def load():
+    '''
+    Imports every suite and returns the registered benchmarks.
+    '''
+    for module in SUITES:
+        __import__(module)
+    return BENCHMARKS
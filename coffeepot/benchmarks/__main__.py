@@ -0,0 +1,3 @@
+from coffeepot.benchmarks.runner import main
+
+main()
@@ -0,0 +1,40 @@
+'''
+Encoding a million numbers as typed arrays against a plain list.  The
+NumPy benchmarks are only there when NumPy is installed.
+'''
+import array
+
+from coffeepot.benchmarks import benchmark
+from coffeepot.core.encoder import default_encoder
+
+SIZE = 10 ** 6
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@benchmark('float64_list', run=default_encoder.encode)
+def float64_list():
+    '''A list of floats, the slow path'''
+    return [i * 0.5 for i in range(SIZE)]
+
+
+@benchmark('float64_array', run=default_encoder.encode)
+def float64_array():
+    '''array.array('d') as a Float64Array'''
+    return array.array('d', [i * 0.5 for i in range(SIZE)])
+
+
+@benchmark('int32_memoryview', run=default_encoder.encode)
+def int32_memoryview():
+    '''A memoryview of array.array('i') as an Int32Array'''
+    return memoryview(array.array('i', range(SIZE)))
+
+
+if numpy is not None:
+    @benchmark('float64_numpy', run=default_encoder.encode)
+    def float64_numpy():
+        '''A NumPy float64 array as a Float64Array'''
+        return numpy.arange(SIZE, dtype='f8') * 0.5
@@ -0,0 +1,39 @@
+'''
+Building a tree and rendering it once, the way a view uses coffeepot.  The
+other suites render trees that are built ahead of time, these keep the cost
+of the render cache's bookkeeping on the first render in sight.
+'''
+import coffeepot.jquery.lib   # sets coffeepot.JSLIB
+from coffeepot.benchmarks import benchmark
+from coffeepot.core.node import _GeneratorNode
+
+
+def many_scripts(count=5000):
+    '''ScriptNodes added with add_script()'''
+    g = _GeneratorNode()
+    for i in range(count):
+        g.add_script('x%d()' % i)
+    return g
+
+
+def element_rows(count=2000):
+    '''rows of two chained calls on an ElementNode'''
+    g = _GeneratorNode()
+    for i in range(count):
+        e = g.add_element('#row-%d' % i)
+        e.add_method('row %d' % i, name='html')
+        e.add_method(name='show')
+    return g
+
+
+def first_render(build):
+    '''
+    Returns a run() that builds a new tree and renders it once.
+    '''
+    def run(tree):
+        return build().render()
+    return run
+
+
+benchmark('cold_many_scripts', run=first_render(many_scripts))(many_scripts)
+benchmark('cold_element_rows', run=first_render(element_rows))(element_rows)
@@ -0,0 +1,134 @@
+'''
+Latency of rendering trees with blocking nodes for many requests at once,
+sync render() one request after another against arender() on an event loop.
+
+    python -m coffeepot.benchmarks.concurrency [requests] [concurrency]
+
+The blocking node sleeps to stand in for a template that waits on a file or
+the database.  Needs Python 3.
+'''
+import sys
+import time
+
+from coffeepot.benchmarks import benchmark
+from coffeepot.core.node import _GeneratorNode, _Node
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+# Seconds each blocking node waits
+BLOCKING_DELAY = 0.005
+
+
+class SlowNode(_Node):
+    '''
+    A node whose render() blocks, like a TemplateNode waiting on I/O.
+    '''
+    cacheable = False
+    blocking = True
+
+    def __init__(self, script, delay=BLOCKING_DELAY):
+        super(SlowNode, self).__init__()
+        self.script = script
+        self.delay = delay
+
+    def _generate(self, child, minify):
+        time.sleep(self.delay)
+        yield self.script
+
+
+def blocking_page(sections=4):
+    '''
+    A page of functions where each function holds one blocking node.
+    '''
+    g = _GeneratorNode()
+    for i in range(sections):
+        f = g.add_function('section%d' % i)
+        f.add_element('#section-%d' % i).add_method(name='show')
+        f.add_to_queue( SlowNode('load(%d)' % i) )
+    return g
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+    return values[index]
+
+
+def sync_latencies(requests):
+    '''
+    Every request waits for the ones before it, like a single sync worker.
+    '''
+    latencies = []
+    start = time.time()
+    for i in range(requests):
+        blocking_page().render()
+        latencies.append( time.time() - start )
+    return latencies
+
+
+def run_concurrently(coroutines, callback=None):
+    '''
+    Runs coroutines together on a new event loop and returns their results.
+    Written without async syntax so the suite still imports on Python 2.
+    '''
+    loop = asyncio.new_event_loop()
+    try:
+        tasks = [loop.create_task(c) for c in coroutines]
+        if callback is not None:
+            for task in tasks:
+                task.add_done_callback(callback)
+        return loop.run_until_complete(asyncio.gather(*tasks))
+    finally:
+        loop.close()
+
+
+def async_latencies(requests, concurrency):
+    '''
+    Requests arrive in waves of 'concurrency' and are rendered with arender().
+    '''
+    from coffeepot.core.aio import arender
+
+    latencies = []
+    start = time.time()
+    done = lambda task: latencies.append( time.time() - start )
+    for i in range(0, requests, concurrency):
+        count = min(concurrency, requests - i)
+        run_concurrently([arender(blocking_page()) for j in range(count)], done)
+    return latencies
+
+
+def report(name, latencies):
+    print( '%-6s p50 %7.1f ms  p95 %7.1f ms  p99 %7.1f ms  total %7.1f ms' % (
+        name,
+        percentile(latencies, 50) * 1000,
+        percentile(latencies, 95) * 1000,
+        percentile(latencies, 99) * 1000,
+        max(latencies) * 1000) )
+
+
+def arender_batch(concurrency=16):
+    def run(tree):
+        from coffeepot.core.aio import arender
+        return run_concurrently([arender(tree) for i in range(concurrency)])[0]
+    return run
+
+
+if asyncio is not None:
+    benchmark('blocking_page_render')(blocking_page)
+    benchmark('blocking_page_arender_x16', run=arender_batch(16))(blocking_page)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    requests = int(argv[0]) if argv else 50
+    concurrency = int(argv[1]) if len(argv) > 1 else 10
+
+    report('sync', sync_latencies(requests))
+    report('async', async_latencies(requests, concurrency))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+'''
+The non-recursive renderer (coffeepot.core.engine) against render().
+deep_functions_iterative renders the same tree as deep_functions, the
+others are nested too deep for render() to manage at all.
+'''
+from coffeepot.benchmarks import benchmark
+from coffeepot.benchmarks.shapes import deep_functions
+from coffeepot.core.encoder import compact_encoder
+from coffeepot.core.node import _GeneratorNode, FunctionNode
+
+
+def render_iterative_cold(tree):
+    tree.clear_cache()
+    return tree.render_iterative()
+
+
+def deep_callbacks(depth=1000):
+    '''
+    Callbacks passed to methods of elements in the callback before, built
+    from the inside out.
+    '''
+    node = FunctionNode()
+    node.add_script('done()')
+    for i in range(depth):
+        outer = FunctionNode()
+        outer.add_element('#level-%d' % i).add_method(node, name='click')
+        node = outer
+
+    g = _GeneratorNode()
+    g.add_to_queue( node )
+    return g
+
+
+def deep_data(depth=10000):
+    '''
+    Lists and dicts nested inside each other.
+    '''
+    value = []
+    for i in range(depth):
+        value = [i, {'next': value}]
+    return value
+
+
+benchmark('deep_functions_iterative', run=render_iterative_cold)(deep_functions)
+benchmark('deep_callbacks_iterative', run=render_iterative_cold)(deep_callbacks)
+benchmark('deep_data', run=compact_encoder.encode)(deep_data)
@@ -0,0 +1,89 @@
+'''
+Compares the encoder behind arg_string_for_js() with the helper functions it
+replaced and with the json module.
+
+The old helpers can't encode nested dicts or lists at all (they recurse until
+the interpreter gives up), so for deep kwargs json.dumps is the baseline.
+'''
+import json
+
+from coffeepot.benchmarks import benchmark
+from coffeepot.core.helper import arg_string_for_js
+
+
+#-------------------------------------------------------------------
+#   BASELINE
+#
+#   The helpers as they were before coffeepot.core.encoder, minus the debug
+#   printing.  Only flat values go through them.
+#
+
+def legacy_arg_string_for_js(*args, **kwargs):
+    sep = ", "
+    kwsep = sep
+    result = ""
+
+    if args:
+        result = sep.join([ legacy_convertValue(x) for x in args if x != {} ])
+
+    if kwargs:
+        if args:
+            result += sep
+        result += "{ %s }" % kwsep.join([ '%s:%s' % ( k, legacy_convertValue(v) ) for k, v in kwargs.items() ])
+
+    return result
+
+
+def legacy_convertValue(value):
+    if isinstance( value, bool ):
+        return str(value).lower()
+    elif isinstance( value, int ):
+        return str(value)
+    else:
+        return '"%s"' % value
+
+
+#-------------------------------------------------------------------
+#   DATA
+#
+
+def flat_kwargs(width=50):
+    kwargs = {}
+    for i in range(width):
+        kwargs['key%d' % i] = (i, 'value %d' % i, i % 2 == 0)[i % 3]
+    return kwargs
+
+
+def nested_kwargs(depth=12, width=4):
+    '''
+    A dict 'depth' levels deep where every level also holds a list of
+    'width' small dicts.
+    '''
+    value = {'leaf': True, 'count': 0}
+    for level in range(depth):
+        value = {
+            'level': level,
+            'name': 'level-%d' % level,
+            'items': [{'id': i, 'label': 'item %d' % i} for i in range(width)],
+            'child': value,
+        }
+    return {'options': value}
+
+
+def encode_args(kwargs):
+    return arg_string_for_js(1, 'two', **kwargs)
+
+
+def encode_args_legacy(kwargs):
+    return legacy_arg_string_for_js(1, 'two', **kwargs)
+
+
+benchmark('encoder_flat_kwargs', run=encode_args)(flat_kwargs)
+benchmark('encoder_flat_kwargs_legacy', run=encode_args_legacy)(flat_kwargs)
+benchmark('encoder_nested_kwargs', run=encode_args)(nested_kwargs)
+benchmark('encoder_nested_kwargs_json', run=json.dumps)(nested_kwargs)
+
+
+if __name__ == '__main__':
+    from coffeepot.benchmarks.runner import main
+    main(['run', '-k', '^encoder_'])
@@ -0,0 +1,35 @@
+'''
+The flat backend (coffeepot.core.flat) building the same scripts as the
+node tree shapes rows_unrolled and mixed_page.
+'''
+from coffeepot.benchmarks import benchmark
+from coffeepot.core.flat import FlatGenerator
+
+
+def render_flat_cold(g):
+    g._cache = {}
+    return g.render()
+
+
+@benchmark('rows_unrolled_flat', run=render_flat_cold)
+def rows_unrolled_flat(count=5000):
+    '''rows_unrolled on a FlatGenerator'''
+    g = FlatGenerator()
+    for i in range(count):
+        e = g.add_element('#row-%d' % i)
+        e.add_method(name='hide')
+        e.add_method('row %d' % i, name='html')
+    return g
+
+
+@benchmark('mixed_page_flat', run=render_flat_cold)
+def mixed_page_flat(sections=100):
+    '''mixed_page on a FlatGenerator'''
+    g = FlatGenerator()
+    for i in range(sections):
+        f = g.add_function('handler%d' % i)
+        f.add_element('#section-%d' % i).add_method(name='show')
+        e = f.add_element('#section-%d .title' % i)
+        e.add_method('Section %d' % i, name='html')
+        e.add_method(name='fadeIn', duration=200, easing='swing')
+    return g
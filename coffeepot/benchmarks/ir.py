@@ -0,0 +1,19 @@
+'''
+Loading trees from the IR (coffeepot.core.ir) compared with building them.
+Compare the build time of the shapes with the render time here.
+'''
+from coffeepot.benchmarks import benchmark
+from coffeepot.benchmarks.shapes import deep_functions, mixed_page
+from coffeepot.jquery.lib import Generator
+
+
+@benchmark('ir_load_mixed_page', run=Generator.load)
+def ir_load_mixed_page():
+    '''mixed_page loaded from a dump'''
+    return mixed_page().dump()
+
+
+@benchmark('ir_load_deep_functions', run=Generator.load)
+def ir_load_deep_functions():
+    '''deep_functions loaded from a dump'''
+    return deep_functions().dump()
@@ -0,0 +1,346 @@
+'''
+End to end load test of Django views that return scripts, to see what a
+change does to a server under load rather than to one render.
+
+    python -m coffeepot.benchmarks.load -c 16 -n 2000
+    python -m coffeepot.benchmarks.load --wsgi -v large,template -o load.json
+
+The views are served from a minimal Django set up here, through Django's
+test client or, with --wsgi, through a threaded wsgiref server on localhost
+so requests pay for real HTTP.  Each view gets 'requests' requests from
+'concurrency' threads.  The report has the throughput, the p50/p95/p99
+latency and the RSS of the process sampled while the requests run, whose
+growth shows leaks and caches that never stop filling.
+
+Needs Django.
+'''
+import json
+import optparse
+import os
+import sys
+import threading
+import timeit
+
+from coffeepot.benchmarks.concurrency import percentile
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+timer = timeit.default_timer
+
+
+#-------------------------------------------------------------------
+#   VIEWS
+#
+
+def small_view(request):
+    '''
+    A handful of statements, the usual per page script.
+    '''
+    from coffeepot.jquery.lib import Generator
+
+    g = Generator()
+    f = g.add_function('init')
+    f.add_element('#app').show()
+    callback = g.function()
+    callback.add_element('#menu ul').show()
+    f.add_element('#menu').click(callback)
+    return g.render_to_response(request=request)
+
+
+def large_view(request):
+    '''
+    Hundreds of functions with element chains, a few hundred KB of script.
+    '''
+    from coffeepot.jquery.lib import Generator
+
+    g = Generator()
+    for i in range(500):
+        f = g.add_function('section%d' % i)
+        f.add_element('#section-%d' % i).show()
+        f.add_element('#section-%d .title' % i).html('Section %d' % i).hide(200, easing='swing')
+    return g.render_to_response(request=request, compress=True)
+
+
+SECTION_TEMPLATE = '''{% for item in items %}
+load("{{ url }}", {{ item }});{% endfor %}'''
+
+
+def template_view(request):
+    '''
+    Most of the script comes from Django templates.
+    '''
+    from coffeepot.jquery.lib import Generator
+
+    g = Generator()
+    for i in range(20):
+        g.add_element('#section-%d' % i).show()
+        g.template_node(SECTION_TEMPLATE, {'url': '/api/section/%d/' % i, 'items': range(25)})
+    return g.render_to_response(request=request)
+
+
+VIEWS = {
+    'small': small_view,
+    'large': large_view,
+    'template': template_view,
+}
+
+urlpatterns = []
+
+
+def configure():
+    '''
+    Sets up Django with just enough to serve the views.
+    '''
+    import django
+    from django.conf import settings
+
+    if not settings.configured:
+        settings.configure(
+            DEBUG=False,
+            ALLOWED_HOSTS=['*'],
+            SECRET_KEY='coffeepot-load-test',
+            ROOT_URLCONF=__name__,
+            MIDDLEWARE=[],
+            INSTALLED_APPS=[],
+            TEMPLATES=[{'BACKEND': 'django.template.backends.django.DjangoTemplates'}],
+        )
+    if hasattr(django, 'setup'):
+        django.setup()
+
+    try:
+        from django.urls import re_path
+    except ImportError:     # Django < 2.0
+        from django.conf.urls import url as re_path
+
+    del urlpatterns[:]
+    for name, view in sorted(VIEWS.items()):
+        urlpatterns.append( re_path(r'^%s/$' % name, view) )
+
+
+#-------------------------------------------------------------------
+#   CLIENTS
+#
+
+def test_client():
+    '''
+    Returns fetch(path) -> status going through Django's test client.
+    '''
+    from django.test import Client
+    client = Client()
+    return lambda path: client.get(path, HTTP_ACCEPT_ENCODING='gzip').status_code
+
+
+def start_server():
+    '''
+    Serves the views on a free localhost port from a thread and returns
+    (server, base url).
+    '''
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+    from django.core.wsgi import get_wsgi_application
+    try:
+        from socketserver import ThreadingMixIn
+    except ImportError:     # Python 2
+        from SocketServer import ThreadingMixIn
+
+    class Server(ThreadingMixIn, WSGIServer):
+        daemon_threads = True
+        request_queue_size = 128
+
+    class QuietHandler(WSGIRequestHandler):
+        def log_message(self, *args):
+            pass
+
+    server = make_server('127.0.0.1', 0, get_wsgi_application(), Server, QuietHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, 'http://127.0.0.1:%d' % server.server_address[1]
+
+
+def http_client(base):
+    def factory():
+        try:
+            from urllib.request import Request, urlopen
+            from urllib.error import HTTPError
+        except ImportError:     # Python 2
+            from urllib2 import Request, urlopen, HTTPError
+
+        def fetch(path):
+            try:
+                response = urlopen(Request(base + path, headers={'Accept-Encoding': 'gzip'}))
+                response.read()
+                return response.getcode()
+            except HTTPError as e:
+                return e.code
+        return fetch
+    return factory
+
+
+#-------------------------------------------------------------------
+#   DRIVER
+#
+
+def rss_kb():
+    '''
+    The current resident set size, or the peak where that is all there is.
+    '''
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (IOError, OSError, ValueError):
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return None
+
+
+class Sampler(object):
+    '''
+    Records (seconds, RSS in KB) every interval in a thread.
+    '''
+    def __init__(self, interval=0.25):
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started = timer()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            self.samples.append( (round(timer() - self.started, 3), rss_kb()) )
+            if self._stop.wait(self.interval):
+                return
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.samples.append( (round(timer() - self.started, 3), rss_kb()) )
+        return self.samples
+
+
+def drive(client_factory, path, requests, concurrency):
+    '''
+    Sends 'requests' GETs to path from 'concurrency' threads.  Returns
+    (latencies, errors, seconds).
+    '''
+    lock = threading.Lock()
+    remaining = [requests]
+    latencies = []
+    errors = [0]
+
+    def worker():
+        fetch = client_factory()
+        while True:
+            with lock:
+                if not remaining[0]:
+                    return
+                remaining[0] -= 1
+
+            start = timer()
+            status = fetch(path)
+            elapsed = timer() - start
+
+            with lock:
+                latencies.append( elapsed )
+                if status not in (200, 304):
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker) for i in range(concurrency)]
+    start = timer()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], timer() - start
+
+
+def run(views, requests, concurrency, wsgi=False, interval=0.25, warmup=20):
+    '''
+    Loads each view and returns {view: results}.
+    '''
+    configure()
+    server = None
+    if wsgi:
+        server, base = start_server()
+        factory = http_client(base)
+    else:
+        factory = test_client
+
+    results = {}
+    try:
+        for name in views:
+            path = '/%s/' % name
+            drive(factory, path, warmup, 1)
+
+            sampler = Sampler(interval)
+            sampler.start()
+            latencies, errors, seconds = drive(factory, path, requests, concurrency)
+            samples = sampler.stop()
+
+            rss = [kb for at, kb in samples if kb is not None]
+            results[name] = {
+                'requests': requests,
+                'concurrency': concurrency,
+                'errors': errors,
+                'seconds': seconds,
+                'throughput': requests / seconds if seconds else None,
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'rss_start_kb': rss[0] if rss else None,
+                'rss_end_kb': rss[-1] if rss else None,
+                'rss_growth_kb': rss[-1] - rss[0] if rss else None,
+                'rss_samples': samples,
+            }
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+    return results
+
+
+def print_results(results, out=sys.stdout):
+    out.write( '%-10s %8s %10s %9s %9s %9s %10s %7s\n' % (
+        'view', 'requests', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'RSS +KB', 'errors') )
+    for name, r in sorted(results.items()):
+        out.write( '%-10s %8d %10.1f %9.2f %9.2f %9.2f %10s %7d\n' % (
+            name, r['requests'], r['throughput'] or 0, r['p50_ms'], r['p95_ms'], r['p99_ms'],
+            r['rss_growth_kb'] if r['rss_growth_kb'] is not None else '-', r['errors']) )
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='%prog [options]',
+                                   description='Load tests Django views that return coffeepot scripts.')
+    parser.add_option('-v', '--views', default=','.join(sorted(VIEWS)),
+                      help='comma separated views to load (default: %default)')
+    parser.add_option('-n', '--requests', type='int', default=1000, help='requests per view (default: %default)')
+    parser.add_option('-c', '--concurrency', type='int', default=8, help='client threads (default: %default)')
+    parser.add_option('--wsgi', action='store_true', default=False,
+                      help='go through a local WSGI server instead of the test client')
+    parser.add_option('-i', '--interval', type='float', default=0.25,
+                      help='seconds between RSS samples (default: %default)')
+    parser.add_option('-o', '--output', help='write the results, RSS samples included, as JSON to this file')
+    options, args = parser.parse_args(argv)
+
+    views = [v for v in options.views.split(',') if v]
+    unknown = [v for v in views if v not in VIEWS]
+    if unknown:
+        parser.error('unknown view(s): %s' % ', '.join(unknown))
+
+    results = run(views, options.requests, options.concurrency, options.wsgi, options.interval)
+    print_results(results)
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+'''
+Chaining library methods on an ElementNode (the generated descriptors, see
+coffeepot/jquery/spec.py) against the same chains built with add_method().
+'''
+import coffeepot.jquery.lib   # sets coffeepot.JSLIB
+from coffeepot.benchmarks import benchmark
+from coffeepot.core.node import _GeneratorNode
+
+
+@benchmark('chain_add_method')
+def chain_add_method(count=2000):
+    '''rows of three chained calls made with add_method()'''
+    g = _GeneratorNode()
+    for i in range(count):
+        e = g.add_element('#row-%d' % i)
+        e.add_method('active', name='addClass')
+        e.add_method(200, 'swing', name='fadeIn')
+        e.add_method('row %d' % i, name='html')
+    return g
+
+
+@benchmark('chain_library_methods')
+def chain_library_methods(count=2000):
+    '''chain_add_method made with the library methods'''
+    g = _GeneratorNode()
+    for i in range(count):
+        g.add_element('#row-%d' % i).addClass('active').fadeIn(200, 'swing').html('row %d' % i)
+    return g
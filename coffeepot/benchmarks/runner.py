@@ -0,0 +1,198 @@
+'''
+Runs the registered benchmarks, writes the results as JSON and compares two
+result files.  Compare exits with status 1 if anything got slower or bigger
+than the threshold allows, so it can gate a build.
+'''
+import gc
+import json
+import optparse
+import os
+import platform
+import re
+import sys
+import time
+
+from coffeepot.benchmarks import load
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Result keys where a bigger number is worse
+METRICS = ['build_s', 'run_s', 'peak_kb']
+
+
+def best_time(func, repeat, number=1):
+    '''
+    Returns the best time in seconds of 'repeat' rounds of 'number' calls.
+    '''
+    timer = getattr(time, 'perf_counter', time.time)
+    best = None
+    for i in range(repeat):
+        gc.collect()
+        start = timer()
+        for j in range(number):
+            func()
+        elapsed = (timer() - start) / number
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def peak_memory(func):
+    '''
+    Returns the peak memory in KB used while calling func.  Uses tracemalloc
+    where there is one, otherwise the growth of the max RSS of a forked
+    child.  Returns None if neither works on this platform.
+    '''
+    if tracemalloc is not None:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return peak // 1024
+
+    if resource is None or not hasattr(os, 'fork'):
+        return None
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if not pid:
+        os.close(read_fd)
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        func()
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        os.write(write_fd, str(after - before).encode('ascii'))
+        os._exit(0)
+
+    os.close(write_fd)
+    result = os.read(read_fd, 64)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    return int(result)
+
+
+def measure(bench, repeat=5):
+    '''
+    Returns the results of a single benchmark as a dict.
+    '''
+    build_s = best_time(bench.build, repeat)
+
+    subject = bench.build()
+    run = bench.run
+    number = 1
+    # Keep the fast ones from being lost in timer noise
+    while best_time(lambda: run(subject), 1, number) * number < 0.05 and number < 100000:
+        number *= 10
+    run_s = best_time(lambda: run(subject), repeat, number)
+
+    output = run(subject)
+    return {
+        'description': bench.description,
+        'build_s': build_s,
+        'run_s': run_s,
+        'runs_per_s': 1.0 / run_s if run_s else None,
+        'output_bytes': len(output) if hasattr(output, '__len__') else None,
+        'peak_kb': peak_memory(lambda: run(bench.build())),
+    }
+
+
+def run_suite(pattern=None, repeat=5):
+    '''
+    Runs every benchmark whose name matches the pattern (a regex).
+    '''
+    results = {}
+    for name, bench in load().items():
+        if pattern and not re.search(pattern, name):
+            continue
+        results[name] = measure(bench, repeat)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.1):
+    '''
+    Returns a list of (name, metric, before, after) for every metric that is
+    more than 'threshold' (0.1 = 10%) worse in current than in baseline.
+    Benchmarks missing from either side are ignored.
+    '''
+    regressions = []
+    before_results = baseline['results']
+    for name, after in sorted(current['results'].items()):
+        before = before_results.get(name)
+        if before is None:
+            continue
+        for metric in METRICS:
+            old, new = before.get(metric), after.get(metric)
+            if not old or new is None:
+                continue
+            if new > old * (1 + threshold):
+                regressions.append( (name, metric, old, new) )
+    return regressions
+
+
+def print_results(data, out=sys.stdout):
+    out.write('%-28s %12s %12s %12s %10s\n' % ('benchmark', 'build ms', 'run ms', 'runs/s', 'peak KB'))
+    for name, result in sorted(data['results'].items()):
+        out.write('%-28s %12.3f %12.3f %12.1f %10s\n' % (
+            name, result['build_s'] * 1000, result['run_s'] * 1000,
+            result['runs_per_s'] or 0, result['peak_kb']))
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='\n  %prog run [-o results.json] [-k pattern]'
+                                         '\n  %prog compare baseline.json current.json [-t 0.1]')
+    parser.add_option('-o', '--output', help='write the results as JSON to this file')
+    parser.add_option('-k', '--pattern', help='only run benchmarks whose name matches this regex')
+    parser.add_option('-r', '--repeat', type='int', default=5, help='rounds per measurement (default 5)')
+    parser.add_option('-t', '--threshold', type='float', default=0.1,
+                      help='allowed slow down before compare fails, 0.1 is 10%% (default)')
+    options, args = parser.parse_args(argv)
+
+    if not args:
+        parser.error('run or compare?')
+
+    if args[0] == 'run':
+        data = run_suite(options.pattern, options.repeat)
+        print_results(data)
+        if options.output:
+            with open(options.output, 'w') as f:
+                json.dump(data, f, indent=2, sort_keys=True)
+        return 0
+
+    if args[0] == 'compare' and len(args) == 3:
+        with open(args[1]) as f:
+            baseline = json.load(f)
+        with open(args[2]) as f:
+            current = json.load(f)
+
+        regressions = compare(baseline, current, options.threshold)
+        for name, metric, old, new in regressions:
+            print( '%s %s: %.6g -> %.6g (%+.1f%%)' % (name, metric, old, new, (new / old - 1) * 100) )
+        if regressions:
+            sys.exit(1)
+        print( 'No regressions over %.0f%%' % (options.threshold * 100) )
+        return 0
+
+    parser.error('run or compare?')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+'''
+Node trees in the shapes that show up in real pages.  The methods are added
+with add_method() so the trees don't depend on a JavaScript library.
+'''
+import coffeepot.jquery.lib   # sets coffeepot.JSLIB
+from coffeepot.benchmarks import benchmark
+from coffeepot.core.node import _GeneratorNode, _MethodNode, FunctionNode
+
+
+def deep_functions(depth=200):
+    '''
+    FunctionNodes nested inside each other, each with an element chain.
+    '''
+    g = _GeneratorNode()
+    node = g
+    for i in range(depth):
+        node = node.add_function()
+        node.add_element('#level-%d' % i).add_method('fast', name='hide')
+    return g
+
+
+def wide_chain(width=1000):
+    '''
+    A single ElementNode with a long chain of methods.
+    '''
+    g = _GeneratorNode()
+    e = g.add_element('#foo')
+    for i in range(width):
+        e.add_method(i, 'arg', name='css')
+    return g
+
+
+def many_scripts(count=5000):
+    '''
+    Thousands of ScriptNodes at the top level.
+    '''
+    g = _GeneratorNode()
+    for i in range(count):
+        g.add_script('console.log(%d)' % i)
+    return g
+
+
+def large_kwargs(keys=2000):
+    '''
+    One method call with a large kwargs dict.
+    '''
+    kwargs = {}
+    for i in range(keys):
+        kwargs['option%d' % i] = (i, 'value %d' % i, True, [i, i + 1])[i % 4]
+
+    g = _GeneratorNode()
+    g.add_to_queue( _MethodNode(name='configure', **kwargs) )
+    return g
+
+
+def mixed_page(sections=100):
+    '''
+    Named functions holding a few element chains each, the usual page.
+    '''
+    g = _GeneratorNode()
+    for i in range(sections):
+        f = g.add_function('handler%d' % i)
+        f.add_element('#section-%d' % i).add_method(name='show')
+        e = f.add_element('#section-%d .title' % i)
+        e.add_method('Section %d' % i, name='html')
+        e.add_method(name='fadeIn', duration=200, easing='swing')
+    return g
+
+
+benchmark('deep_functions')(deep_functions)
+benchmark('wide_chain')(wide_chain)
+benchmark('many_scripts')(many_scripts)
+benchmark('large_kwargs')(large_kwargs)
+benchmark('mixed_page')(mixed_page)
+
+
+def rows_unrolled(count=5000):
+    '''
+    The same chain on thousands of elements, one statement each.
+    '''
+    g = _GeneratorNode()
+    for i in range(count):
+        e = g.add_element('#row-%d' % i)
+        e.add_method(name='hide')
+        e.add_method('row %d' % i, name='html')
+    return g
+
+
+def rows_each(count=5000):
+    '''
+    rows_unrolled as one array and a loop.
+    '''
+    g = _GeneratorNode()
+    each = g.add_each([{'id': i, 'label': 'row %d' % i} for i in range(count)], '#row-%(id)s')
+    each.add_method(name='hide')
+    each.add_method(each.field('label'), name='html')
+    return g
+
+
+benchmark('rows_unrolled')(rows_unrolled)
+benchmark('rows_each')(rows_each)
+
+
+def _branch(i):
+    f = FunctionNode(name='branch%d' % i)
+    for j in range(20):
+        e = f.add_element('#branch-%d-%d' % (i, j))
+        e.add_method(name='show')
+        e.add_method(j, name='css')
+    return f
+
+
+def branches_eager(count=100, used=10):
+    '''
+    Many conditional branches built up front, only a few of them emitted.
+    '''
+    g = _GeneratorNode()
+    for i in range(count):
+        branch = _branch(i)
+        if i < used:
+            g.add_to_queue( branch )
+    return g
+
+
+def branches_lazy(count=100, used=10):
+    '''
+    branches_eager with IfNodes, only the branches emitted get built.
+    '''
+    g = _GeneratorNode()
+    for i in range(count):
+        g.add_if(i < used, lambda i=i: _branch(i))
+    return g
+
+
+benchmark('branches_eager')(branches_eager)
+benchmark('branches_lazy')(branches_lazy)
@@ -0,0 +1,319 @@
+'''
+Renders Generator trees that don't depend on the request into static files
+at deploy time.
+
+Register a function that builds the tree:
+
+    from coffeepot.build import register
+
+    @register('site', inputs=['templates/site.js'])
+    def site():
+        g = Generator()
+        ...
+        return g
+
+Then build everything that is registered in the given modules (or through
+the 'coffeepot.generators' entry point group):
+
+    coffeepot-build -m myapp.scripts -o static/js
+
+Each script is written as <name>.<content hash>.js and manifest.json maps the
+names to the files.  A script is only built again when the module holding
+its function, one of its 'inputs' files or coffeepot itself changed since
+the manifest was written.  Scripts are rendered in a process pool, one
+process per CPU by default.  Files from earlier builds are left in place for
+pages that still point at them.
+'''
+import glob
+import hashlib
+import inspect
+import json
+import multiprocessing
+import optparse
+import os
+import sys
+import traceback
+
+import coffeepot
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    OrderedDict = dict
+
+try:
+    _replace = os.replace
+except AttributeError:     # Python 2
+    def _replace(src, dst):
+        # rename() only overwrites dst by itself on POSIX
+        if os.name == 'nt' and os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
+
+MANIFEST = 'manifest.json'
+
+# Entry point group searched for factories (or modules that register them)
+ENTRY_POINT_GROUP = 'coffeepot.generators'
+
+# name -> Factory
+FACTORIES = OrderedDict()
+
+
+class Factory(object):
+
+    def __init__(self, name, func, inputs=()):
+        self.name = name
+        self.func = func
+        self.module = func.__module__
+        self.inputs = list(inputs)
+        # Name of the entry point that named func directly, importing the
+        # module doesn't register it then
+        self.entry_point = None
+
+    def __repr__(self):
+        return '<Factory %s>' % self.name
+
+
+def register(name=None, inputs=()):
+    '''
+    Decorator that registers a function returning a node tree.  'inputs' are
+    paths of extra files the output depends on.
+    '''
+    def decorator(func):
+        FACTORIES[name or func.__name__] = Factory(name or func.__name__, func, inputs)
+        return func
+    return decorator
+
+
+#-------------------------------------------------------------------
+#   DISCOVERY
+#
+
+def _entry_points():
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        try:
+            import pkg_resources
+        except ImportError:
+            return []
+        return list(pkg_resources.iter_entry_points(ENTRY_POINT_GROUP))
+
+    found = entry_points()
+    if hasattr(found, 'select'):
+        return list(found.select(group=ENTRY_POINT_GROUP))
+    return list(found.get(ENTRY_POINT_GROUP, []))
+
+
+def discover(modules=()):
+    '''
+    Imports the modules and the entry points that register factories and
+    returns the registry.  An entry point may also name a factory function
+    directly, it is registered under the entry point's name.
+    '''
+    for module in modules:
+        __import__(module)
+
+    for entry_point in _entry_points():
+        loaded = entry_point.load()
+        if inspect.isfunction(loaded) and entry_point.name not in FACTORIES:
+            register(entry_point.name)(loaded)
+            FACTORIES[entry_point.name].entry_point = entry_point.name
+
+    return FACTORIES
+
+
+#-------------------------------------------------------------------
+#   FINGERPRINTS
+#
+
+def _hash_file(digest, path):
+    digest.update( os.path.abspath(path).encode('utf-8') )
+    try:
+        with open(path, 'rb') as f:
+            digest.update( f.read() )
+    except (IOError, OSError):
+        digest.update( b'<missing>' )
+
+
+def library_fingerprint():
+    '''
+    Hash of coffeepot's own source, so upgrading it rebuilds everything.
+    '''
+    root = os.path.dirname(os.path.abspath(coffeepot.__file__))
+    digest = hashlib.sha1()
+    for package in ('', 'core', 'jquery'):
+        for path in sorted(glob.glob(os.path.join(root, package, '*.py'))):
+            _hash_file(digest, path)
+    return digest.hexdigest()
+
+
+def input_fingerprint(factory, minify, library):
+    digest = hashlib.sha1()
+    digest.update( ('%s|%s|%s|%s' % (factory.name, factory.module, minify, library)).encode('utf-8') )
+
+    module = sys.modules.get(factory.module)
+    source = module is not None and inspect.getsourcefile(module)
+    if source:
+        _hash_file(digest, source)
+    for path in factory.inputs:
+        _hash_file(digest, path)
+    return digest.hexdigest()
+
+
+#-------------------------------------------------------------------
+#   BUILD
+#
+
+def _find_factory(name, module, entry_point):
+    '''
+    Returns a factory in a worker process.  Workers that don't share the
+    parent's memory (spawn, forkserver) register it again the way the
+    parent did.
+    '''
+    if name not in FACTORIES:
+        if entry_point:
+            discover()
+        elif module != '__main__':
+            __import__(module)
+    return FACTORIES[name]
+
+
+def build_one(job):
+    '''
+    Renders one script and writes it.  Runs in the worker processes, so it
+    only gets plain values and returns (name, file name, hash, error).
+    '''
+    name, module, entry_point, output_dir, minify = job
+    try:
+        tree = _find_factory(name, module, entry_point).func()
+        data = tree.render(minify=minify)
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+
+        content_hash = hashlib.sha1(data).hexdigest()[:12]
+        filename = '%s.%s.js' % (name, content_hash)
+        path = os.path.join(output_dir, filename)
+        if not os.path.exists(path):
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            _replace(tmp, path)
+        return (name, filename, content_hash, None)
+    except Exception:
+        return (name, None, None, traceback.format_exc())
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def build(output_dir, names=None, minify=False, jobs=None, force=False, log=None):
+    '''
+    Builds the registered scripts (or only 'names') into output_dir and
+    writes the manifest.  Returns (built, skipped, errors) where errors maps
+    names to tracebacks.
+    '''
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    manifest = load_manifest(output_dir)
+    library = library_fingerprint()
+
+    todo = []
+    fingerprints = {}
+    skipped = []
+    for name, factory in FACTORIES.items():
+        if names and name not in names:
+            continue
+
+        fingerprint = fingerprints[name] = input_fingerprint(factory, minify, library)
+        entry = manifest.get(name)
+        if (not force and entry and entry.get('inputs') == fingerprint
+                and os.path.exists(os.path.join(output_dir, entry['file']))):
+            skipped.append( name )
+            continue
+        todo.append( (name, factory.module, factory.entry_point, output_dir, minify) )
+
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+    jobs = max(1, min(jobs, len(todo)))
+
+    if jobs == 1:
+        results = [build_one(job) for job in todo]
+    else:
+        pool = multiprocessing.Pool(jobs)
+        try:
+            results = pool.map(build_one, todo)
+        finally:
+            pool.close()
+            pool.join()
+
+    built = []
+    errors = {}
+    for name, filename, content_hash, error in results:
+        if error:
+            errors[name] = error
+            continue
+        manifest[name] = {'file': filename, 'hash': content_hash, 'inputs': fingerprints[name]}
+        built.append( name )
+        if log:
+            log('built %s -> %s' % (name, filename))
+
+    tmp = os.path.join(output_dir, MANIFEST + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    _replace(tmp, os.path.join(output_dir, MANIFEST))
+
+    return built, skipped, errors
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='%prog [options] [name ...]',
+                                   description='Renders registered coffeepot generators into static .js files.')
+    parser.add_option('-m', '--module', action='append', default=[],
+                      help='import this module to register factories (repeatable)')
+    parser.add_option('-o', '--output-dir', default='.', help='where to write the scripts (default: .)')
+    parser.add_option('-j', '--jobs', type='int', help='worker processes (default: one per CPU)')
+    parser.add_option('--minify', action='store_true', default=False, help='render minified scripts')
+    parser.add_option('-f', '--force', action='store_true', default=False, help='build even if nothing changed')
+    parser.add_option('-q', '--quiet', action='store_true', default=False)
+    options, names = parser.parse_args(argv)
+
+    # Let modules in the current directory be found like with python -m
+    if '' not in sys.path and os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+
+    discover(options.module)
+    if not FACTORIES:
+        parser.error('no generator factories registered, use -m or the %s entry points' % ENTRY_POINT_GROUP)
+
+    unknown = [n for n in names if n not in FACTORIES]
+    if unknown:
+        parser.error('unknown generator(s): %s' % ', '.join(unknown))
+
+    log = None
+    if not options.quiet:
+        log = lambda message: sys.stdout.write(message + '\n')
+
+    built, skipped, errors = build(options.output_dir, names, options.minify,
+                                   options.jobs, options.force, log)
+
+    for name, error in sorted(errors.items()):
+        sys.stderr.write('failed %s\n%s\n' % (name, error))
+    if log:
+        log('%d built, %d unchanged, %d failed' % (len(built), len(skipped), len(errors)))
+
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    # Go through the importable module so factories registered by the
+    # modules given with -m land in the same registry.
+    import coffeepot.build
+    coffeepot.build.main()
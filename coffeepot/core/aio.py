@@ -0,0 +1,106 @@
+'''
+Rendering for async code (Python 3 only).
+
+    async def view(request):
+        g = build_generator()
+        return await g.arender_to_response(request=request)
+
+Nodes marked blocking (TemplateNode, or any object in a queue that isn't a
+node), and uncacheable nodes without a queue of their own, are rendered in a
+bounded thread pool so they don't hold up the event loop.  The queues above
+them are rendered with asyncio.gather(), so blocking children of the same
+queue run at the same time while the output keeps its order.  Subtrees
+without anything blocking in them are plain CPU work and are rendered in
+place, using the render cache like render() does.
+
+Django templates rendered in the pool run in pool threads, so anything they
+touch (database connections included) must be safe to use from a thread.
+'''
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from coffeepot.core.node import _Node
+
+# Size of the thread pool for blocking nodes
+MAX_WORKERS = int(os.environ.get('COFFEEPOT_ASYNC_WORKERS', '8'))
+
+_executor = None
+
+
+def get_executor():
+    '''
+    Returns the thread pool used for blocking nodes, creating it on first use.
+    '''
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+    return _executor
+
+
+def set_executor(executor):
+    '''
+    Replaces the thread pool used for blocking nodes.  Any
+    concurrent.futures executor will do.
+    '''
+    global _executor
+    _executor = executor
+
+
+def _render_blocking(node, minify):
+    if isinstance(node, _Node):
+        return node.render(minify=minify)
+    return node.render()
+
+
+async def _arender(node, minify, loop, executor):
+    if not isinstance(node, _Node) or node.blocking:
+        return await loop.run_in_executor(executor, _render_blocking, node, minify)
+
+    # Nothing blocking below a cacheable node
+    if node.cacheable:
+        return node.render(minify)
+
+    # What an uncacheable node without a queue renders can't be seen from
+    # here, it could be a method argument or something a LazyNode builds
+    # that blocks, so it goes to the pool too.
+    if not node.queue:
+        return await loop.run_in_executor(executor, _render_blocking, node, minify)
+
+    queue = list(node.queue)
+    parts = await asyncio.gather(*[_arender(x, minify, loop, executor) for x in queue])
+    rendered = dict(zip([id(x) for x in queue], parts))
+
+    def child(x, minify):
+        return ( rendered[id(x)], )
+
+    return "".join( node._generate(child, minify) )
+
+
+async def arender(node, minify=None, executor=None):
+    '''
+    Renders a node tree without blocking the event loop.
+    '''
+    if minify is None:
+        minify = node.minify
+    try:
+        loop = asyncio.get_running_loop()
+    except AttributeError:   # Python < 3.7
+        loop = asyncio.get_event_loop()
+    return await _arender(node, minify, loop, executor or get_executor())
+
+
+async def arender_to_response(node, content_type="text/javascript", compress=False,
+                              minify=None, request=None, cache_control=None):
+    '''
+    Async render_to_response().  A request whose If-None-Match matches a
+    cached ETag gets its 304 without anything being rendered.
+    '''
+    if minify is None:
+        minify = node.minify
+
+    content = None
+    if request is None or node.cached_etag(minify) is None:
+        content = await arender(node, minify)
+
+    return node._response(content, content_type, False, compress, minify, request, cache_control)
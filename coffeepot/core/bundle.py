@@ -0,0 +1,256 @@
+'''
+Combines the scripts of several Generators into one.
+
+    bundle = Bundle()
+    bundle.add(header, 'header')
+    bundle.add(sidebar, 'sidebar')
+    text, source_map = bundle.render_with_map(minify=True, file='page.js')
+
+The statements of every Generator are put one after the other.  A
+FunctionNode, or a node marked idempotent, whose output an earlier Generator
+already put in the bundle is left out.  Other statements are always kept,
+running `counter++` twice is not the same as running it once.
+
+The source map (version 3, a dict ready for json.dumps) points back to the
+readable render of each Generator, which is included as the source, with
+the name of the node that produced each span.  Columns are counted in
+characters, which matches what browsers count as long as ScriptNodes stay
+in ASCII (the encoder's output always is).
+'''
+from bisect import bisect_right
+
+from coffeepot.core.encoder import string_types
+from coffeepot.core.node import FunctionNode, _PLACED, _opaque, _placed, _render_child
+
+BASE64_DIGITS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+
+# Node types that are left out when an earlier Generator has their output,
+# other nodes only when they are marked idempotent
+DEDUPLICATED = (FunctionNode,)
+
+
+def vlq(value):
+    '''
+    Returns a number in the base64 VLQ encoding of source maps.
+    '''
+    value = ((-value) << 1) | 1 if value < 0 else value << 1
+    digits = []
+    while True:
+        digit = value & 31
+        value >>= 5
+        if value:
+            digit |= 32
+        digits.append( BASE64_DIGITS[digit] )
+        if not value:
+            return ''.join(digits)
+
+
+def _label(node):
+    name = getattr(node, 'name', None)
+    if isinstance(name, string_types) and name:
+        return name
+    return node.__class__.__name__
+
+
+def track(node, minify, start=0, spans=None):
+    '''
+    Renders a node and returns (text, spans) where spans holds a (node,
+    start, end) for every node in the output, parents before children.
+    '''
+    if spans is None:
+        spans = []
+
+    if _opaque(node):
+        text = _render_child(node, minify)[0]
+        spans.append( (node, start, start + len(text)) )
+        return text, spans
+
+    index = len(spans)
+    spans.append( None )
+    pieces = []
+    pos = [start]
+
+    # (start, spans added for it) of the child whose text hasn't been
+    # yielded yet, a separator can still come before it
+    waiting = []
+
+    def child(x, minify):
+        mark = len(spans)
+        text = track(x, minify, pos[0], spans)[0]
+        if not text:
+            return ( text, )
+        waiting.append( (pos[0], mark) )
+        return ( _placed(text), )
+
+    for piece in node._generate(child, minify):
+        if piece.__class__ in _PLACED:
+            child_start, mark = waiting.pop()
+            shift = pos[0] - child_start
+            if shift:
+                spans[mark:] = [(x, s + shift, e + shift) for x, s, e in spans[mark:]]
+        pieces.append( piece )
+        pos[0] += len(piece)
+
+    text = "".join(pieces)
+    spans[index] = (node, start, start + len(text))
+    return text, spans
+
+
+class _Lines(object):
+    '''
+    Turns offsets in a text into (line, column).
+    '''
+    def __init__(self, text):
+        self.starts = [0]
+        pos = text.find('\n')
+        while pos != -1:
+            self.starts.append( pos + 1 )
+            pos = text.find('\n', pos + 1)
+
+    def position(self, offset):
+        line = bisect_right(self.starts, offset) - 1
+        return line, offset - self.starts[line]
+
+
+class Bundle(object):
+
+    def __init__(self, minify=False):
+        self.minify = minify
+        self.generators = []
+        # Statements left out of the last render
+        self.duplicates = 0
+
+    def add(self, generator, name=None):
+        '''
+        Adds a Generator, name is its source name in the source map.
+        '''
+        self.generators.append( (name or 'script%d.js' % len(self.generators), generator) )
+        return generator
+
+    def statements(self, minify):
+        '''
+        Yields (generator index, node, text) for every statement that goes
+        into the bundle.
+        '''
+        # Output of the earlier Generators, a Generator doesn't dedupe
+        # against itself
+        seen = set()
+        self.duplicates = 0
+        for index, (name, generator) in enumerate(self.generators):
+            added = []
+            for node in generator.queue:
+                text = _render_child(node, minify)[0]
+                if not text:
+                    continue
+                if isinstance(node, DEDUPLICATED) or getattr(node, 'idempotent', False):
+                    if text in seen:
+                        self.duplicates += 1
+                        continue
+                    added.append( text )
+                yield index, node, text
+            seen.update( added )
+
+    def render(self, minify=None):
+        '''
+        Returns the bundled script.
+        '''
+        if minify is None:
+            minify = self.minify
+
+        texts = [text for index, node, text in self.statements(minify)]
+        if not texts:
+            return ''
+        return (";" if minify else ";\n").join(texts) + ";"
+
+    def render_with_map(self, minify=None, file=None, url=None):
+        '''
+        Returns the bundled script and its source map.  With url a
+        sourceMappingURL comment pointing there ends the script.
+        '''
+        if minify is None:
+            minify = self.minify
+        sep = ";" if minify else ";\n"
+
+        # Where each node is in the readable render of its Generator
+        contents = []
+        sources = []
+        for name, generator in self.generators:
+            text, spans = track(generator, False)
+            positions = {}
+            for node, start, end in spans:
+                positions.setdefault( id(node), (start, end) )
+            contents.append( text )
+            sources.append( (positions, _Lines(text)) )
+
+        names = []
+        name_indexes = {}
+        # (offset in the bundle, source, offset in the source, name)
+        events = []
+        pieces = []
+        pos = 0
+
+        for index, node, text in self.statements(minify):
+            if pieces:
+                pos += len(sep)
+            text, spans = track(node, minify, pos)
+            positions = sources[index][0]
+            for x, start, end in spans:
+                found = positions.get(id(x))
+                if found is None:
+                    continue
+                label = _label(x)
+                if label not in name_indexes:
+                    name_indexes[label] = len(names)
+                    names.append( label )
+                events.append( (start, index, found[0], name_indexes[label]) )
+                events.append( (end, index, found[1], None) )
+            pieces.append( text )
+            pos += len(text)
+
+        output = (sep.join(pieces) + ";") if pieces else ''
+        source_map = {
+            'version': 3,
+            'sources': [name for name, generator in self.generators],
+            'sourcesContent': contents,
+            'names': names,
+            'mappings': self._mappings(output, events, sources),
+        }
+        if file:
+            source_map['file'] = file
+        if url:
+            output += '\n//# sourceMappingURL=%s' % url
+        return output, source_map
+
+    def _mappings(self, output, events, sources):
+        events.sort(key=lambda event: event[0])
+        lines = _Lines(output)
+
+        segments = []
+        line = 0
+        first = True
+        previous = [0, 0, 0, 0, 0]  # column, source, line, column, name
+        for i, (offset, source, source_offset, name) in enumerate(events):
+            # Of several spans starting at one place the innermost wins
+            if i + 1 < len(events) and events[i + 1][0] == offset:
+                continue
+
+            gen_line, gen_column = lines.position(offset)
+            while line < gen_line:
+                segments.append( ';' )
+                line += 1
+                previous[0] = 0
+                first = True
+
+            source_line, source_column = sources[source][1].position(source_offset)
+            segment = [gen_column - previous[0], source - previous[1],
+                       source_line - previous[2], source_column - previous[3]]
+            previous[:4] = [gen_column, source, source_line, source_column]
+            if name is not None:
+                segment.append( name - previous[4] )
+                previous[4] = name
+
+            if not first:
+                segments.append( ',' )
+            first = False
+            segments.append( ''.join([vlq(v) for v in segment]) )
+        return ''.join(segments)
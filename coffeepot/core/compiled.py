@@ -0,0 +1,59 @@
+import re
+
+from coffeepot.core.exception import PlaceholderError
+from coffeepot.core.encoder import default_encoder, compact_encoder, quote, string_types
+
+# Matches the tokens Placeholder objects leave in the rendered output.  The
+# mark is '!' for raw placeholders and '"' for ones inside a string literal
+# (see encoder.in_string).
+TOKEN_RE = re.compile('\x00([!"]?)([^\x00]+)\x00')
+
+
+class CompiledScript(object):
+    '''
+    A node tree that has been rendered once into fixed string fragments with
+    the Placeholder values left out.  Rendering only converts the values and
+    joins them with the fragments, the node tree is never walked again.
+
+    Created with Generator.compile().
+    '''
+
+    def __init__(self, source, minify=False):
+        self.encoder = compact_encoder if minify else default_encoder
+        parts = TOKEN_RE.split(source)
+        self.fragments = parts[0::3]
+        self.slots = list(zip(parts[2::3], parts[1::3]))
+        self.names = frozenset( [name for name, mark in self.slots] )
+
+    def render(self, **values):
+        '''
+        Returns the JavaScript with each placeholder replaced by its value.
+        '''
+        missing = self.names.difference(values)
+        if missing:
+            raise PlaceholderError('No value given for placeholder(s): %s' % ', '.join(sorted(missing)))
+
+        encode = self.encoder.encode
+        encoded = {}
+        fragments = self.fragments
+        result = [fragments[0]]
+
+        for i, key in enumerate(self.slots):
+            if key not in encoded:
+                name, mark = key
+                value = values[name]
+                if not mark:
+                    value = encode(value)
+                else:
+                    if not isinstance(value, string_types):
+                        value = str(value)
+                    if mark == '"':
+                        value = quote(value)[1:-1]
+                encoded[key] = value
+            result.append( encoded[key] )
+            result.append( fragments[i + 1] )
+
+        return "".join(result)
+
+    def __call__(self, **values):
+        return self.render(**values)
@@ -0,0 +1,181 @@
+'''
+Incremental re-rendering for trees that live for a while and change a little
+at a time.
+
+    snapshot = g.snapshot()
+    g.queue[0].add_element('#foo').show()
+    for change in snapshot.update():
+        send(change.old_start, change.old_end, change.text)
+    snapshot.text               # the whole new script
+
+A snapshot remembers where the output of every node is.  update() walks the
+tree again and copies the old text of every subtree that hasn't changed, so
+only the changed nodes are generated.  It returns the changed spans in
+output order, each one the output of the node that was changed (the chain a
+method was added to, the function a statement was added to, ...), with its
+offsets in the old and in the new text.  apply_changes() turns the old text
+into the new one with them.
+
+Objects that the tree can't track (templates, foreign objects) are rendered
+on every update and reported when their output differs.
+'''
+from coffeepot.core.node import _PLACED, _opaque, _placed, _render_child
+
+
+class Change(object):
+    '''
+    The output of one node, text, replaces old[old_start:old_end] and is
+    found at new[start:end].
+    '''
+    __slots__ = ('old_start', 'old_end', 'start', 'end', 'text')
+
+    def __init__(self, old_start, old_end, start, text):
+        self.old_start = old_start
+        self.old_end = old_end
+        self.start = start
+        self.end = start + len(text)
+        self.text = text
+
+    def __repr__(self):
+        return '<Change %d:%d -> %d:%d %r>' % (self.old_start, self.old_end,
+                                               self.start, self.end, self.text)
+
+
+class _Record(object):
+    '''
+    Where a node's output was.  start is relative to the parent's output.
+    '''
+    __slots__ = ('node', 'version', 'self_version', 'start', 'length', 'children')
+
+    def __init__(self, node, version, self_version, length, children):
+        self.node = node
+        self.version = version
+        self.self_version = self_version
+        self.start = 0
+        self.length = length
+        self.children = children
+
+
+def apply_changes(text, changes):
+    '''
+    Returns the new text from the old one and the changes update() returned.
+    '''
+    pieces = []
+    pos = 0
+    for change in changes:
+        pieces.append( text[pos:change.old_start] )
+        pieces.append( change.text )
+        pos = change.old_end
+    pieces.append( text[pos:] )
+    return "".join(pieces)
+
+
+class Snapshot(object):
+    '''
+    The rendered output of a tree plus the position of each node's output.
+    '''
+    def __init__(self, node, minify=None):
+        if minify is None:
+            minify = node.minify
+        self.node = node
+        self.minify = minify
+        self.text = ''
+        self._record = None
+        self.update()
+
+    def update(self):
+        '''
+        Brings the snapshot up to date with the tree and returns the list of
+        Changes, empty if the output is the same.
+        '''
+        changes = []
+        text, record = self._walk(self.node, self._record, 0, 0, changes)
+        self.text = text
+        self._record = record
+        return changes
+
+    def _walk(self, node, old, old_start, start, changes):
+        '''
+        Returns the output of node and its new record.  old is the record
+        from the last update, or None for a node that is new.
+        '''
+        if old is not None and old.node is not node:
+            old = None
+
+        if _opaque(node):
+            text = _render_child(node, self.minify)[0]
+            if old is not None and text != self.text[old_start:old_start + old.length]:
+                changes.append( Change(old_start, old_start + old.length, start, text) )
+            return text, _Record(node, None, None, len(text), ())
+
+        version = node._version
+        self_version = node._self_version
+        if old is not None and old.version == version and node.cacheable:
+            # Untouched since the last update
+            return self.text[old_start:old_start + old.length], old
+
+        changed = old is not None and old.self_version != self_version
+        node.__dict__['_stale'] = False
+        mark = len(changes)
+        text, children, emptied = self._generate(node, old, old_start, start, changes)
+
+        if old is not None and (changed or emptied or len(changes) == mark):
+            # The node's own output replaces anything found below it.  The
+            # text can also change without anything below reporting it, a
+            # LazyNode builds a new tree every time and callbacks in method
+            # arguments aren't walked.  A child that gained or lost all of
+            # its output also adds or drops the separator before it.
+            del changes[mark:]
+            if text != self.text[old_start:old_start + old.length]:
+                changes.append( Change(old_start, old_start + old.length, start, text) )
+
+        if node.cacheable and node._version == version:
+            if self.minify:
+                node._rendered_min = text
+            else:
+                node._rendered = text
+        return text, _Record(node, version, self_version, len(text), children)
+
+    def _generate(self, node, old, old_start, start, changes):
+        previous = {}
+        if old is not None:
+            for record in old.children:
+                previous.setdefault( id(record.node), [] ).append( record )
+
+        pieces = []
+        children = []
+        pos = [0]
+        # (record, changes made below it) of the child whose text hasn't
+        # been yielded yet, a separator can still come before it
+        waiting = []
+        emptied = [False]
+
+        def child(x, minify):
+            records = previous.get(id(x))
+            record = records.pop(0) if records else None
+            child_start = old_start + record.start if record is not None else 0
+
+            mark = len(changes)
+            text, new = self._walk(x, record, child_start, start + pos[0], changes)
+            if record is not None and bool(record.length) != bool(text):
+                emptied[0] = True
+            record = new
+            record.start = pos[0]
+            children.append( record )
+            if not text:
+                return ( text, )
+            waiting.append( (record, mark) )
+            return ( _placed(text), )
+
+        for piece in node._generate(child, self.minify):
+            if piece.__class__ in _PLACED:
+                record, mark = waiting.pop()
+                shift = pos[0] - record.start
+                if shift:
+                    record.start += shift
+                    for change in changes[mark:]:
+                        change.start += shift
+                        change.end += shift
+            pieces.append( piece )
+            pos[0] += len(piece)
+        return "".join(pieces), children, emptied[0]
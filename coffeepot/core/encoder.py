@@ -0,0 +1,632 @@
+'''
+Converts Python values into JavaScript source.
+
+The encoder writes everything for one call into a single buffer in a single
+pass.  How a value is written is picked from a table keyed by type, so new
+types can be taught to the encoder without touching this module:
+
+    from coffeepot.core.encoder import register
+
+    def encode_decimal(encoder, value, write, encode):
+        write(str(value))
+
+    register(Decimal, encode_decimal)
+
+A handler gets the encoder doing the work (for its separators), the value,
+write() which appends a string to the output buffer and encode() which
+writes a nested value into the same buffer.
+'''
+import array
+import base64
+import re
+import sys
+from json.encoder import encode_basestring_ascii
+
+from coffeepot.core.exception import CircularReferenceError
+
+try:
+    text_type = unicode
+    string_types = (str, unicode)
+    integer_types = (int, long)
+except NameError:   # Python 3
+    text_type = str
+    string_types = (str,)
+    integer_types = (int,)
+
+# Object keys that don't need quotes
+IDENTIFIER_RE = re.compile(r'^[A-Za-z_$][A-Za-z0-9_$]*$')
+
+# End of a list or dict being written without recursion
+_DONE = object()
+
+
+class Placeholder(object):
+    '''
+    Stands in for a value that is only known per request.  Use it anywhere a
+    method argument goes and fill it in on the compiled script:
+
+        g.add_element('#foo').html(Placeholder('message'))
+        script = g.compile()
+        script.render(message='Hello')
+
+    A raw placeholder is spliced in as is instead of being converted to a
+    JavaScript value, which makes it usable inside ScriptNodes:
+
+        g.add_script('var x = %s' % Placeholder('x', raw=True))
+    '''
+    def __init__(self, name, raw=False):
+        self.name = name
+        self.raw = raw
+        self.token = '\x00%s%s\x00' % ('!' if raw else '', name)
+
+    def __str__(self):
+        return self.token
+
+    def __repr__(self):
+        return 'Placeholder(%r)' % self.name
+
+
+# A token of a Placeholder that isn't raw
+_VALUE_TOKEN_RE = re.compile('\x00([^\x00!"][^\x00]*)\x00')
+
+
+def in_string(text):
+    '''
+    Returns text that goes inside a double quoted JavaScript string (like a
+    selector) with its Placeholder tokens marked, so their values are
+    filled in as escaped text instead of as quoted strings.  Raw
+    placeholders are left alone.
+    '''
+    if not isinstance(text, string_types):
+        text = str(text)
+    if '\x00' not in text:
+        return text
+    return _VALUE_TOKEN_RE.sub('\x00"\\1\x00', text)
+
+
+class Raw(object):
+    '''
+    JavaScript code that is written out as is where a value would go:
+
+        e.css('width', Raw('window.innerWidth / 2'))
+    '''
+    def __init__(self, code):
+        self.code = code
+
+    def __str__(self):
+        return self.code
+
+    def __repr__(self):
+        return 'Raw(%r)' % self.code
+
+
+#-------------------------------------------------------------------
+#   HANDLERS
+#
+
+def quote(value):
+    '''
+    Returns a string as a double quoted JavaScript string.  Everything
+    outside of ASCII is escaped and so is '</' so the result is safe to put
+    inside a <script> tag.
+    '''
+    return encode_basestring_ascii(value).replace('</', '<\\/')
+
+
+def encode_string(encoder, value, write, encode):
+    write( encode_basestring_ascii(value).replace('</', '<\\/') )
+
+
+def encode_bytes(encoder, value, write, encode):
+    write( quote(value.decode('utf-8')) )
+
+
+def encode_bool(encoder, value, write, encode):
+    write( 'true' if value else 'false' )
+
+
+def encode_none(encoder, value, write, encode):
+    write( 'null' )
+
+
+def encode_int(encoder, value, write, encode):
+    write( str(value) )
+
+
+def encode_float(encoder, value, write, encode):
+    if value != value:
+        write( 'NaN' )
+    elif value in (float('inf'), float('-inf')):
+        write( 'Infinity' if value > 0 else '-Infinity' )
+    else:
+        write( repr(value) )
+
+
+def encode_list(encoder, value, write, encode):
+    write( '[' )
+    sep = encoder.item_separator
+    for i, item in enumerate(value):
+        if i:
+            write( sep )
+        encode( item )
+    write( ']' )
+
+
+def encode_dict(encoder, value, write, encode):
+    encoder.write_object( value.items(), write, encode, encoder.item_separator )
+
+
+def encode_placeholder(encoder, value, write, encode):
+    write( value.token )
+
+
+def encode_raw(encoder, value, write, encode):
+    write( value.code )
+
+
+# Handlers that never call encode(), values they take are written without
+# going through it
+_LEAVES = frozenset([encode_string, encode_bytes, encode_bool, encode_none, encode_int,
+                     encode_float, encode_placeholder, encode_raw])
+
+
+#-------------------------------------------------------------------
+#   TYPED ARRAYS
+#
+#   Flat numeric buffers (array.array, memoryview, NumPy arrays) become
+#   JavaScript typed arrays built from their bytes in base64, which is much
+#   smaller and faster than a list of numbers.  The bytes are little endian,
+#   the byte order of every browser platform.  Anything that has no typed
+#   array to match (64 bit ints, several dimensions, ...) and anything
+#   shorter than the encoder's typed_array_threshold is a plain list.
+#
+
+# (kind, item size) -> typed array.  kind is i(nt), u(nsigned) or f(loat).
+TYPED_ARRAYS = {
+    ('i', 1): 'Int8Array',
+    ('u', 1): 'Uint8Array',
+    ('i', 2): 'Int16Array',
+    ('u', 2): 'Uint16Array',
+    ('i', 4): 'Int32Array',
+    ('u', 4): 'Uint32Array',
+    ('f', 4): 'Float32Array',
+    ('f', 8): 'Float64Array',
+}
+
+# struct / array type codes -> kind
+TYPE_CODE_KINDS = {
+    'b': 'i', 'h': 'i', 'i': 'i', 'l': 'i', 'q': 'i',
+    'B': 'u', 'H': 'u', 'I': 'u', 'L': 'u', 'Q': 'u',
+    'f': 'f', 'd': 'f',
+}
+
+# Largest integer a double holds exactly
+MAX_SAFE_INTEGER = 2 ** 53 - 1
+
+
+def _base64(buf):
+    try:
+        data = base64.b64encode(buf)
+    except TypeError:   # Python 2 wants a string
+        data = base64.b64encode(buf.tobytes() if hasattr(buf, 'tobytes') else buf.tostring())
+    if not isinstance(data, str):
+        data = data.decode('ascii')
+    return data
+
+
+def write_typed_array(name, buf, write):
+    '''
+    Writes a typed array holding the bytes of buf.
+    '''
+    write( 'new %s(Uint8Array.from(atob("' % name )
+    write( _base64(buf) )
+    write( '"),function(c){return c.charCodeAt(0)}).buffer)' )
+
+
+def encode_array(encoder, value, write, encode):
+    name = TYPED_ARRAYS.get( (TYPE_CODE_KINDS.get(value.typecode), value.itemsize) )
+    if name is None or len(value) < encoder.typed_array_threshold:
+        encode_list(encoder, value, write, encode)
+        return
+
+    if sys.byteorder != 'little':
+        value = array.array(value.typecode, value)
+        value.byteswap()
+    write_typed_array(name, value, write)
+
+
+def encode_memoryview(encoder, value, write, encode):
+    fmt = value.format
+    code = fmt.lstrip('@=<>!')
+    little = fmt[0] == '<' or (fmt[0] not in '>!' and sys.byteorder == 'little')
+    name = TYPED_ARRAYS.get( (TYPE_CODE_KINDS.get(code), value.itemsize) )
+
+    if (name is None or not little or value.ndim != 1 or not getattr(value, 'c_contiguous', True)
+            or len(value) < encoder.typed_array_threshold):
+        encode( value.tolist() )
+        return
+    write_typed_array(name, value, write)
+
+
+def encode_ndarray(encoder, value, write, encode):
+    numpy = sys.modules['numpy']
+    kind = value.dtype.kind
+    size = value.dtype.itemsize
+
+    if value.ndim == 1 and value.size >= encoder.typed_array_threshold:
+        if (kind in 'iu' and size == 8 and int(value.min()) >= -MAX_SAFE_INTEGER
+                and int(value.max()) <= MAX_SAFE_INTEGER):
+            value = value.astype('<f8')
+            kind = 'f'
+
+        name = TYPED_ARRAYS.get( (kind, size) )
+        if name is not None:
+            data = numpy.ascontiguousarray(value, dtype=value.dtype.newbyteorder('<'))
+            write_typed_array(name, data, write)
+            return
+
+    encode( value.tolist() )
+
+
+def encode_numpy_scalar(encoder, value, write, encode):
+    encode( value.item() )
+
+
+def _numpy_entry(cls):
+    '''
+    Handlers for NumPy types.  NumPy is only looked at when it has been
+    imported already, which it is if one of its values turns up.
+    '''
+    numpy = sys.modules.get('numpy')
+    if numpy is None:
+        return None
+    if issubclass(cls, numpy.ndarray):
+        return (encode_ndarray, False)
+    if issubclass(cls, numpy.generic):
+        return (encode_numpy_scalar, False)
+    return None
+
+
+def encode_node(encoder, value, write, encode):
+    '''
+    Nodes (anything with a render method) are JavaScript already.
+    '''
+    write( value.render() )
+
+
+def encode_minifiable(encoder, value, write, encode):
+    '''
+    For types whose render() takes minify (coffeepot's nodes register it),
+    so a callback inside minified output is minified too.
+    '''
+    write( value.render(minify=encoder.minify) )
+
+
+def encode_other(encoder, value, write, encode):
+    '''
+    Anything the table doesn't know about becomes a string.
+    '''
+    write( quote(text_type(value)) )
+
+
+class JSEncoder(object):
+    '''
+    Turns Python values into JavaScript.  The output looks like this:
+
+        "one", 2, { url:"/path/tostuff.html", bool:true, number:1 }
+
+    Keys that are valid identifiers are left unquoted.  Cycles in lists and
+    dicts raise a CircularReferenceError instead of recursing forever.
+    '''
+
+    # type -> (handler, is_container).  Shared by every encoder, add to it
+    # with register().
+    handlers = {}
+
+    # type -> (handler, is_container) for every type seen so far, resolved
+    # through the MRO of the type.
+    _lookup = {}
+
+    # Object keys as they are written out, most keys repeat a lot.
+    _keys = {}
+    max_keys = 10000
+
+    # Shorter numeric buffers are written as lists
+    typed_array_threshold = 64
+
+    # Passed on to the nodes found in the values, see encode_minifiable()
+    minify = False
+
+    item_separator = ", "
+    object_open = "{ "
+    object_close = " }"
+
+    @classmethod
+    def register(cls, type_, handler, container=False):
+        '''
+        Sets the handler used for values of type_ and its sub classes.  Set
+        container if values of the type can hold other values so they get
+        checked for cycles.
+        '''
+        if 'handlers' not in cls.__dict__:
+            cls.handlers = dict(cls.handlers)
+        cls.handlers[type_] = (handler, container)
+        cls._lookup = {}
+
+    def _resolve(self, cls):
+        for base in getattr(cls, '__mro__', (cls,)):
+            if base in self.handlers:
+                entry = self.handlers[base]
+                break
+        else:
+            entry = _numpy_entry(cls)
+            if entry is None:
+                if hasattr(cls, 'render'):
+                    entry = (encode_node, False)
+                else:
+                    entry = (encode_other, False)
+
+        self._lookup[cls] = entry
+        return entry
+
+    def _encoder(self, write):
+        '''
+        Returns an encode(value) function that writes into write().
+        '''
+        lookup = self._lookup
+        resolve = self._resolve
+        markers = {}
+
+        def encode(value):
+            cls = value.__class__
+            try:
+                handler, container = lookup[cls]
+            except KeyError:
+                handler, container = resolve(cls)
+
+            if not container:
+                handler(self, value, write, encode)
+                return
+
+            if handler is encode_list or handler is encode_dict:
+                self._write_nested(value, write, encode, markers)
+                return
+
+            marker = id(value)
+            if marker in markers:
+                raise CircularReferenceError('Circular reference detected in %r' % cls)
+            markers[marker] = value
+            handler(self, value, write, encode)
+            del markers[marker]
+
+        return encode
+
+    def _write_nested(self, value, write, encode, markers):
+        '''
+        Writes lists and dicts with an explicit stack instead of recursion,
+        so data nested deeper than the recursion limit still encodes.  Other
+        values found inside go through encode() as usual.
+        '''
+        lookup = self._lookup
+        keys = self._keys
+        leaves = _LEAVES
+        sep = self.item_separator
+        object_open = self.object_open
+        object_close = self.object_close
+
+        # The list or dict being written is in the locals, the ones it is
+        # nested in wait on the stack.
+        stack = []
+        item = value
+        handler = lookup[value.__class__][0]
+
+        while True:
+            if handler is not None:
+                # Start writing item
+                marker = id(item)
+                if marker in markers:
+                    raise CircularReferenceError('Circular reference detected in %r' % item.__class__)
+                markers[marker] = item
+                if handler is encode_dict:
+                    is_dict = True
+                    items = iter(item.items())
+                else:
+                    is_dict = False
+                    items = iter(item)
+                    write( '[' )
+                first = True
+                handler = None
+
+            item = next(items, _DONE)
+            if item is _DONE:
+                del markers[marker]
+                if not is_dict:
+                    write( ']' )
+                elif first:
+                    write( '{}' )
+                else:
+                    write( object_close )
+                if not stack:
+                    return
+                items, is_dict, marker, first = stack.pop()
+                continue
+
+            if is_dict:
+                key, item = item
+                write( object_open if first else sep )
+                try:
+                    write( keys[key] )
+                except KeyError:
+                    write( self._key(key) )
+            elif not first:
+                write( sep )
+            first = False
+
+            cls = item.__class__
+            try:
+                handler = lookup[cls][0]
+            except KeyError:
+                handler = self._resolve(cls)[0]
+
+            if handler is encode_list or handler is encode_dict:
+                stack.append( (items, is_dict, marker, first) )
+            elif handler in leaves:
+                handler( self, item, write, None )
+                handler = None
+            else:
+                handler = None
+                encode( item )
+
+    def write_object(self, items, write, encode, sep):
+        '''
+        Writes (key, value) pairs as a JavaScript object literal.
+        '''
+        keys = self._keys
+        first = True
+        for key, value in items:
+            if first:
+                write( self.object_open )
+                first = False
+            else:
+                write( sep )
+
+            try:
+                write( keys[key] )
+            except KeyError:
+                write( self._key(key) )
+            encode( value )
+
+        if first:
+            write( '{}' )
+        else:
+            write( self.object_close )
+
+    def _key(self, key):
+        '''
+        Returns an object key with its ':' and remembers it.
+        '''
+        if not isinstance(key, string_types):
+            # Not remembered, 1 and True would share an entry
+            return self._key( text_type(key) )
+
+        if IDENTIFIER_RE.match(key):
+            text = key + ':'
+        else:
+            text = quote(key) + ':'
+
+        if len(self._keys) >= self.max_keys:
+            self._keys.clear()
+        self._keys[key] = text
+        return text
+
+    def encode(self, value):
+        '''
+        Returns the JavaScript for a single value.
+        '''
+        buf = []
+        self._encoder(buf.append)(value)
+        return "".join(buf)
+
+    def encode_arguments(self, args, kwargs, indent=None):
+        '''
+        Returns an argument list for a JavaScript call.  Keyword arguments
+        are collected into an object literal that is passed last, which is
+        how jQuery takes its options.
+        '''
+        if not args and not kwargs:
+            return ""
+
+        buf = []
+        write = buf.append
+        lookup = self._lookup
+        leaves = _LEAVES
+        # Most arguments are strings and numbers, encode() is only made for
+        # the first one that isn't
+        encode = None
+
+        sep = self.item_separator
+        kwsep = sep
+        if indent:
+            sep = ",\n%s" % (indent * " ")
+            kwsep = sep + "  "
+
+        for i, value in enumerate(args):
+            if i:
+                write( sep )
+            try:
+                handler = lookup[value.__class__][0]
+            except KeyError:
+                handler = self._resolve(value.__class__)[0]
+            if handler in leaves:
+                handler( self, value, write, None )
+            else:
+                if encode is None:
+                    encode = self._encoder(write)
+                encode( value )
+
+        if kwargs:
+            if args:
+                write( sep )
+            keys = self._keys
+            first = True
+            for key, value in kwargs.items():
+                if first:
+                    write( self.object_open )
+                    first = False
+                else:
+                    write( kwsep )
+                try:
+                    write( keys[key] )
+                except KeyError:
+                    write( self._key(key) )
+
+                try:
+                    handler = lookup[value.__class__][0]
+                except KeyError:
+                    handler = self._resolve(value.__class__)[0]
+                if handler in leaves:
+                    handler( self, value, write, None )
+                else:
+                    if encode is None:
+                        encode = self._encoder(write)
+                    encode( value )
+            write( self.object_close )
+
+        return "".join(buf)
+
+
+for _type in string_types:
+    JSEncoder.register(_type, encode_string)
+if bytes not in string_types:
+    JSEncoder.register(bytes, encode_bytes)
+for _type in integer_types:
+    JSEncoder.register(_type, encode_int)
+JSEncoder.register(bool, encode_bool)
+JSEncoder.register(float, encode_float)
+JSEncoder.register(type(None), encode_none)
+JSEncoder.register(list, encode_list, container=True)
+JSEncoder.register(tuple, encode_list, container=True)
+JSEncoder.register(dict, encode_dict, container=True)
+JSEncoder.register(Placeholder, encode_placeholder)
+JSEncoder.register(Raw, encode_raw)
+JSEncoder.register(array.array, encode_array)
+JSEncoder.register(memoryview, encode_memoryview)
+
+class CompactJSEncoder(JSEncoder):
+    '''
+    Same as JSEncoder without any optional white space, used for minified
+    output.
+    '''
+    item_separator = ","
+    object_open = "{"
+    object_close = "}"
+    minify = True
+
+    def encode_arguments(self, args, kwargs, indent=None):
+        return super(CompactJSEncoder, self).encode_arguments(args, kwargs)
+
+
+register = JSEncoder.register
+
+default_encoder = JSEncoder()
+compact_encoder = CompactJSEncoder()
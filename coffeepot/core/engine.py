@@ -0,0 +1,89 @@
+'''
+Renders node trees of any depth without recursion.
+
+    from coffeepot.core.engine import render
+    render(g)           # same output as g.render()
+
+render() on a node renders its children through render() again, so every
+level of nesting (functions in functions, callbacks passed to methods that
+hold more callbacks) costs a few Python frames and deep enough trees hit the
+recursion limit.  This walks the tree with an explicit stack and renders it
+bottom up, so each node only picks up the finished output of its children.
+
+The output is kept in the render cache like render() does.  Nodes that can't
+be cached get a copy of their output in the cache only while the tree is
+being rendered, so don't change a tree from another thread during it.
+'''
+from coffeepot.core.node import _Node, _MethodNode, _opaque, _render_child
+
+
+def _cached(node, minify):
+    return (node._rendered_min if minify else node._rendered) is not None
+
+
+def _value_nodes(values):
+    '''
+    Yields the nodes found in method arguments, inside lists and dicts too.
+    '''
+    stack = list(values)
+    while stack:
+        value = stack.pop()
+        if isinstance(value, _Node):
+            yield value
+        elif isinstance(value, (list, tuple)):
+            stack.extend( value )
+        elif isinstance(value, dict):
+            stack.extend( value.values() )
+
+
+def _children(node):
+    for x in node.queue:
+        if isinstance(x, _Node):
+            yield x
+    if isinstance(node, _MethodNode):
+        for x in _value_nodes(node.args + tuple(node.kwargs.values())):
+            yield x
+
+
+def postorder(node, minify):
+    '''
+    Returns the nodes that need rendering, every node after its children.
+    '''
+    order = []
+    seen = set()
+    stack = [(node, False)]
+    while stack:
+        x, expanded = stack.pop()
+        if expanded:
+            order.append( x )
+            continue
+        if id(x) in seen or _opaque(x) or _cached(x, minify):
+            continue
+        seen.add( id(x) )
+        stack.append( (x, True) )
+        for child in _children(x):
+            stack.append( (child, False) )
+    return order
+
+
+def render(node, minify=None):
+    '''
+    Returns the same JavaScript as node.render(minify).
+    '''
+    if minify is None:
+        minify = node.minify
+    attr = '_rendered_min' if minify else '_rendered'
+
+    temporary = []
+    try:
+        for x in postorder(node, minify):
+            version = x._version
+            x.__dict__['_stale'] = False
+            text = "".join( x._generate(_render_child, minify) )
+            if not x.cacheable or x._version != version:
+                temporary.append( x )
+            object.__setattr__(x, attr, text)
+        return _render_child(node, minify)[0]
+    finally:
+        for x in temporary:
+            object.__setattr__(x, attr, None)
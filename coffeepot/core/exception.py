@@ -10,3 +10,27 @@ class NoSuchVisualEffectError(Exception):
     '''
     def __init__(self, message):
         super(Exception, self).__init__(message)
+
+
+class PlaceholderError(Exception):
+    '''
+    Raised when a compiled script is rendered without all of its values
+    '''
+    def __init__(self, message):
+        super(Exception, self).__init__(message)
+
+
+class CircularReferenceError(Exception):
+    '''
+    Raised when a value passed to JavaScript contains itself
+    '''
+    def __init__(self, message):
+        super(Exception, self).__init__(message)
+
+
+class IRError(Exception):
+    '''
+    Raised when a node tree can't be dumped to, or loaded from, the IR
+    '''
+    def __init__(self, message):
+        super(Exception, self).__init__(message)
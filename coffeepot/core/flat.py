@@ -0,0 +1,350 @@
+'''
+A Generator that keeps the script in a few flat arrays instead of a tree of
+node objects, for scripts with a very large number of statements.
+
+    from coffeepot.core.flat import FlatGenerator
+
+    g = FlatGenerator()
+    f = g.add_function('steve')
+    f.add_element('#bob').hide(3, t=2)
+    g.render()          # same as the node tree would give
+
+Every function, element chain, method call and script is a row in parallel
+array('i') columns (kind, two operands, and links to the next sibling and
+to the first and last child).  Strings are interned in one table and method
+arguments are kept as they were passed, so building allocates a small
+handle per function or element and nothing per method call.  Siblings are
+linked, so statements can still be added to a function after other
+statements were added elsewhere.  Rendering is one pass over the rows with
+an explicit stack.
+
+Only the common part of the builder API is there: functions, elements with
+their chains, scripts and alerts, plus add_to_queue() for any other node.
+The whole output is cached until something is added, unless the script
+holds nodes from outside (added with add_to_queue() or passed as method
+arguments), which can change without the generator knowing.
+'''
+from array import array
+
+from coffeepot.core.compiled import CompiledScript
+from coffeepot.core.encoder import compact_encoder, default_encoder, encode_minifiable, in_string, register
+from coffeepot.core.exception import JSLibraryError
+from coffeepot.core.node import library_methods, _render_child
+
+# Row kinds
+ROOT = 0
+FUNCTION = 1
+ELEMENT = 2
+METHOD = 3
+SCRIPT = 4
+ALERT = 5
+NODE = 6
+
+NONE = -1
+
+
+class _FunctionHandle(object):
+    '''
+    Returned by add_function() and function(), takes the same calls as a
+    FunctionNode.
+    '''
+    __slots__ = ('generator', 'index')
+
+    minify = False
+
+    def __init__(self, generator, index):
+        self.generator = generator
+        self.index = index
+
+    def add_element(self, name):
+        return self.generator._add_element(self.index, name)
+
+    def add_function(self, name=None, indent=0):
+        return self.generator._add_function(self.index, name, indent)
+
+    def add_script(self, script):
+        self.generator._add_text(self.index, SCRIPT, script)
+
+    def add_alert(self, alert):
+        self.generator._add_text(self.index, ALERT, alert)
+
+    def add_to_queue(self, node):
+        return self.generator._add_node(self.index, node)
+
+    def function(self, name=None, indent=0):
+        return self.generator.function(name, indent)
+
+    def render(self, minify=None):
+        if minify is None:
+            minify = self.minify
+        return self.generator._render(self.index, minify)
+
+    def __str__(self):
+        return self.render()
+
+register(_FunctionHandle, encode_minifiable)
+
+
+class _ElementHandle(object):
+    '''
+    Returned by add_element(), takes the same calls as an ElementNode.
+    '''
+    __slots__ = ('generator', 'index')
+
+    def __init__(self, generator, index):
+        self.generator = generator
+        self.index = index
+
+    def add_method(self, *args, **kwargs):
+        name = kwargs.pop('name', None)
+        if not name:
+            raise JSLibraryError('Can not create unnamed function')
+        self.generator._add_method(self.index, name, args, kwargs)
+        return self
+
+    def __getattr__(self, name):
+        methods = None if name[0] == '_' else library_methods()
+        if methods is None or name not in methods:
+            raise AttributeError("'%s' object has no attribute '%s'" % (self.__class__.__name__, name))
+
+        setattr( _ElementHandle, name, make_flat_method(name, methods[name]) )
+        return getattr(self, name)
+
+
+def make_flat_method(m, descriptor=None):
+    maximum = descriptor[1] if descriptor else None
+
+    def method(self, *args, **kwargs):
+        if maximum is not None and len(args) > maximum:
+            raise JSLibraryError('%s() takes at most %d arguments (%d given)' % (m, maximum, len(args)))
+        self.generator._add_method(self.index, m, args, kwargs)
+        return self
+    method.__name__ = str(m)
+    method.descriptor = descriptor
+    return method
+
+
+class FlatGenerator(object):
+
+    minify = False
+
+    def __init__(self):
+        self.kind = array('b')
+        self.first_operand = array('i')
+        self.second_operand = array('i')
+        self.next = array('i')
+        self.first = array('i')
+        self.last = array('i')
+
+        # Interned strings, and the argument tuples and kwargs dicts of
+        # method calls, in the order they were added
+        self.strings = []
+        self._string_index = {}
+        self.values = []
+
+        self._cache = {}
+        # Set once a node from outside is added, see render()
+        self._foreign = False
+        self._row(ROOT, NONE, NONE)
+
+    def __len__(self):
+        return len(self.kind)
+
+    def _intern(self, text):
+        try:
+            return self._string_index[text]
+        except KeyError:
+            index = self._string_index[text] = len(self.strings)
+            self.strings.append( text )
+            return index
+
+    def _value(self, value):
+        self.values.append( value )
+        return len(self.values) - 1
+
+    def _row(self, kind, first_operand, second_operand):
+        index = len(self.kind)
+        self.kind.append( kind )
+        self.first_operand.append( first_operand )
+        self.second_operand.append( second_operand )
+        self.next.append( NONE )
+        self.first.append( NONE )
+        self.last.append( NONE )
+        return index
+
+    def _append(self, parent, kind, first_operand, second_operand):
+        index = self._row(kind, first_operand, second_operand)
+        last = self.last[parent]
+        if last == NONE:
+            self.first[parent] = index
+        else:
+            self.next[last] = index
+        self.last[parent] = index
+        if self._cache:
+            self._cache = {}
+        return index
+
+    def _add_function(self, parent, name, indent):
+        index = self._append(parent, FUNCTION, self._intern(name) if name else NONE, indent or 0)
+        return _FunctionHandle(self, index)
+
+    def _add_element(self, parent, name):
+        return _ElementHandle(self, self._append(parent, ELEMENT, self._intern(name), NONE))
+
+    def _add_method(self, element, name, args, kwargs):
+        if not self._foreign:
+            for value in args + tuple(kwargs.values()):
+                if hasattr(value, 'render') and getattr(value, 'generator', None) is not self:
+                    self._foreign = True
+                    break
+        self._append(element, METHOD, self._intern(name),
+                     self._value((args, kwargs)) if args or kwargs else NONE)
+
+    def _add_text(self, parent, kind, text):
+        self._append(parent, kind, self._intern(text), NONE)
+
+    def _add_node(self, parent, node):
+        self._foreign = True
+        self._append(parent, NODE, self._value(node), NONE)
+        return node
+
+    # The builder API of a Generator
+    def add_element(self, name):
+        return self._add_element(ROOT, name)
+
+    def add_function(self, name=None, indent=0):
+        return self._add_function(ROOT, name, indent)
+
+    def function(self, name=None, indent=0):
+        '''
+        Returns a function that isn't in the script, to pass as a callback.
+        '''
+        return _FunctionHandle(self, self._row(FUNCTION, self._intern(name) if name else NONE, indent or 0))
+
+    def add_script(self, script):
+        self._add_text(ROOT, SCRIPT, script)
+
+    def add_alert(self, alert):
+        self._add_text(ROOT, ALERT, alert)
+
+    def add_to_queue(self, node):
+        '''
+        Adds any node (or object with a render() method).
+        '''
+        return self._add_node(ROOT, node)
+
+    def render(self, minify=None):
+        if minify is None:
+            minify = self.minify
+        if self._foreign:
+            return self._render(ROOT, minify)
+        try:
+            return self._cache[minify]
+        except KeyError:
+            result = self._cache[minify] = self._render(ROOT, minify)
+            return result
+
+    def compile(self, minify=None):
+        if minify is None:
+            minify = self.minify
+        return CompiledScript( self.render(minify), minify )
+
+    def __str__(self):
+        return self.render()
+
+    def _method(self, index, minify):
+        name = self.strings[self.first_operand[index]]
+        values = self.second_operand[index]
+        if values == NONE:
+            return '%s()' % name
+
+        args, kwargs = self.values[values]
+        if 'indent' in kwargs:
+            kwargs = dict(kwargs)
+            indent = kwargs.pop('indent')
+        else:
+            indent = None
+        if minify:
+            return '%s(%s)' % (name, compact_encoder.encode_arguments(args, kwargs))
+        return '%s(%s)' % (name, default_encoder.encode_arguments(args, kwargs, indent))
+
+    def _open(self, index, minify):
+        '''
+        Returns (opening, separator, closing when not empty, closing when
+        empty) for a container row.
+        '''
+        if self.kind[index] == ROOT:
+            return '', ';' if minify else ';\n', ';', ''
+
+        name = self.first_operand[index]
+        name = self.strings[name] if name != NONE else None
+        if minify:
+            opening, sep, closing = 'function(){', ';', '}'
+        else:
+            opening, sep, closing = 'function() { ', '; ', '; }'
+            indent = self.second_operand[index]
+            if indent:
+                sep = ';\n%s' % (indent * ' ')
+        if name:
+            opening = '%s:%s%s' % (name, '' if minify else ' ', opening)
+        return opening, sep, closing, '}'
+
+    def _render(self, root, minify):
+        kind = self.kind
+        first_operand = self.first_operand
+        nexts = self.next
+        strings = self.strings
+
+        out = []
+        write = out.append
+
+        opening, sep, closing, empty = self._open(root, minify)
+        write( opening )
+        # [separator, closing, empty closing, next child, count]
+        stack = [[sep, closing, empty, self.first[root], 0]]
+
+        while stack:
+            frame = stack[-1]
+            index = frame[3]
+            if index == NONE:
+                write( frame[1] if frame[4] else frame[2] )
+                stack.pop()
+                continue
+
+            frame[3] = nexts[index]
+
+            # Rows without output (an element without methods, an empty
+            # script) get no separator, like empty nodes in a tree
+            row_kind = kind[index]
+            if row_kind == NODE:
+                text = _render_child(self.values[first_operand[index]], minify)[0]
+            elif row_kind == SCRIPT:
+                text = strings[first_operand[index]]
+            elif row_kind == ELEMENT:
+                text = self.first[index] != NONE
+            else:
+                text = True
+            if not text:
+                continue
+
+            if frame[4]:
+                write( frame[0] )
+            frame[4] += 1
+
+            if row_kind == ELEMENT:
+                write( '$("%s")' % in_string(strings[first_operand[index]]) )
+                method = self.first[index]
+                while method != NONE:
+                    write( '.' )
+                    write( self._method(method, minify) )
+                    method = nexts[method]
+            elif row_kind == SCRIPT or row_kind == NODE:
+                write( text )
+            elif row_kind == FUNCTION:
+                opening, sep, closing, empty = self._open(index, minify)
+                write( opening )
+                stack.append( [sep, closing, empty, self.first[index], 0] )
+            elif row_kind == ALERT:
+                write( 'alert("%s")' % strings[first_operand[index]] )
+
+        return "".join(out)
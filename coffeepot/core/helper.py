@@ -1,3 +1,9 @@
+from coffeepot.core.encoder import Placeholder, Raw, default_encoder
+
+# Placeholder and Raw are imported from here along with the helpers
+__all__ = ['Placeholder', 'Raw', 'arg_string_for_js', 'convertValue']
+
+
 def arg_string_for_js(*args, **kwargs):
     '''
     Formats a dictionary into a string for JavaScript functions to work with.
@@ -13,50 +19,24 @@ def arg_string_for_js(*args, **kwargs):
     {'bool': True, 'color': 'green', 'number': 1, 'url': '/path/tostuff.html'}
     
     OUTPUT (normal)
-    'one', 2, {url:"/path/tostuff.html", color:"green", bool:true, number:1}
+    "one", 2, { url:"/path/tostuff.html", color:"green", bool:true, number:1 }
     
     OUTPUT (indented 4 spaces)
-    'one', 2,
-    {url:"/path/tostuff.html",
-        color:"green",
-        bool:true,
-        number:1}
-    '''
-    #kwArgList = []
-    sep = ", "
-    kwsep = sep
-    result = ""
+    "one",
+    2,
+    { url:"/path/tostuff.html",
+      color:"green",
+      bool:true,
+      number:1 }
 
-    if 'indent' in kwargs:
-        sep = ",\n%s" % (kwargs['indent'] * " ")
-        kwsep = sep + "  "
-        del( kwargs['indent'] )
-            
-    if args:
-        print "LOADING ARGS"
-        print args
-        result = sep.join([ convertValue(x) for x in args if x != {} ]) # Need to make sure the argument is not a blank dict which can cause a cycle error
-        
-            
-    if kwargs:
-        print "LOADING KWARGS"
-        print kwargs
-        if args:
-            result += sep
-        result += "{ %s }" % kwsep.join([ '%s:%s' % ( k, convertValue(v) ) for k, v in kwargs.items() ])
-    
-    return result
+    The work is done by coffeepot.core.encoder, see there for adding types.
+    '''
+    indent = kwargs.pop('indent', None)
+    return default_encoder.encode_arguments( args, kwargs, indent )
     
     
-# NEED TO ADD CYCLE CHECK MECHANISM BECAUSE OF DICTs
 def convertValue(value):
-    if isinstance( value, bool ):                           # Convert Boolean capitalization
-        return str(value).lower()
-    elif isinstance( value, int ):                          # Values that should not be in quotes
-        return str(value)
-    elif isinstance( value, dict ):                         # Values that should not be in quotes
-        return arg_string_for_js( [], kwargs=value )
-    elif isinstance( value, list ) or isinstance( value, tuple ):              # Values that should not be in quotes
-        return '[%s]' % arg_string_for_js( args=value )
-    else:                                                   # Everything else
-        return '"%s"' % value
+    '''
+    Returns the JavaScript for a single Python value.
+    '''
+    return default_encoder.encode( value )
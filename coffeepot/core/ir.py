@@ -0,0 +1,218 @@
+'''
+A compact, flat representation of node trees for caching and for sending
+trees to other processes.
+
+    data = g.dump()             # bytes, fine for memcached or a file
+    g = Generator.load(data)
+
+The IR is a list of records in tree order, one per node:
+
+    (tag, number of children, field, field, ...)
+
+Method arguments are kept as plain values.  Placeholders, Raw code, numeric
+buffers (array.array, memoryview) and nodes used as arguments (callbacks)
+are turned into marked tuples.  dump() writes the list with marshal, which
+is fast but tied to the Python version, so don't share dumps between
+interpreters.  Loading sets the node attributes directly
+instead of going through the builder methods.
+
+Only the node types registered here can be dumped, TemplateNodes can't.
+'''
+import array
+import marshal
+import sys
+
+from coffeepot.core.encoder import TYPE_CODE_KINDS, Placeholder, Raw
+from coffeepot.core.exception import IRError
+from coffeepot.core.node import (_Node, _MethodNode, _GeneratorNode, _DjangoGeneratorNode,
+                                 FunctionNode, ElementNode, EachNode, ScriptNode, AlertNode)
+
+MAGIC = b'CPIR'
+VERSION = 1
+
+# Marks tuples that stand for something other than a tuple
+MARK = '\x00coffeepot\x00'
+
+# tag -> (class, fields) and class -> tag
+TYPES = {}
+TAGS = {}
+
+
+def register(cls, tag, fields):
+    '''
+    Makes a node class dumpable.  'fields' are the instance attributes that
+    are saved, the queue is always saved.
+    '''
+    TYPES[tag] = (cls, tuple(fields))
+    TAGS[cls] = tag
+
+
+register(_GeneratorNode, 'G', ['minify'])
+register(_DjangoGeneratorNode, 'DG', ['minify'])
+register(FunctionNode, 'F', ['name', 'indent'])
+register(ElementNode, 'E', ['name'])
+register(_MethodNode, 'M', ['name', 'args', 'kwargs'])
+register(ScriptNode, 'S', ['script'])
+register(AlertNode, 'A', ['alert'])
+register(EachNode, 'EA', ['name', 'rows', 'var'])
+
+try:
+    _PLAIN = frozenset([str, unicode, int, long, float, bool, type(None)])
+except NameError:   # Python 3
+    _PLAIN = frozenset([str, bytes, int, float, bool, type(None)])
+
+
+def _tobytes(buf):
+    try:
+        return buf.tobytes()
+    except AttributeError:  # Python 2
+        return buf.tostring()
+
+
+def _array(typecode, data):
+    buf = array.array(str(typecode))
+    try:
+        buf.frombytes(data)
+    except AttributeError:  # Python 2
+        buf.fromstring(data)
+    return buf
+
+
+def _pack(value):
+    cls = value.__class__
+    if cls in _PLAIN:
+        return value
+    if cls is list:
+        return [_pack(v) for v in value]
+    if cls is tuple:
+        return tuple([_pack(v) for v in value])
+    if cls is dict:
+        return dict([(k, _pack(v)) for k, v in value.items()])
+    if isinstance(value, Placeholder):
+        return (MARK, 'p', value.name, value.raw)
+    if isinstance(value, Raw):
+        return (MARK, 'r', value.code)
+    if isinstance(value, array.array):
+        return (MARK, 'a', value.typecode, _tobytes(value))
+    if isinstance(value, memoryview):
+        code = value.format.lstrip('@=<' if sys.byteorder == 'little' else '@=>!')
+        if (value.ndim == 1 and getattr(value, 'c_contiguous', True) and code in TYPE_CODE_KINDS
+                and array.array(code).itemsize == value.itemsize):
+            return (MARK, 'v', code, value.tobytes())
+        # What the encoder would write for it anyway
+        return _pack(value.tolist())
+    if isinstance(value, _Node):
+        return (MARK, 'n', to_ir(value))
+    raise IRError("Can't dump values of type %s" % cls.__name__)
+
+
+def _unpack(value):
+    cls = value.__class__
+    if cls is tuple:
+        if value and value[0] == MARK:
+            if value[1] == 'p':
+                return Placeholder(value[2], raw=value[3])
+            if value[1] == 'r':
+                return Raw(value[2])
+            if value[1] == 'a':
+                return _array(value[2], value[3])
+            if value[1] == 'v':
+                buf = _array(value[2], value[3])
+                try:
+                    return memoryview(buf)
+                except TypeError:   # Python 2 arrays have no buffer for it
+                    return buf
+            return from_ir(value[2])
+        return tuple([_unpack(v) for v in value])
+    if cls is list:
+        return [_unpack(v) for v in value]
+    if cls is dict:
+        return dict([(k, _unpack(v)) for k, v in value.items()])
+    return value
+
+
+def to_ir(node):
+    '''
+    Returns the records for a node tree.
+    '''
+    records = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        try:
+            tag = TAGS[node.__class__]
+        except KeyError:
+            raise IRError("Can't dump %s nodes" % node.__class__.__name__)
+
+        cls, fields = TYPES[tag]
+        queue = node.queue
+        records.append( (tag, len(queue)) + tuple([_pack(getattr(node, f)) for f in fields]) )
+        stack.extend( reversed(queue) )
+    return records
+
+
+def from_ir(records, root_class=None):
+    '''
+    Builds a node tree from its records.  root_class replaces the class of
+    the top node, so Generator.load() returns a Generator.
+    '''
+    root = None
+    # [node, children still to come]
+    stack = []
+
+    for record in records:
+        try:
+            cls, fields = TYPES[record[0]]
+        except KeyError:
+            raise IRError('Unknown node tag %r' % (record[0],))
+        if root is None and root_class is not None:
+            cls = root_class
+
+        node = cls.__new__(cls)
+        attrs = node.__dict__
+        attrs['name'] = None
+        attrs['indent'] = 0
+        attrs['args'] = ()
+        attrs['kwargs'] = {}
+        attrs['queue'] = []
+        for field, value in zip(fields, record[2:]):
+            attrs[field] = _unpack(value)
+
+        if cls is _MethodNode:
+            for value in attrs['args'] + tuple(attrs['kwargs'].values()):
+                if isinstance(value, _Node) and value.parent is None:
+                    value.__dict__['parent'] = node
+
+        if stack:
+            top = stack[-1]
+            top[0].queue.append( node )
+            attrs['parent'] = top[0]
+            top[1] -= 1
+        else:
+            root = node
+
+        if record[1]:
+            stack.append( [node, record[1]] )
+        while stack and not stack[-1][1]:
+            stack.pop()
+
+    if root is None:
+        raise IRError('No nodes in the IR')
+    return root
+
+
+def dump(node):
+    '''
+    Returns a node tree as bytes.
+    '''
+    return MAGIC + bytearray([VERSION]) + marshal.dumps(to_ir(node))
+
+
+def load(data, root_class=None):
+    '''
+    Builds a node tree from bytes made by dump().
+    '''
+    data = bytes(data)
+    if data[:4] != MAGIC or bytearray(data[4:5]) != bytearray([VERSION]):
+        raise IRError('Not coffeepot IR (or a different version)')
+    return from_ir(marshal.loads(data[5:]), root_class)
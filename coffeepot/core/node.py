@@ -1,56 +1,719 @@
+import gzip
+import hashlib
+import os
+import re
+import threading
+import timeit
+import weakref
+from io import BytesIO
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    OrderedDict = None
+
 import coffeepot
 from coffeepot.core.exception import JSLibraryError
 from coffeepot.core.helper import arg_string_for_js
+from coffeepot.core.encoder import (Raw, IDENTIFIER_RE, quote, in_string, default_encoder, compact_encoder,
+                                    encode_minifiable, register)
+from coffeepot.core.compiled import CompiledScript
+
+
+#-------------------------------------------------------------------
+#   RENDER CACHE
+#
+#   Every node keeps the string it rendered last.  Changing a node (adding
+#   to its queue, setting a public attribute) clears that string on the node
+#   and on every parent above it, so only the parts of a tree that changed
+#   are generated again.  Normal and minified output are cached separately.
+#
+
+class RenderCacheStats(object):
+    '''
+    Hit/miss counters for the node render cache.  The counters are shared by
+    every node in the process and are only approximate under threads.
+    Nothing is counted until enable() is called, so rendering doesn't pay
+    for it otherwise.
+    '''
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+
+    def enable(self):
+        global _counting
+        _counting = True
+
+    def disable(self):
+        global _counting
+        _counting = False
+
+    @property
+    def enabled(self):
+        return _counting
+
+    @property
+    def ratio(self):
+        total = self.hits + self.misses
+        if not total:
+            return 0.0
+        return float(self.hits) / total
+
+    def as_dict(self):
+        return {'hits': self.hits, 'misses': self.misses, 'ratio': self.ratio}
+
+    def __repr__(self):
+        return '<RenderCacheStats hits=%d misses=%d>' % (self.hits, self.misses)
+
+cache_stats = RenderCacheStats()
+# Read by render(), set with cache_stats.enable()
+_counting = False
+
+
+def _render_child(node, minify):
+    '''
+    Renders a queued object in one go so its cache gets filled on the way.
+    '''
+    if isinstance(node, _Node):
+        return ( node.render(minify), )
+    return ( node.render(), )
+
+
+def _opaque(node):
+    '''
+    True for objects rendered as a whole by their own render(), whose
+    pieces can't be followed through _generate().
+    '''
+    if not isinstance(node, _Node):
+        return True
+    render = type(node).render
+    return render != _Node.render and render != ScriptNode.render
+
+
+# Type of a text -> the sub class _placed() copies it into, and the set of
+# those sub classes
+_placed_types = {}
+_PLACED = set()
+
+
+def _placed(text):
+    '''
+    Returns a copy of a child's text whose type marks it, for code that
+    follows the pieces of _generate() to find where each child starts.  The
+    separator before a child is only yielded once the child turned out not
+    to be empty, after it was rendered.
+    '''
+    cls = text.__class__
+    try:
+        placed = _placed_types[cls]
+    except KeyError:
+        placed = _placed_types[cls] = type('Placed', (cls,), {})
+        _PLACED.add( placed )
+    return placed(text)
+
+
+def _render_children(queue, minify):
+    '''
+    Returns the rendered text of every queued object, for _join().
+    '''
+    return [x.render(minify) if isinstance(x, _Node) else x.render() for x in queue]
+
+
+# class -> the _join() that goes with its _generate(), see _Node._join()
+_joins = {}
+
+
+def _join_for(cls):
+    for klass in cls.__mro__:
+        if '_generate' in klass.__dict__:
+            break
+    join = _joins[cls] = klass.__dict__.get('_join', _Node._join)
+    return join
+
+
+# Argument types that never need _adopt()
+try:
+    _SCALARS = frozenset([str, unicode, int, long, float, bool, type(None)])
+except NameError:   # Python 3
+    _SCALARS = frozenset([str, int, float, bool, type(None)])
+
+
+# Guards the fork and parent sets, forking a shared base from many threads
+# is fine
+_fork_lock = threading.Lock()
+
+
+# What render() uses for queued nodes, swapped out by set_render_hook()
+_child_renderer = _render_child
+
+
+def _hooked_renderer(hook):
+    clock = timeit.default_timer
+    local = threading.local()
+
+    def render_child(node, minify):
+        # Time spent in the children of the node being rendered
+        stack = getattr(local, 'stack', None)
+        if stack is None:
+            stack = local.stack = [0.0]
+        stack.append( 0.0 )
+
+        start = clock()
+        try:
+            text = _render_child(node, minify)[0]
+        finally:
+            seconds = clock() - start
+            children = stack.pop()
+            stack[-1] += seconds
+
+        hook(node, seconds, seconds - children, text)
+        return ( text, )
+
+    return render_child
+
+
+def set_render_hook(hook):
+    '''
+    Calls hook(node, seconds, own_seconds, text) each time render() renders
+    a queued node (the node render() was called on isn't reported, its time
+    is the total).  seconds includes the node's children, own_seconds
+    doesn't.  Returns the hook that was set before, pass it (or None) back
+    to restore it.
+
+    The hook is process wide.  Without one, rendering does no extra work.
+    '''
+    global _child_renderer
+    previous = getattr(_child_renderer, 'hook', None)
+    if hook is None:
+        _child_renderer = _render_child
+    else:
+        _child_renderer = _hooked_renderer(hook)
+        _child_renderer.hook = hook
+    return previous
+
+
+def _iter_render(node, minify):
+    '''
+    Streams any queued object.  Nodes provide iter_render(), anything else
+    only has to have a render() method that returns a string.
+    '''
+    if isinstance(node, _Node):
+        return node.iter_render(minify)
+    return iter( (node.render(),) )
+
+
+def _to_bytes(text):
+    if isinstance(text, bytes):
+        return text
+    return text.encode('utf-8')
+
+
+def _gzip(text, compresslevel=9):
+    buf = BytesIO()
+    # mtime is fixed so the same script always gives the same bytes
+    f = gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=compresslevel, mtime=0)
+    f.write( _to_bytes(text) )
+    f.close()
+    return buf.getvalue()
+
+
+def _content_etag(text):
+    return '"%s"' % hashlib.sha1( _to_bytes(text) ).hexdigest()
+
+
+def _chunked(pieces, chunk_size):
+    '''
+    Groups a stream of small strings into chunks of at least chunk_size.
+    '''
+    buf = []
+    size = 0
+    for piece in pieces:
+        buf.append( piece )
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buf)
+            buf = []
+            size = 0
+    if buf:
+        yield "".join(buf)
+
 
 class _Node(object):
     '''
     Foundation Class for all nodes.  All should inherit from this.
     '''
 
+    # Set to False on node types whose output can change without the tree
+    # knowing about it (templates rendered with a mutable context, etc).
+    cacheable = True
+
+    # Set on node types whose render() waits on something (loading files,
+    # the database through a template).  Async rendering runs them in a
+    # thread pool.  Like uncacheable nodes they stop their parents caching.
+    blocking = False
+
+    # Set on nodes whose statement can run twice without changing anything
+    # (loading a library, defining a variable).  A Bundle leaves such a
+    # statement out when an earlier Generator already has it.
+    idempotent = False
+
+    # Render the most compact JavaScript instead of the readable form.  Set
+    # it on the Generator or pass minify to render().
+    minify = False
+
+    parent = None
+    _rendered = None
+    _rendered_min = None
+    _gzipped = None
+    _etag = None
+    _version = 0
+    # Bumped only on the node that was changed, not on its parents
+    _self_version = 0
+    # Set on forks until their queue is copied, see fork()
+    _shared_queue = False
+    # Forks of this node (a WeakSet), they are invalidated with it
+    _forks = None
+    # Nodes this one was added to after the first (parent), as a WeakSet.
+    # A callback passed to two chains has to invalidate both.
+    _parents = None
+    # True from a change until the node is rendered again.  The parents of
+    # a stale node were invalidated with it, so invalidate() stops there.
+    # New nodes are stale, building a tree doesn't invalidate anything.
+    _stale = True
+
+    # Public attributes that don't change the output, setting them leaves
+    # the cache alone.
+    _untracked = frozenset(['parent', 'minify', 'cache_control', 'idempotent'])
+
     def __init__(self, *args, **kwargs):
-        self.name = kwargs.get('name', None)
-        self.indent = kwargs.get('indent', 0)
-        self.args = args
-        self.kwargs = kwargs
+        # Nothing can have rendered a new node, so constructors write to
+        # __dict__ and skip the invalidation in __setattr__
+        attrs = self.__dict__
+        attrs['name'] = kwargs.get('name')
+        attrs['indent'] = kwargs.get('indent', 0)
+        attrs['args'] = args
+        attrs['kwargs'] = kwargs
+        attrs['queue'] = []
         
         #self.print_args()
         
-        self.reset_queue()
-        
     def __str__(self):
         '''
         Added this built-in so the code can be rendered when called by a
         formatted string.
         '''
         return self.render()
+
+    def __setattr__(self, name, value):
+        '''
+        Any change to a public attribute makes the cached output stale.
+        '''
+        object.__setattr__(self, name, value)
+        if name[0] != '_' and name not in self._untracked:
+            self.invalidate()
+
+    def invalidate(self):
+        '''
+        Drops the cached output of this node and every node above it.  Call
+        this yourself if you change something the node can't see, like a
+        list that was passed in as a method argument.
+        '''
+        # The bookkeeping goes straight to __dict__, __setattr__ would only
+        # look at it and pass it on.
+        self.__dict__['_self_version'] = self._self_version + 1
+        if self._stale and not self._forks:
+            return
+        self._invalidate_up()
+
+    def _invalidate_up(self):
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            forks = node._forks
+            if node._stale and not forks:
+                continue
+
+            attrs = node.__dict__
+            attrs['_version'] = node._version + 1
+            attrs['_stale'] = True
+            attrs['_rendered'] = None
+            attrs['_rendered_min'] = None
+            attrs['_gzipped'] = None
+            attrs['_etag'] = None
+
+            if forks:
+                with _fork_lock:
+                    forks = list(forks)
+                for fork in forks:
+                    fork.__dict__['_self_version'] = fork._self_version + 1
+                    stack.append( fork )
+            if node.parent is not None:
+                stack.append( node.parent )
+                if node._parents:
+                    with _fork_lock:
+                        stack.extend( node._parents )
+
+    def clear_cache(self):
+        '''
+        Drops the cached output of this node and everything below it.
+        '''
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            node._rendered = None
+            node._rendered_min = None
+            node._gzipped = None
+            node._etag = None
+            stack.extend( node._nodes() )
+
+    def _nodes(self):
+        '''
+        Returns the nodes directly below this one.
+        '''
+        return [x for x in self.queue if isinstance(x, _Node)]
+
+    def _all_parents(self):
+        '''
+        Returns every node this one was added to.
+        '''
+        if self.parent is None:
+            return []
+        if not self._parents:
+            return [self.parent]
+        with _fork_lock:
+            return [self.parent] + list(self._parents)
+
+    def _adopt(self, node):
+        '''
+        Hooks a child up to this node so its changes reach our cache.
+        '''
+        if isinstance(node, _Node):
+            if node.parent is None:
+                node.__dict__['parent'] = self
+            elif node.parent is not self:
+                with _fork_lock:
+                    if node._parents is None:
+                        node._parents = weakref.WeakSet()
+                    node._parents.add( self )
+            if node.cacheable and not node.blocking:
+                return
+        elif not hasattr(node, 'render'):
+            return
+
+        # Anything we can't track keeps this node, and its parents, from
+        # holding on to a rendered copy.
+        stack = [self]
+        while stack:
+            parent = stack.pop()
+            if parent.cacheable:
+                object.__setattr__(parent, 'cacheable', False)
+                stack.extend( parent._all_parents() )
         
     def reset_queue(self):
         '''
         Set the queue back to nothing.
         '''
+        self._shared_queue = False
         self.queue = []
 
+    def _own_queue(self):
+        '''
+        Gives a fork its own copy of the queue before it is changed.
+        '''
+        object.__setattr__(self, 'queue', list(self.queue))
+        self._shared_queue = False
+
+    def fork(self):
+        '''
+        Returns a cheap copy of the node that shares its queue, and so every
+        node below it, until the copy is changed.  Build the common part of
+        a script once and fork it for each request:
+
+            page = base.fork()
+            page.add_script('init(%d)' % user.id)     # base is untouched
+
+        Adding to a fork's queue copies the queue first.  To change a node
+        further down get a fork of it with fork_child() instead of editing
+        it.  Shared nodes keep their cached output, so rendering a fork only
+        generates what the fork changed.  Forking doesn't change the base,
+        so one base can be forked from many threads.  Changing the base
+        afterwards does reach its forks.
+        '''
+        cls = self.__class__
+        node = cls.__new__(cls)
+        attrs = node.__dict__
+        attrs.update( self.__dict__ )
+        attrs.pop('_forks', None)
+        attrs.pop('_parents', None)
+        attrs['parent'] = None
+        attrs['_shared_queue'] = True
+
+        with _fork_lock:
+            if self._forks is None:
+                self._forks = weakref.WeakSet()
+            self._forks.add( node )
+        return node
+
+    def fork_child(self, index):
+        '''
+        Swaps the queued node at index for a fork of it and returns that, so
+        it can be changed without touching what this node was forked from.
+        '''
+        if self._shared_queue:
+            self._own_queue()
+        child = self.queue[index].fork()
+        child.parent = self
+        self.queue[index] = child
+        return child
+
     def add_to_queue(self, node):
         '''
         Anything can be added to the render queue as long as it has a 'render()' 
         method and it returns a string.
         '''
+        if self._shared_queue:
+            self._own_queue()
         self.queue.append( node )
+
+        # Trees are built with this, so the common cases of _adopt() and
+        # invalidate() are done inline: a new cacheable node gets its
+        # parent, and a node that is still stale only counts the change.
+        if isinstance(node, _Node) and node.parent is None and node.cacheable and not node.blocking:
+            node.__dict__['parent'] = self
+        else:
+            self._adopt( node )
+
+        attrs = self.__dict__
+        attrs['_self_version'] = self._self_version + 1
+        if not self._stale or self._forks:
+            self._invalidate_up()
         return node
-        
-    def render(self):
+
+    def render(self, minify=None):
         '''
-        Render method generates the JavaScript code for the node.
+        Render method generates the JavaScript code for the node.  minify
+        overrides the node's own minify setting for this call.
         '''
-        if not self.queue:
-            return ""
+        if minify is None:
+            minify = self.minify
+
+        # This runs for every node of a tree, the cache fields are read and
+        # written through __dict__ (they default to the class attributes)
+        attrs = self.__dict__
+        key = '_rendered_min' if minify else '_rendered'
+        cached = attrs.get(key)
+        if cached is not None:
+            if _counting:
+                cache_stats.hits += 1
+            return cached
+
+        if _counting:
+            cache_stats.misses += 1
+        version = attrs.get('_version', 0)
+        attrs['_stale'] = False
+        if _child_renderer is _render_child:
+            try:
+                join = _joins[self.__class__]
+            except KeyError:
+                join = _join_for(self.__class__)
+            result = join(self, minify)
+        else:
+            # The render hook has to see every child
+            result = "".join( self._generate(_child_renderer, minify) )
+
+        if self.cacheable and attrs.get('_version', 0) == version:
+            attrs[key] = result
+        return result
+
+    def render_iterative(self, minify=None):
+        '''
+        Same as render() but without recursion, for trees nested deeper
+        than the recursion limit allows.  See coffeepot.core.engine.
+        '''
+        from coffeepot.core.engine import render
+        return render(self, minify)
+
+    def iter_render(self, minify=None):
+        '''
+        Generator version of render().  Yields the JavaScript in pieces as it
+        walks the tree so nothing has to be joined until the caller wants it.
+        Cached output is used where there is some, but streaming never fills
+        the cache so memory stays flat.
+        '''
+        if minify is None:
+            minify = self.minify
+
+        cached = self._rendered_min if minify else self._rendered
+        if cached is not None:
+            if _counting:
+                cache_stats.hits += 1
+            return iter( (cached,) )
+
+        if _counting:
+            cache_stats.misses += 1
+        return self._generate(_iter_render, minify)
+
+    def _generate(self, child, minify):
+        '''
+        Yields the pieces of this node.  Sub classes override this, using
+        child(node, minify) to get the pieces of each queued node.
+        '''
+        return iter(())
+
+    def _join(self, minify):
+        '''
+        Returns what _generate() yields as one string, render() calls it
+        when there is no render hook.  Sub classes can write it with lists
+        and str.join, which is much cheaper than going through generators.
+        It is only used for the class that defines _generate() next to it,
+        a sub class that overrides just _generate() gets this one.
+        '''
+        return "".join( self._generate(_render_child, minify) )
+
+    def render_gzip(self, minify=None, compresslevel=9):
+        '''
+        Returns the rendered JavaScript as gzip compressed bytes (UTF-8).
+        The compressed bytes are cached with the rendered output so a script
+        that doesn't change is only compressed once.
+        '''
+        if minify is None:
+            minify = self.minify
+
+        cached = self._gzipped
+        if cached is not None and cached[0] == (minify, compresslevel):
+            return cached[1]
+
+        version = self._version
+        result = _gzip( self.render(minify), compresslevel )
+
+        if self.cacheable and self._version == version:
+            self._gzipped = ( (minify, compresslevel), result )
+        return result
+
+    def etag(self, minify=None):
+        '''
+        Returns a strong HTTP ETag made from a hash of the rendered output.
+        It is cached with the output, so asking again for a tree that hasn't
+        changed doesn't render or hash anything.
+        '''
+        if minify is None:
+            minify = self.minify
+
+        cached = self._etag
+        if cached is not None and cached[0] == minify:
+            return cached[1]
+
+        version = self._version
+        result = _content_etag( self.render(minify) )
+
+        if self.cacheable and self._version == version:
+            self._etag = (minify, result)
+        return result
+
+    def cached_etag(self, minify=None):
+        '''
+        Returns the ETag only if it can be had without rendering, else None.
+        '''
+        if minify is None:
+            minify = self.minify
+
+        cached = self._etag
+        if cached is not None and cached[0] == minify:
+            return cached[1]
+        if (self._rendered_min if minify else self._rendered) is not None:
+            return self.etag(minify)
+        return None
+
+    def arender(self, minify=None):
+        '''
+        Returns a coroutine that renders the node for async code (Python 3).
+        Blocking nodes are rendered in a thread pool and the queues above
+        them are rendered concurrently.  See coffeepot.core.aio.
+        '''
+        from coffeepot.core.aio import arender
+        return arender(self, minify)
+
+    def snapshot(self, minify=None):
+        '''
+        Renders the tree and returns a Snapshot whose update() re-renders
+        only what changed since and reports the changed spans.  See
+        coffeepot.core.diff.
+        '''
+        from coffeepot.core.diff import Snapshot
+        return Snapshot(self, minify)
+
+    def render_pooled(self, minify=None, min_count=2):
+        '''
+        Renders the tree with string literals that repeat a lot declared
+        once as constants.  Returns a Pooled with the text and the bytes
+        saved.  See coffeepot.core.pool.
+        '''
+        from coffeepot.core.pool import render_pooled
+        return render_pooled(self, minify, min_count)
+
+    def dump(self):
+        '''
+        Returns the tree as compact bytes for a cache or another process.
+        See coffeepot.core.ir.
+        '''
+        from coffeepot.core import ir
+        return ir.dump(self)
+
+    @classmethod
+    def load(cls, data):
+        '''
+        Rebuilds a tree from dump() output, the top node will be a cls.
+        '''
+        from coffeepot.core import ir
+        return ir.load(data, cls)
+
+    def compile(self, minify=None):
+        '''
+        Renders the node once and returns a CompiledScript.  Any Placeholder
+        values in the tree become slots that are filled in by the compiled
+        script's render(**values), which skips the node tree entirely.
+        '''
+        if minify is None:
+            minify = self.minify
+        return CompiledScript( self.render(minify), minify )
+
+    def iter_chunks(self, chunk_size=8192, minify=None):
+        '''
+        Same as iter_render() but groups the small pieces into chunks of at
+        least 'chunk_size' characters.  Use this when handing the output to
+        a socket or a streaming response.
+        '''
+        return _chunked( self.iter_render(minify), chunk_size )
+
+    def render_to(self, fileobj, chunk_size=8192, minify=None):
+        '''
+        Writes the JavaScript to a file like object as it is generated.
+        '''
+        for chunk in self.iter_chunks(chunk_size, minify):
+            fileobj.write( chunk )
             
     def print_args(self):
-        print "\nSETTING FOR: %s" % self.__class__.__name__
-        print "ARGS"
-        print self.args
-        print "KWARGS"
-        print self.kwargs
+        print( "\nSETTING FOR: %s" % self.__class__.__name__ )
+        print( "ARGS" )
+        print( self.args )
+        print( "KWARGS" )
+        print( self.kwargs )
+
+
+def encode_node(encoder, value, write, encode):
+    '''
+    Callbacks passed as method arguments render in the encoder's mode, and
+    go through the render hook like queued nodes when one is set.
+    '''
+    if _child_renderer is _render_child:
+        encode_minifiable(encoder, value, write, encode)
+    else:
+        write( _child_renderer(value, encoder.minify)[0] )
+
+register(_Node, encode_node)
 
 
 class _MethodNode(_Node):
@@ -62,17 +725,51 @@ class _MethodNode(_Node):
     '''
 
     def __init__(self, *args, **kwargs):
-        self.reset_queue()
-        self.name = kwargs.pop('name', None)
-        self.args = args
-        self.kwargs = kwargs
+        attrs = self.__dict__
+        attrs['queue'] = []
+        attrs['name'] = kwargs.pop('name', None)
+        attrs['args'] = args
+        attrs['kwargs'] = kwargs
 
-        self.print_args()
+        for value in args + tuple(kwargs.values()):
+            self._adopt( value )
 
-    def render(self):
+    @classmethod
+    def _make(cls, name, args, kwargs):
+        '''
+        Builds a method node from the arguments of a library method call.
+        The node is new, so nothing can have cached it yet and the
+        attributes are set without invalidating on each one.
+        '''
+        node = cls.__new__(cls)
+        attrs = node.__dict__
+        attrs['queue'] = []
+        attrs['name'] = name
+        attrs['args'] = args
+        attrs['kwargs'] = kwargs
+        for value in args:
+            if value.__class__ not in _SCALARS:
+                node._adopt( value )
+        if kwargs:
+            for value in kwargs.values():
+                if value.__class__ not in _SCALARS:
+                    node._adopt( value )
+        return node
+
+    def _nodes(self):
+        return [x for x in self.args + tuple(self.kwargs.values()) if isinstance(x, _Node)]
+
+    def _generate(self, child, minify):
+        yield self._join(minify)
+
+    def _join(self, minify):
         if not self.name:
             raise JSLibraryError('Can not create unnamed function')
-            
+
+        if minify:
+            kwargs = dict(self.kwargs)
+            kwargs.pop('indent', None)
+            return '%s(%s)' % (self.name, compact_encoder.encode_arguments( self.args, kwargs ) )
         return '%s(%s)' % (self.name, arg_string_for_js( *self.args, **self.kwargs) )
 
 
@@ -83,11 +780,40 @@ class _GeneratorNode(_Node):
     else from.
     '''
 
-    def render(self):
-        if not self.queue:
+    def _generate(self, child, minify):
+        sep = ";" if minify else ";\n"
+
+        # Children without output (a false IfNode) get no separator
+        written = False
+        for x in self.queue:
+            lead = sep if written else None
+            for chunk in child(x, minify):
+                if not chunk:
+                    continue
+                if lead is not None:
+                    yield lead
+                    lead = None
+                written = True
+                yield chunk
+
+        if written:
+            yield ";"
+
+    def _join(self, minify):
+        parts = _render_children(self.queue, minify)
+        if "" in parts:
+            parts = [x for x in parts if x]
+        if not parts:
             return ""
+        return (";" if minify else ";\n").join( parts ) + ";"
 
-        return ";\n".join( [x.render() for x in self.queue] ) + ";"
+    def optimize(self):
+        '''
+        Returns a copy of the tree with repeated jQuery selectors merged or
+        cached in variables.  See coffeepot.core.optimizer.
+        '''
+        from coffeepot.core.optimizer import optimize
+        return optimize(self)
 
     # CONVIENENCE FUNCTIONS
     def function(self, name=None, indent=0):
@@ -117,29 +843,156 @@ class _GeneratorNode(_Node):
     def add_element(self, name):
         return self.add_to_queue( self.element(name) )
 
+    def each(self, rows, selector, var='row'):
+        '''
+        Creates an EachNode that runs one element chain for every row.
+        '''
+        return EachNode(rows, selector, var)
+
+    def add_each(self, rows, selector, var='row'):
+        return self.add_to_queue( self.each(rows, selector, var) )
+
+    def lazy(self, build, memoize=False):
+        '''
+        Creates a LazyNode that calls build() for its subtree when rendered.
+        '''
+        return LazyNode(build, memoize)
 
-class ScriptNode(object):
+    def add_lazy(self, build, memoize=False):
+        return self.add_to_queue( self.lazy(build, memoize) )
+
+    def add_if(self, predicate, build, memoize=False):
+        '''
+        Adds an IfNode, build() is only called when predicate is true at
+        render time.
+        '''
+        return self.add_to_queue( IfNode(predicate, build, memoize) )
+
+
+class ScriptNode(_Node):
     '''
     A Script node is one that assumes you are giving it proper raw JavaScript.
     It does not try to generate JavaScript of it's own but instead provide a 
     place to add whatever you want.  This was created so it can be inserted
     into a Generator chain like other nodes.
     '''
+    # Scripts are the most common node and hardly ever get children, so
+    # what _Node.__init__() would set lives on the class.  The queue is
+    # copied by _own_queue() before anything is added to it.
+    name = None
+    indent = 0
+    args = ()
+    kwargs = {}
+    queue = ()
+    _shared_queue = True
+
     def __init__(self, script):
-        self.script = script
+        self.__dict__['script'] = script
 
-    def render(self):
+    def render(self, minify=None):
+        # A script is its own output, so there is nothing worth caching and
+        # the bookkeeping of _Node.render() would cost more than the render.
+        # Sub classes with their own _generate() go through it as usual.
+        cls = self.__class__
+        if cls is not ScriptNode and (_joins.get(cls) or _join_for(cls)) is not _script_join:
+            return _Node.render(self, minify)
+        self.__dict__['_stale'] = False
         return self.script
 
+    def _generate(self, child, minify):
+        yield self.script
+
+    def _join(self, minify):
+        return self.script
+
+_script_join = ScriptNode.__dict__['_join']
+
+
+class LazyNode(_Node):
+    '''
+    Builds its subtree when it is rendered instead of up front:
+
+        g.add_lazy(lambda: build_admin_menu(user))
+
+    build() returns a node (or anything with a render() method), or None
+    for no output.  A lazy node builds again on every render, so it is never
+    cached.  With memoize the first tree built is kept and cached like any
+    other, reset() throws it away.
+    '''
+    _built = None
+
+    def __init__(self, build, memoize=False):
+        super(LazyNode, self).__init__()
+        attrs = self.__dict__
+        attrs['build'] = build
+        attrs['memoize'] = memoize
+        attrs['cacheable'] = memoize
+
+    def built(self):
+        '''
+        Returns the subtree, building it if needed.
+        '''
+        if self._built is not None:
+            return self._built
+
+        node = self.build()
+        if self.memoize and node is not None:
+            self._built = node
+            self._adopt( node )
+        return node
+
+    def reset(self):
+        self._built = None
+        self.invalidate()
+
+    def _generate(self, child, minify):
+        node = self.built()
+        if node is None:
+            return
+        for chunk in child(node, minify):
+            yield chunk
+
+    def _join(self, minify):
+        node = self.built()
+        if node is None:
+            return ""
+        return _render_children((node,), minify)[0]
 
-class AlertNode(object):
+
+class IfNode(LazyNode):
+    '''
+    A LazyNode that only builds when predicate (a value, or a callable
+    asked at render time) is true, otherwise it has no output.  It is never
+    cached since the predicate can change.
+    '''
+
+    def __init__(self, predicate, build, memoize=False):
+        super(IfNode, self).__init__(build, memoize)
+        attrs = self.__dict__
+        attrs['predicate'] = predicate
+        attrs['cacheable'] = False
+
+    def built(self):
+        predicate = self.predicate
+        if callable(predicate):
+            predicate = predicate()
+        if not predicate:
+            return None
+        return super(IfNode, self).built()
+
+
+class AlertNode(_Node):
     '''
     Creates a standard JavaScript alert dialogue
     '''
     def __init__(self, alert):
-        self.alert = alert
+        super(AlertNode, self).__init__()
+        self.__dict__['alert'] = alert
+
+    def _generate(self, child, minify):
+        yield self._join(minify)
 
-    def render(self):
+    def _join(self, minify):
         return 'alert("%s")' % self.alert
 
 
@@ -154,28 +1007,55 @@ class FunctionNode( _GeneratorNode ):
 
     def __init__(self, name=None, indent=None):
         super(FunctionNode, self).__init__(name=name)
-        self.indent = indent
+        self.__dict__['indent'] = indent
 
-    def render(self):
-        result = ""
-        sep = "; "
+    def _parts(self, minify):
+        '''
+        Returns (opening, separator, closing).
+        '''
+        if minify:
+            sep = ";"
+            opening = "function(){"
+            closing = "}"
+        else:
+            sep = "; "
+            opening = "function() { "
+            closing = "; }"
 
-        if self.indent:
-            sep = ";\n%s" % (self.indent * " ")
+            if self.indent:
+                sep = ";\n%s" % (self.indent * " ")
 
         if self.name:
-            result += "%s: function() { " % self.name
-        else:
-            result += "function() { "
+            opening = "%s:%s%s" % (self.name, "" if minify else " ", opening)
+        return opening, sep, closing
 
-        result += sep.join([x.render() for x in self.queue])
-        
-        if self.queue:
-            result +=  "; }"
-        else:
-            result +=  "}"
-            
-        return result
+    def _generate(self, child, minify):
+        opening, sep, closing = self._parts(minify)
+        yield opening
+
+        # Children without output (a false IfNode) get no separator
+        written = False
+        for x in self.queue:
+            lead = sep if written else None
+            for chunk in child(x, minify):
+                if not chunk:
+                    continue
+                if lead is not None:
+                    yield lead
+                    lead = None
+                written = True
+                yield chunk
+
+        yield closing if written else "}"
+
+    def _join(self, minify):
+        opening, sep, closing = self._parts(minify)
+        parts = _render_children(self.queue, minify)
+        if "" in parts:
+            parts = [x for x in parts if x]
+        if not parts:
+            return opening + "}"
+        return opening + sep.join( parts ) + closing
         
 
 class ElementNode( _Node ):
@@ -191,7 +1071,13 @@ class ElementNode( _Node ):
     '''
 
     def __init__(self, name):
-        super(ElementNode, self).__init__(name=name)
+        # Same as _Node.__init__(name=name) without the call
+        attrs = self.__dict__
+        attrs['name'] = name
+        attrs['indent'] = 0
+        attrs['args'] = ()
+        attrs['kwargs'] = {'name': name}
+        attrs['queue'] = []
 
     #def add_method(self, name, args=[], kwargs={}):
     #    self.queue.append( _MethodNode(name, args, kwargs) )
@@ -206,110 +1092,604 @@ class ElementNode( _Node ):
         #print kwargs
         
         #self.queue.append( _MethodNode(*args, name=name, **kwargs) )
-        self.queue.append( _MethodNode(*args, **kwargs) )
+        self.add_to_queue( _MethodNode(*args, **kwargs) )
+
+    def __getattr__(self, name):
+        '''
+        Only called for attributes that don't exist.  Library methods are
+        created here the first time they are asked for.
+        '''
+        methods = None if name[0] == '_' else library_methods()
+        if methods is None or name not in methods:
+            raise AttributeError("'%s' object has no attribute '%s'" % (self.__class__.__name__, name))
 
-    def render(self):
+        setattr( ElementNode, name, make_method(name, methods[name]) )
+        return getattr(self, name)
+
+    def _generate(self, child, minify):
         if not self.queue:
+            return
+
+        yield '$("%s")' % in_string(self.name)
+
+        for x in self.queue:
+            yield '.'
+            for chunk in child(x, minify):
+                yield chunk
+
+    def _join(self, minify):
+        if not self.queue:
+            return ""
+        return '$("%s").%s' % (in_string(self.name), '.'.join( _render_children(self.queue, minify) ))
+
+
+# %(field)s or %s in an EachNode selector
+FIELD_RE = re.compile(r'%\((\w+)\)s|%s')
+
+
+class EachNode( ElementNode ):
+    '''
+    One element chain applied to every row of some data.  Instead of a
+    statement per row the rows go out once as an array with a loop over it:
+
+        each = g.add_each([{'id': 1, 'label': 'One'}, ...], '#row-%(id)s')
+        each.html(each.field('label')).show()
+
+        $.each([{ id:1, label:"One" }, ...], function(i, row) {
+            $("#row-" + row.id).html(row.label).show(); })
+
+    The selector takes %(field)s for fields of dict rows or %s for the row
+    itself.  field() (or Raw) puts row values into method arguments.
+    '''
+
+    def __init__(self, rows, selector, var='row'):
+        super(EachNode, self).__init__(selector)
+        attrs = self.__dict__
+        attrs['rows'] = list(rows)
+        attrs['var'] = var
+
+    def field(self, name=None):
+        '''
+        Returns the JavaScript for a field of the current row, or the row
+        itself without a name.
+        '''
+        if name is None:
+            return Raw(self.var)
+        if IDENTIFIER_RE.match(name):
+            return Raw('%s.%s' % (self.var, name))
+        return Raw('%s[%s]' % (self.var, quote(name)))
+
+    def selector(self, minify):
+        '''
+        The selector as a JavaScript expression.
+        '''
+        parts = []
+        pos = 0
+        for match in FIELD_RE.finditer(self.name):
+            if match.start() > pos:
+                parts.append( quote(self.name[pos:match.start()]) )
+            parts.append( self.field(match.group(1)).code )
+            pos = match.end()
+        if pos < len(self.name) or not parts:
+            parts.append( quote(self.name[pos:]) )
+        return ('+' if minify else ' + ').join(parts)
+
+    def _generate(self, child, minify):
+        if not self.queue or not self.rows:
+            return
+
+        yield self._opening(minify)
+
+        for x in self.queue:
+            yield '.'
+            for chunk in child(x, minify):
+                yield chunk
+
+        yield '})' if minify else '; })'
+
+    def _join(self, minify):
+        if not self.queue or not self.rows:
             return ""
+        return '%s.%s%s' % (self._opening(minify), '.'.join( _render_children(self.queue, minify) ),
+                            '})' if minify else '; })')
+
+    def _opening(self, minify):
+        if minify:
+            return '$.each(%s,function(i,%s){$(%s)' % (compact_encoder.encode(self.rows), self.var,
+                                                       self.selector(minify))
+        return '$.each(%s, function(i, %s) { $(%s)' % (default_encoder.encode(self.rows), self.var,
+                                                       self.selector(minify))
+
+
+#-------------------------------------------------------------------
+#   LIBRARY METHODS
+#
+#   The methods of the JS library in coffeepot.JSLIB are put on ElementNode
+#   the first time each one is used (see ElementNode.__getattr__), so
+#   importing doesn't pay for methods that are never called.
+#
+#   Which methods a library has, and how many arguments each takes, comes
+#   from a module generated from a table (coffeepot/jquery/spec.py for
+#   jQuery).  That module is only imported when the first method is asked
+#   for.
+#
 
-        return '$("%s").%s' % (self.name, '.'.join([x.render() for x in self.queue]) )
+# Library -> module with the generated METHODS descriptors
+LIBRARY_MODULES = {
+    'jquery': 'coffeepot.jquery.methods',
+}
 
+# Library -> METHODS, filled in as the modules are imported
+_library_methods = {}
 
-# Add JQuery Functions to the Element Node
-if coffeepot.JSLIB in ['jquery']:
-    def make_method(m):
-        def temp(self, *args, **kwargs):
-            #print args
-            #print kwargs
-            kwargs['name'] = m
-            self.add_method(*args, **kwargs)
+# Set on every node instance, so library methods with these names (jQuery's
+# queue()) have to be added with add_method().  The same goes for names the
+# node classes define, like parent and load.
+_NODE_ATTRIBUTES = frozenset(['queue', 'name', 'args', 'kwargs', 'indent'])
+
+# The methods ElementNode had before the full jQuery table, kept for code
+# that imports it.
+methodList = ['click', 'show', 'hide', 'append', 'before', 'after', 'prepend', 'insertBefore', 'insertAfter', 'replaceWith', 'html']
+
+
+def library_methods(library=None):
+    '''
+    Returns {name: (minimum, maximum, kinds)} for the methods of a library
+    (coffeepot.JSLIB by default), or None for a library without any.
+    '''
+    library = library or coffeepot.JSLIB
+    methods = _library_methods.get(library)
+    if methods is None:
+        module = LIBRARY_MODULES.get(library)
+        if module is None:
+            return None
+        methods = _library_methods[library] = __import__(module, fromlist=['METHODS']).METHODS
+    return methods
+
+
+def make_method(m, descriptor=None):
+    '''
+    Returns the ElementNode method for library method m.  The arguments are
+    only checked against the descriptor's maximum, the kinds are there for
+    tools and documentation.
+    '''
+    make = _MethodNode._make
+    maximum = descriptor[1] if descriptor else None
+
+    if maximum is None:
+        def method(self, *args, **kwargs):
+            self.add_to_queue( make(m, args, kwargs) )
+            return self
+    else:
+        def method(self, *args, **kwargs):
+            if len(args) > maximum:
+                raise JSLibraryError('%s() takes at most %d arguments (%d given)' % (m, maximum, len(args)))
+            self.add_to_queue( make(m, args, kwargs) )
             return self
-        return temp
-    
-    # This list should probably be automaticly generated.
-    methodList = ['click', 'show', 'hide', 'append', 'before', 'after', 'prepend', 'insertBefore', 'insertAfter', 'replaceWith', 'html']
 
-    for m in methodList:
-        # NEED TO ADD CHECK TO MAKE SURE IT'S NOT ALREADY THERE
-        setattr( ElementNode, m, make_method(m) )
+    method.__name__ = str(m)
+    method.descriptor = descriptor
+    return method
+
+
+def attach_methods(library=None):
+    '''
+    Puts every method of a library on ElementNode right away instead of on
+    first use, for anything that needs to see them with dir().
+    '''
+    methods = library_methods(library) or {}
+    for m, descriptor in methods.items():
+        if not hasattr(ElementNode, m) and m not in _NODE_ATTRIBUTES:
+            setattr( ElementNode, m, make_method(m, descriptor) )
+
+
+#-------------------------------------------------------------------
+#   TEMPLATE CACHE
+#
+#   Parsing a template costs far more than rendering it, so TemplateNodes
+#   share one bounded cache of compiled templates.  Templates loaded from a
+#   path are loaded again when the file's mtime changes.
+#
+
+def _template_filename(template):
+    '''
+    Finds the file a compiled template came from, if it knows.
+    '''
+    for obj in (template, getattr(template, 'template', None)):
+        name = getattr(getattr(obj, 'origin', None), 'name', None)
+        if name and os.path.isfile(name):
+            return name
+    return None
+
+
+def _file_mtime(filename):
+    try:
+        return os.path.getmtime(filename)
+    except OSError:
+        return None
+
+
+class TemplateCache(object):
+    '''
+    Least recently used cache of compiled templates, keyed by the template
+    path or by a hash of the template source.
+    '''
+    def __init__(self, maxsize=128, check_mtime=True):
+        self.maxsize = maxsize
+        self.check_mtime = check_mtime
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_path(self, path, load):
+        '''
+        Returns the compiled template for a path, calling load(path) if it
+        isn't cached or the file changed since it was loaded.
+        '''
+        return self._get( ('path', path), lambda: load(path), True )
+
+    def get_source(self, source, load):
+        '''
+        Returns the compiled template for a template string, calling
+        load(source) if it isn't cached.
+        '''
+        digest = hashlib.sha1( _to_bytes(source) ).hexdigest()
+        return self._get( ('source', digest), lambda: load(source), False )
+
+    def _get(self, key, load, from_file):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                template, filename, mtime = entry
+                if filename and self.check_mtime and _file_mtime(filename) != mtime:
+                    self.invalidations += 1
+                else:
+                    self._entries[key] = entry
+                    self.hits += 1
+                    return template
+            self.misses += 1
+
+        # Loading happens outside the lock, two threads may both load the
+        # same template but they will get the same thing.
+        template = load()
+        filename = _template_filename(template) if from_file else None
+        mtime = _file_mtime(filename) if filename else None
+
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (template, filename, mtime)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return template
+
+template_cache = TemplateCache()
 
 
 #-------------------------------------------------------------------
 #   DJANGO PATCHING
 #
-#   'Django patch' the classes if the django libraries are installed
+#   The Django nodes are always defined but Django itself is only imported
+#   the first time one of them needs it.  Generator is the Django version
+#   when coffeepot.FRAMEWORK is 'django'.
 #
 
-if coffeepot.FRAMEWORK in ['django']:
-    from django.template.loader import get_template
-    from django.template import Context, Template
-    from django.http import HttpResponse
+class _Django(object):
+    '''
+    The parts of Django the nodes use, imported on first attribute access.
+    '''
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+
+        from django.template.loader import get_template
+        from django.template import Context, Template
+        from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+        from django.utils.cache import patch_cache_control, patch_vary_headers
+
+        self.__dict__.update(
+            get_template=get_template,
+            Context=Context,
+            Template=Template,
+            HttpResponse=HttpResponse,
+            HttpResponseNotModified=HttpResponseNotModified,
+            StreamingHttpResponse=StreamingHttpResponse,
+            patch_cache_control=patch_cache_control,
+            patch_vary_headers=patch_vary_headers,
+        )
+        try:
+            return self.__dict__[name]
+        except KeyError:
+            raise AttributeError(name)
+
+_django = _Django()
+
+
+def etag_matches(header, etag):
+    '''
+    Checks an If-None-Match header against an ETag.  If-None-Match uses the
+    weak comparison so W/ prefixes are ignored.
+    '''
+    if not header or not etag:
+        return False
+
+    if header.strip() == '*':
+        return True
+
+    if etag.startswith('W/'):
+        etag = etag[2:]
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def accepts_gzip(header):
+    '''
+    Checks an Accept-Encoding header for gzip.  A q-value of 0 refuses it,
+    and '*' stands for it when gzip isn't listed itself.  No header means
+    no gzip.
+    '''
+    if not header:
+        return False
+
+    qualities = {}
+    for coding in header.split(','):
+        name, _, params = coding.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+
+    for name in ('gzip', 'x-gzip', '*'):
+        if name in qualities:
+            return qualities[name] > 0
+    return False
 
-    class TemplateNode( _Node ):
+
+class TemplateNode( _Node ):
+    '''
+    A TemplateNode node uses the Django template system to generate the code.
+    It assumes that whatever you are handing it, you know what you are doing.
+    The context can change between renders so the output is never cached.
+
+        TemplateNode(path='js/menu.js')
+        TemplateNode(source='load("{{ url }}");', context={'url': url})
+
+    A template given as the first argument is guessed, see add_template().
+    '''
+    cacheable = False
+    blocking = True
+
+    def __init__(self, template=None, context={}, path=None, source=None):
+        super(TemplateNode, self).__init__(None)
+        self.context = context
+        if template is not None:
+            self.add_template( template )
+        if path is not None:
+            self.add_template_path( path )
+        if source is not None:
+            self.add_template_string( source )
+
+    @property
+    def context(self):
+        return self._context
+        
+    @context.setter
+    def context(self, value):
+        # A Context is always true, so whether there was anything in it is
+        # kept for iter_render()
+        if isinstance(value, _django.Context):
+            self._context = value
+            self._has_context = True
+        else:
+            self._context = _django.Context( value )
+            self._has_context = bool(value)
+
+    @context.deleter
+    def context(self, value):
+        del self._context
+
+    def add_template(self, template):
         '''
-        A TemplateNode node uses the Django template system to generate the code.
-        It assumes that whatever you are handing it, you know what you are doing.
+        Adds a template object, a template string or a path to a template.
+        Strings with template tags or line breaks are taken as template
+        source, anything else as a path.  Use add_template_path() or
+        add_template_string() (path= or source= when creating the node) to
+        say which one it is.
         '''
-        def __init__(self, template, context={} ):
-            super(TemplateNode, self).__init__(None)
+        if hasattr(template, 'render'):
+            self.add_template_object( template )
+        elif '{' in template or '\n' in template:
+            self.add_template_string( template )
+        else:
+            self.add_template_path( template )
+
+    def add_template_path(self, template):
+        '''
+        add_template_path adds a Template Object to the render queue of the TemplateNode.
+        It's a convenience method that will take a path to a template and use the
+        appropriate template.  Compiled templates come from template_cache.
+        '''
+        self.add_template_object( template_cache.get_path( template, _django.get_template ) )
+
+    def add_template_string(self, templateString):
+        '''
+        Similar to add_template except the input is a string.  This string will be 
+        converted into a Django template and rendered with the Node's context.
+        Compiled templates come from template_cache.
+        '''
+        self.add_template_object( template_cache.get_source( templateString, _django.Template ) )
+
+    def add_template_object(self, templateObject):
+        '''
+        Similar to add_template except the input is a Django Template Object.  
+        This will be added to queue and rendered with the Node's context
+        '''
+        if self._shared_queue:
+            self._own_queue()
+        self.queue.append( templateObject )
+        self.invalidate()
+
+    # minify comes first like on every other node, parents pass it
+    # positionally.  Templates are rendered as they are either way, and a
+    # context in minify's place is taken as the context, so the
+    # render(context) calls from before keep working.
+    def render(self, minify=None, context={}):
+        return "".join( self.iter_render(minify, context) )
+
+    def iter_render(self, minify=None, context={}):
+        if minify is not None and not isinstance(minify, (bool, int)):
+            minify, context = None, minify
+
+        if not self._has_context and context:
             self.context = context
-            self.add_template( template, self.context )
 
-        @property
-        def context(self):
-            return self._context
-            
-        @context.setter
-        def context(self, value):
-            if isinstance(value, Context):
-                self._context = value
+        for i, t in enumerate(self.queue):
+            if i:
+                yield '\n'
+            yield t.render( self.context )
+
+
+class _DjangoGeneratorNode( _GeneratorNode ):
+
+    # Default Cache-Control directives for render_to_response, as keyword
+    # arguments for django.utils.cache.patch_cache_control, e.g.
+    # {'public': True, 'max_age': 3600}
+    cache_control = None
+
+    def render_to_response(self, content_type="text/javascript", stream=False,
+                           compress=False, minify=None, request=None, cache_control=None):
+        '''
+        Returns the rendered JavaScript as a Django response.  With stream
+        set the body is generated while it is being sent which keeps memory
+        flat for very large scripts.
+
+        With compress set the body is the cached gzip output from
+        render_gzip() for requests whose Accept-Encoding takes gzip, others
+        (and calls without a request) get the plain script.  compress wins
+        over stream.
+
+        Responses carry a strong ETag from the content hash.  When the
+        request's If-None-Match matches, a 304 without a body is returned,
+        and if the tree hasn't changed since its last render nothing is
+        rendered at all.  Streamed responses only get an ETag if one is
+        already cached.
+
+        cache_control (or the Generator's cache_control) is applied with
+        django.utils.cache.patch_cache_control.
+        '''
+        return self._response(None, content_type, stream, compress, minify, request, cache_control)
+
+    def arender_to_response(self, content_type="text/javascript", compress=False,
+                            minify=None, request=None, cache_control=None):
+        '''
+        Coroutine version of render_to_response() for async views, the tree
+        is rendered with arender().  Python 3 only.
+        '''
+        from coffeepot.core.aio import arender_to_response
+        return arender_to_response(self, content_type, compress, minify, request, cache_control)
+
+    def _response(self, content, content_type, stream, compress, minify, request, cache_control):
+        '''
+        Builds the response for render_to_response().  content is the
+        rendered script when the caller already has it, otherwise the tree
+        is rendered (or streamed) here.
+        '''
+        if minify is None:
+            minify = self.minify
+        if cache_control is None:
+            cache_control = self.cache_control
+
+        # Only gzip for a request that takes it
+        vary = compress
+        if compress:
+            compress = request is not None and accepts_gzip(request.META.get('HTTP_ACCEPT_ENCODING'))
+
+        # A tree that isn't cached can give different output on each
+        # render, so it is rendered once and the ETag, the gzip body and
+        # the plain body all come from that one render
+        if content is None and not self.cacheable and (compress or not stream):
+            content = self.render(minify)
+
+        if content is not None:
+            etag = self.cached_etag(minify) or _content_etag(content)
+        elif stream and not compress:
+            etag = self.cached_etag(minify)
+        else:
+            etag = self.etag(minify)
+
+        # The compressed body is a different representation and gets its
+        # own strong ETag
+        if etag and compress:
+            etag = etag[:-1] + '-gzip"'
+
+        if request is not None and etag_matches(request.META.get('HTTP_IF_NONE_MATCH'), etag):
+            response = _django.HttpResponseNotModified()
+        elif compress:
+            if content is not None and not self.cacheable:
+                body = _gzip(content)
             else:
-                self._context = Context( value )
-
-        @context.deleter
-        def context(self, value):
-            del self._context
-
-        def add_template_path(self, template):
-            '''
-            add_template_path adds a Template Object to the render queue of the TemplateNode.
-            It's a convenience method that will take a path to a template and use the
-            appropriate template.
-            '''
-            self.add_template_object( get_template( template ) )
-
-        def add_template_string(self, templateString):
-            '''
-            Similar to add_template except the input is a string.  This string will be 
-            converted into a Django template and rendered with the Node's context
-            '''
-            self.add_template_object( Template( templateString ) )
-
-        def add_template_object(self, templateObject):
-            '''
-            Similar to add_template except the input is a Django Template Object.  
-            This will be added to queue and rendered with the Node's context
-            '''
-            self.queue.append( templateObject )
-
-        def render(self, context={}):
-            if not self.queue:
-                return ""
-            
-            if not self.context:
-                self.context = context
-                
-            return '\n'.join( [t.render( self.context ) for t in self.queue] )
+                body = self.render_gzip(minify)
+            response = _django.HttpResponse(body, content_type=content_type)
+            response['Content-Encoding'] = 'gzip'
+        elif content is not None:
+            response = _django.HttpResponse(content, content_type=content_type)
+        elif stream:
+            response = _django.StreamingHttpResponse(self.iter_chunks(minify=minify), content_type=content_type)
+        else:
+            response = _django.HttpResponse(self.render(minify), content_type=content_type)
 
+        if etag:
+            response['ETag'] = etag
+        if vary:
+            _django.patch_vary_headers(response, ('Accept-Encoding',))
+        if cache_control:
+            _django.patch_cache_control(response, **cache_control)
+        return response
 
-    class _DjangoGeneratorNode( _GeneratorNode ):
-        def render_to_response(self, content_type="text/javascript"):
-            return HttpResponse(self.render(), content_type=content_type)
+    def template_node(self, template=None, context={}, path=None, source=None):
+        return self.add_to_queue( TemplateNode( template, context, path, source ) )
 
-        def template_node(self, template, context={}):
-            return self.add_to_queue( TemplateNode( template, context ) )
 
-    Generator = _DjangoGeneratorNode
+def generator_class():
+    '''
+    Returns the Generator class for the framework in coffeepot.FRAMEWORK.
+    '''
+    if coffeepot.FRAMEWORK in ['django']:
+        return _DjangoGeneratorNode
+    return _GeneratorNode
 
-else:     #If it does not exist we are OK not adding the method
-    Generator = _GeneratorNode
+Generator = generator_class()
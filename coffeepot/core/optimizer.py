@@ -0,0 +1,215 @@
+'''
+An optional pass over a node tree that cuts down on repeated DOM queries.
+
+    g = Generator()
+    ...
+    g.optimize().render()
+
+Two things are done, both only for plain selectors (no ':' or '[', whose
+matches can change when elements are shown, hidden or edited):
+
+  - Consecutive chains on the same selector are merged into one chain:
+        $("#a").hide(); $("#a").fadeIn(200)  ->  $("#a").hide().fadeIn(200)
+
+  - Inside a FunctionNode a selector used by more than one statement is
+    queried once into a local variable:
+        var $cp0 = $("#a"); $cp0.hide(); $("#b").show(); $cp0.show()
+
+Statements keep their order.  A statement that isn't an element chain, or a
+chain with a method that isn't known to leave the DOM alone, ends every
+merge and cached variable so later statements query the DOM again.
+
+The tree passed in is never changed, a new one is returned.
+'''
+from coffeepot.core.encoder import in_string
+from coffeepot.core.node import _Node, _GeneratorNode, _MethodNode, ElementNode, FunctionNode
+
+# Methods that don't change which elements a selector matches and always
+# return the jQuery object they were called on.  Event methods only count
+# when given a handler, called without one they fire the event.
+SAFE_METHODS = frozenset([
+    'show', 'hide', 'toggle', 'animate', 'stop', 'delay',
+    'fadeIn', 'fadeOut', 'fadeTo', 'fadeToggle',
+    'slideUp', 'slideDown', 'slideToggle',
+    'on', 'off', 'one', 'bind', 'unbind',
+])
+
+EVENT_METHODS = frozenset([
+    'click', 'dblclick', 'hover', 'focus', 'blur', 'change', 'submit',
+    'keyup', 'keydown', 'keypress', 'mouseenter', 'mouseleave',
+    'mouseover', 'mouseout', 'mousedown', 'mouseup', 'resize', 'scroll',
+])
+
+VARIABLE_PREFIX = '$cp'
+
+
+class _SelectorVarNode(_Node):
+    '''
+    var $cp0 = $("#foo")
+    '''
+    def __init__(self, ref, selector):
+        super(_SelectorVarNode, self).__init__(name=ref)
+        self.selector = selector
+
+    def _generate(self, child, minify):
+        if minify:
+            yield 'var %s=$("%s")' % (self.name, in_string(self.selector))
+        else:
+            yield 'var %s = $("%s")' % (self.name, in_string(self.selector))
+
+
+class _CachedElementNode(ElementNode):
+    '''
+    An element chain that starts from a variable set by _SelectorVarNode.
+    '''
+    def __init__(self, ref, selector):
+        super(_CachedElementNode, self).__init__(selector)
+        self.ref = ref
+
+    def _generate(self, child, minify):
+        if not self.queue:
+            return
+
+        yield self.ref
+
+        for x in self.queue:
+            yield '.'
+            for chunk in child(x, minify):
+                yield chunk
+
+
+def _stable(selector):
+    return '[' not in selector and ':' not in selector
+
+
+def _safe_method(method):
+    if method.name in SAFE_METHODS:
+        return True
+    return method.name in EVENT_METHODS and bool(method.args or method.kwargs)
+
+
+def _safe_chain(element):
+    for method in element.queue:
+        if not isinstance(method, _MethodNode) or not _safe_method(method):
+            return False
+    return True
+
+
+def _is_element(node):
+    return type(node) is ElementNode and _stable(node.name)
+
+
+def _optimize_value(value):
+    if isinstance(value, FunctionNode):
+        return optimize(value)
+    return value
+
+
+def _copy_method(method):
+    '''
+    Copies a method only if one of its arguments is a callback to optimize.
+    '''
+    if not isinstance(method, _MethodNode):
+        return method
+
+    values = list(method.args) + list(method.kwargs.values())
+    if not any([isinstance(v, FunctionNode) for v in values]):
+        return method
+
+    args = [_optimize_value(v) for v in method.args]
+    kwargs = dict([(k, _optimize_value(v)) for k, v in method.kwargs.items()])
+    kwargs['name'] = method.name
+    return _MethodNode(*args, **kwargs)
+
+
+def _copy_statement(node):
+    if isinstance(node, FunctionNode):
+        return optimize(node)
+    if type(node) is ElementNode:
+        copy = ElementNode(node.name)
+        for method in node.queue:
+            copy.add_to_queue( _copy_method(method) )
+        return copy
+    return node
+
+
+def merge_chains(statements):
+    '''
+    Returns the statements with consecutive chains on the same selector
+    merged into one.
+    '''
+    result = []
+    for node in statements:
+        node = _copy_statement(node)
+        previous = result[-1] if result else None
+
+        if (previous is not None and _is_element(node) and _is_element(previous)
+                and previous.name == node.name and previous.queue and _safe_chain(previous)):
+            for method in node.queue:
+                previous.add_to_queue( method )
+        else:
+            result.append( node )
+    return result
+
+
+def hoist_selectors(statements):
+    '''
+    Returns the statements with selectors that are used more than once
+    between two barriers read into a variable first.
+    '''
+    # Pass one: count the uses of each selector in each stretch of
+    # statements between barriers (an epoch).
+    epochs = []
+    counts = {}
+    epoch = 0
+    for node in statements:
+        if _is_element(node) and node.queue:
+            key = (node.name, epoch)
+            counts[key] = counts.get(key, 0) + 1
+            epochs.append( epoch )
+            if not _safe_chain(node):
+                epoch += 1
+        else:
+            epochs.append( None )
+            epoch += 1
+
+    # Pass two: swap repeated selectors for a variable
+    result = []
+    refs = {}
+    for node, epoch in zip(statements, epochs):
+        if epoch is None or counts[(node.name, epoch)] < 2:
+            result.append( node )
+            continue
+
+        key = (node.name, epoch)
+        ref = refs.get(key)
+        if ref is None:
+            ref = refs[key] = '%s%d' % (VARIABLE_PREFIX, len(refs))
+            result.append( _SelectorVarNode(ref, node.name) )
+
+        cached = _CachedElementNode(ref, node.name)
+        for method in node.queue:
+            cached.add_to_queue( method )
+        result.append( cached )
+    return result
+
+
+def optimize(node):
+    '''
+    Returns an optimized copy of a Generator or FunctionNode.  Selectors are
+    only cached in variables inside functions so nothing leaks into the
+    global scope.
+    '''
+    if isinstance(node, FunctionNode):
+        copy = FunctionNode(name=node.name, indent=node.indent)
+        statements = hoist_selectors( merge_chains(node.queue) )
+    elif isinstance(node, _GeneratorNode):
+        copy = node.__class__()
+        statements = merge_chains(node.queue)
+    else:
+        return node
+
+    copy.minify = node.minify
+    for statement in statements:
+        copy.add_to_queue( statement )
+    return copy
@@ -0,0 +1,205 @@
+'''
+Pools string literals that repeat a lot into constants declared once at the
+top of the script:
+
+    pooled = g.render_pooled(minify=True)
+    pooled.text     # var $k0="/api/items/",$k1="#results";$($k1).load($k0)...
+    pooled.saved    # bytes saved against g.render(minify=True)
+
+Strings in method arguments (inside lists and dicts too, and in callbacks)
+and element selectors are counted over the whole tree.  A literal is pooled
+when it is used at least min_count times and replacing it saves bytes after
+paying for its declaration; the ones saving the most get the shortest
+names.
+
+The constants are declared with var at the top level of the script, so
+every function in it sees them.  The names start with a prefix that doesn't
+occur anywhere in the unpooled output, so they can't clash with names in
+ScriptNodes.  Pooled output is generated without the render cache, since
+it depends on the whole tree.
+'''
+from coffeepot.core.encoder import JSEncoder, CompactJSEncoder, encode_string, quote, in_string, string_types
+from coffeepot.core.node import _Node, _MethodNode, ElementNode, _opaque, _render_child
+
+PREFIX = '$k'
+
+DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+
+def _base36(number):
+    digits = []
+    while True:
+        number, digit = divmod(number, 36)
+        digits.append( DIGITS[digit] )
+        if not number:
+            return ''.join(reversed(digits))
+
+
+def _selector(element):
+    return '"%s"' % in_string(element.name)
+
+
+def count_literals(node):
+    '''
+    Returns {literal as written in the script: number of uses}.
+    '''
+    counts = {}
+    stack = [node]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, string_types):
+            literal = quote(value)
+            counts[literal] = counts.get(literal, 0) + 1
+        elif isinstance(value, (list, tuple)):
+            stack.extend( value )
+        elif isinstance(value, dict):
+            stack.extend( value.values() )
+        elif isinstance(value, _MethodNode):
+            stack.extend( value.args )
+            stack.extend( value.kwargs.values() )
+        elif not _opaque(value):
+            if type(value) is ElementNode and value.queue:
+                literal = _selector(value)
+                counts[literal] = counts.get(literal, 0) + 1
+            stack.extend( value.queue )
+    return counts
+
+
+def choose(counts, prefix, min_count=2):
+    '''
+    Returns [(constant name, literal)] for the literals worth pooling.
+    '''
+    candidates = []
+    for literal, count in counts.items():
+        if count >= min_count:
+            candidates.append( (count * len(literal), count, literal) )
+    candidates.sort(reverse=True)
+
+    chosen = []
+    for weight, count, literal in candidates:
+        name = prefix + _base36(len(chosen))
+        # uses, minus the references, minus 'name=literal,'
+        saving = count * (len(literal) - len(name)) - (len(name) + len(literal) + 2)
+        if saving > 0:
+            chosen.append( (name, literal) )
+    return chosen
+
+
+#-------------------------------------------------------------------
+#   ENCODERS
+#
+
+def encode_pooled_string(encoder, value, write, encode):
+    name = encoder.pool.get( quote(value) )
+    if name is None:
+        encode_string(encoder, value, write, encode)
+    else:
+        write( name )
+
+
+def encode_pooled_node(encoder, value, write, encode):
+    write( encoder.renderer.render(value, encoder.minify) )
+
+
+class PoolingEncoder(JSEncoder):
+    '''
+    Writes the constant's name for pooled strings.
+    '''
+    def __init__(self, pool, renderer):
+        self.pool = pool
+        self.renderer = renderer
+
+
+class CompactPoolingEncoder(CompactJSEncoder):
+
+    def __init__(self, pool, renderer):
+        self.pool = pool
+        self.renderer = renderer
+
+
+for _cls in (PoolingEncoder, CompactPoolingEncoder):
+    for _type in string_types:
+        _cls.register(_type, encode_pooled_string)
+    _cls.register(_Node, encode_pooled_node)
+
+
+#-------------------------------------------------------------------
+#   RENDERING
+#
+
+class Pooled(object):
+    '''
+    The pooled script.  constants is a list of (name, literal, uses).
+    '''
+    def __init__(self, text, constants, original_size):
+        self.text = text
+        self.constants = constants
+        self.original_size = original_size
+        self.saved = original_size - len(text)
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return '<Pooled %d constants, %d bytes saved>' % (len(self.constants), self.saved)
+
+
+class _Renderer(object):
+    '''
+    Renders a tree like render() does, with the pooled names in it.
+    '''
+    def __init__(self, pool):
+        self.pool = pool
+        self.encoders = {False: PoolingEncoder(pool, self), True: CompactPoolingEncoder(pool, self)}
+
+    def child(self, node, minify):
+        return ( self.render(node, minify), )
+
+    def render(self, node, minify):
+        if isinstance(node, _MethodNode):
+            return self.method(node, minify)
+        if _opaque(node):
+            return _render_child(node, minify)[0]
+        if type(node) is ElementNode and node.queue:
+            selector = _selector(node)
+            parts = ['$(%s)' % self.pool.get(selector, selector)]
+            for x in node.queue:
+                parts.append( '.' )
+                parts.append( self.render(x, minify) )
+            return ''.join(parts)
+        return ''.join( node._generate(self.child, minify) )
+
+    def method(self, node, minify):
+        kwargs = dict(node.kwargs)
+        indent = kwargs.pop('indent', None)
+        if minify:
+            indent = None
+        return '%s(%s)' % (node.name, self.encoders[minify].encode_arguments(node.args, kwargs, indent))
+
+
+def render_pooled(node, minify=None, min_count=2):
+    '''
+    Returns a Pooled for the node's script.
+    '''
+    if minify is None:
+        minify = node.minify
+
+    original = node.render(minify)
+    prefix = PREFIX
+    while prefix in original:
+        prefix += '_'
+
+    counts = count_literals(node)
+    chosen = choose(counts, prefix, min_count)
+    if not chosen:
+        return Pooled(original, [], len(original))
+
+    pool = dict([(literal, name) for name, literal in chosen])
+    constants = [(name, literal, counts[literal]) for name, literal in chosen]
+    if minify:
+        declaration = 'var %s;' % ','.join(['%s=%s' % (name, literal) for name, literal, uses in constants])
+    else:
+        declaration = 'var %s;\n' % ',\n    '.join(['%s = %s' % (name, literal) for name, literal, uses in constants])
+
+    text = declaration + _Renderer(pool).render(node, minify)
+    return Pooled(text, constants, len(original))
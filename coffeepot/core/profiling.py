@@ -0,0 +1,110 @@
+'''
+Finds out where render() spends its time.
+
+    with Profiler() as profiler:
+        g.render()
+    print(profiler.report())
+
+Rendering is timed per node class and, for jQuery methods, per method name.
+For each one the report has the number of renders, the total time
+(children included), the time of the nodes themselves and the size of their
+output in bytes.  Cached nodes are counted too, they just cost nothing.
+
+Profiling uses set_render_hook() from coffeepot.core.node, which can also be
+given a plain callback.
+'''
+from coffeepot.core.node import _MethodNode, set_render_hook
+
+COLUMNS = ('count', 'seconds', 'own_seconds', 'bytes')
+
+
+class Timing(object):
+
+    __slots__ = COLUMNS
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.own_seconds = 0.0
+        self.bytes = 0
+
+    def __repr__(self):
+        return '<Timing count=%d seconds=%.6f own_seconds=%.6f bytes=%d>' % (
+            self.count, self.seconds, self.own_seconds, self.bytes)
+
+
+class Profiler(object):
+    '''
+    Collects render timings while it is active.  Use it as a context manager
+    or call start() and stop().
+    '''
+    def __init__(self):
+        self.classes = {}
+        self.methods = {}
+        self._previous = None
+
+    def start(self):
+        self._previous = set_render_hook(self.record)
+        return self
+
+    def stop(self):
+        set_render_hook(self._previous)
+        self._previous = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _add(self, table, key, seconds, own_seconds, size):
+        timing = table.get(key)
+        if timing is None:
+            timing = table[key] = Timing()
+        timing.count += 1
+        timing.seconds += seconds
+        timing.own_seconds += own_seconds
+        timing.bytes += size
+
+    def record(self, node, seconds, own_seconds, text):
+        '''
+        The render hook.
+        '''
+        if isinstance(text, bytes):
+            size = len(text)
+        else:
+            size = len(text.encode('utf-8'))
+
+        self._add(self.classes, node.__class__.__name__, seconds, own_seconds, size)
+        if isinstance(node, _MethodNode):
+            self._add(self.methods, node.name, seconds, own_seconds, size)
+
+    def reset(self):
+        self.classes.clear()
+        self.methods.clear()
+
+    def sorted(self, table, sort='own_seconds'):
+        '''
+        Returns [(key, Timing)] for 'classes' or 'methods', the largest first.
+        '''
+        return sorted(getattr(self, table).items(),
+                      key=lambda item: getattr(item[1], sort), reverse=True)
+
+    def report(self, sort='own_seconds', limit=None):
+        '''
+        Returns the timings as a text table, sorted on one of the columns.
+        '''
+        if sort not in COLUMNS:
+            raise ValueError('Can not sort on %r, use one of %s' % (sort, ', '.join(COLUMNS)))
+
+        lines = []
+        for title, table in (('node class', 'classes'), ('method', 'methods')):
+            rows = self.sorted(table, sort)[:limit]
+            if not rows:
+                continue
+            lines.append( '%-24s %8s %12s %12s %12s' % (title, 'count', 'total ms', 'own ms', 'bytes') )
+            for key, timing in rows:
+                lines.append( '%-24s %8d %12.3f %12.3f %12d' % (key, timing.count, timing.seconds * 1000,
+                                                                timing.own_seconds * 1000, timing.bytes) )
+            lines.append( '' )
+        return '\n'.join(lines)
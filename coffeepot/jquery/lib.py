@@ -2,4 +2,7 @@ import coffeepot
 coffeepot.JSLIB = 'jquery'
 coffeepot.FRAMEWORK = 'django'
 
-from coffeepot.core.node import Generator
\ No newline at end of file
+# Nothing from Django or jQuery is loaded until a node needs it
+from coffeepot.core.node import generator_class
+
+Generator = generator_class()
@@ -0,0 +1,141 @@
+# Generated from coffeepot/jquery/spec.py by 'python -m coffeepot.jquery.spec',
+# don't edit it by hand.
+#
+# name -> (minimum arguments, maximum arguments or None, kinds of each argument)
+
+METHODS = {'add': (1, 2, (('selector', 'element', 'content'), ('element',))),
+ 'addBack': (0, 1, (('selector',),)),
+ 'addClass': (1, 1, (('string', 'array', 'function'),)),
+ 'after': (1, None, (('content', 'function'), ('content',))),
+ 'ajaxComplete': (1, 1, (('function',),)),
+ 'ajaxError': (1, 1, (('function',),)),
+ 'ajaxSend': (1, 1, (('function',),)),
+ 'ajaxStart': (1, 1, (('function',),)),
+ 'ajaxStop': (1, 1, (('function',),)),
+ 'ajaxSuccess': (1, 1, (('function',),)),
+ 'animate': (1,
+             4,
+             (('object',), ('number', 'string', 'object'), ('string', 'function'), ('function',))),
+ 'append': (1, None, (('content', 'function'), ('content',))),
+ 'appendTo': (1, 1, (('selector', 'content'),)),
+ 'attr': (1, 2, (('string', 'object'), ('any',))),
+ 'before': (1, None, (('content', 'function'), ('content',))),
+ 'bind': (1, 3, (('string', 'object'), ('any',), ('function', 'boolean'))),
+ 'blur': (0, 2, (('object', 'function'), ('function',))),
+ 'change': (0, 2, (('object', 'function'), ('function',))),
+ 'children': (0, 1, (('selector',),)),
+ 'clearQueue': (0, 1, (('string',),)),
+ 'click': (0, 2, (('object', 'function'), ('function',))),
+ 'clone': (0, 2, (('boolean',), ('boolean',))),
+ 'closest': (1, 2, (('selector', 'element'), ('element',))),
+ 'contents': (0, 0, ()),
+ 'contextmenu': (0, 2, (('object', 'function'), ('function',))),
+ 'css': (1, 2, (('string', 'array', 'object'), ('any',))),
+ 'data': (0, 2, (('string', 'object'), ('any',))),
+ 'dblclick': (0, 2, (('object', 'function'), ('function',))),
+ 'delay': (1, 2, (('number',), ('string',))),
+ 'delegate': (2, 4, (('selector',), ('string', 'object'), ('any',), ('function',))),
+ 'dequeue': (0, 1, (('string',),)),
+ 'detach': (0, 1, (('selector',),)),
+ 'each': (1, 1, (('function',),)),
+ 'empty': (0, 0, ()),
+ 'end': (0, 0, ()),
+ 'eq': (1, 1, (('number',),)),
+ 'even': (0, 0, ()),
+ 'fadeIn': (0, 3, (('number', 'string', 'object'), ('string', 'function'), ('function',))),
+ 'fadeOut': (0, 3, (('number', 'string', 'object'), ('string', 'function'), ('function',))),
+ 'fadeTo': (2, 4, (('number', 'string'), ('number',), ('string', 'function'), ('function',))),
+ 'fadeToggle': (0, 3, (('number', 'string', 'object'), ('string', 'function'), ('function',))),
+ 'filter': (1, 1, (('selector', 'function', 'element'),)),
+ 'find': (1, 1, (('selector', 'element'),)),
+ 'finish': (0, 1, (('string',),)),
+ 'first': (0, 0, ()),
+ 'focus': (0, 2, (('object', 'function'), ('function',))),
+ 'focusin': (0, 2, (('object', 'function'), ('function',))),
+ 'focusout': (0, 2, (('object', 'function'), ('function',))),
+ 'get': (0, 1, (('number',),)),
+ 'has': (1, 1, (('selector', 'element'),)),
+ 'hasClass': (1, 1, (('string',),)),
+ 'height': (0, 1, (('number', 'string', 'function'),)),
+ 'hide': (0, 3, (('number', 'string', 'object'), ('string', 'function'), ('function',))),
+ 'hover': (1, 2, (('function',), ('function',))),
+ 'html': (0, 1, (('string', 'function'),)),
+ 'index': (0, 1, (('selector', 'element'),)),
+ 'innerHeight': (0, 1, (('number', 'string', 'function'),)),
+ 'innerWidth': (0, 1, (('number', 'string', 'function'),)),
+ 'insertAfter': (1, 1, (('selector', 'content'),)),
+ 'insertBefore': (1, 1, (('selector', 'content'),)),
+ 'is': (1, 1, (('selector', 'function', 'element'),)),
+ 'keydown': (0, 2, (('object', 'function'), ('function',))),
+ 'keypress': (0, 2, (('object', 'function'), ('function',))),
+ 'keyup': (0, 2, (('object', 'function'), ('function',))),
+ 'last': (0, 0, ()),
+ 'map': (1, 1, (('function',),)),
+ 'mousedown': (0, 2, (('object', 'function'), ('function',))),
+ 'mouseenter': (0, 2, (('object', 'function'), ('function',))),
+ 'mouseleave': (0, 2, (('object', 'function'), ('function',))),
+ 'mousemove': (0, 2, (('object', 'function'), ('function',))),
+ 'mouseout': (0, 2, (('object', 'function'), ('function',))),
+ 'mouseover': (0, 2, (('object', 'function'), ('function',))),
+ 'mouseup': (0, 2, (('object', 'function'), ('function',))),
+ 'next': (0, 1, (('selector',),)),
+ 'nextAll': (0, 1, (('selector',),)),
+ 'nextUntil': (0, 2, (('selector', 'element'), ('selector',))),
+ 'not': (1, 1, (('selector', 'function', 'element'),)),
+ 'odd': (0, 0, ()),
+ 'off': (0, 3, (('string', 'object'), ('selector', 'function'), ('function',))),
+ 'offset': (0, 1, (('object', 'function'),)),
+ 'offsetParent': (0, 0, ()),
+ 'on': (1, 4, (('string', 'object'), ('any',), ('any',), ('function',))),
+ 'one': (1, 4, (('string', 'object'), ('any',), ('any',), ('function',))),
+ 'outerHeight': (0, 2, (('number', 'string', 'boolean', 'function'), ('boolean',))),
+ 'outerWidth': (0, 2, (('number', 'string', 'boolean', 'function'), ('boolean',))),
+ 'parents': (0, 1, (('selector',),)),
+ 'parentsUntil': (0, 2, (('selector', 'element'), ('selector',))),
+ 'position': (0, 0, ()),
+ 'prepend': (1, None, (('content', 'function'), ('content',))),
+ 'prependTo': (1, 1, (('selector', 'content'),)),
+ 'prev': (0, 1, (('selector',),)),
+ 'prevAll': (0, 1, (('selector',),)),
+ 'prevUntil': (0, 2, (('selector', 'element'), ('selector',))),
+ 'promise': (0, 2, (('string',), ('object',))),
+ 'prop': (1, 2, (('string', 'object'), ('any',))),
+ 'ready': (1, 1, (('function',),)),
+ 'remove': (0, 1, (('selector',),)),
+ 'removeAttr': (1, 1, (('string',),)),
+ 'removeClass': (0, 1, (('string', 'array', 'function'),)),
+ 'removeData': (0, 1, (('string', 'array'),)),
+ 'removeProp': (1, 1, (('string',),)),
+ 'replaceAll': (1, 1, (('selector', 'content'),)),
+ 'replaceWith': (1, 1, (('content', 'function'),)),
+ 'resize': (0, 2, (('object', 'function'), ('function',))),
+ 'scroll': (0, 2, (('object', 'function'), ('function',))),
+ 'scrollLeft': (0, 1, (('number',),)),
+ 'scrollTop': (0, 1, (('number',),)),
+ 'select': (0, 2, (('object', 'function'), ('function',))),
+ 'serialize': (0, 0, ()),
+ 'serializeArray': (0, 0, ()),
+ 'show': (0, 3, (('number', 'string', 'object'), ('string', 'function'), ('function',))),
+ 'siblings': (0, 1, (('selector',),)),
+ 'slice': (1, 2, (('number',), ('number',))),
+ 'slideDown': (0, 3, (('number', 'string', 'object'), ('string', 'function'), ('function',))),
+ 'slideToggle': (0, 3, (('number', 'string', 'object'), ('string', 'function'), ('function',))),
+ 'slideUp': (0, 3, (('number', 'string', 'object'), ('string', 'function'), ('function',))),
+ 'stop': (0, 3, (('string', 'boolean'), ('boolean',), ('boolean',))),
+ 'submit': (0, 2, (('object', 'function'), ('function',))),
+ 'text': (0, 1, (('string', 'number', 'boolean', 'function'),)),
+ 'toArray': (0, 0, ()),
+ 'toggle': (0,
+            3,
+            (('number', 'string', 'object', 'boolean'), ('string', 'function'), ('function',))),
+ 'toggleClass': (0, 2, (('string', 'array', 'function', 'boolean'), ('boolean',))),
+ 'trigger': (1, 2, (('string', 'object'), ('any',))),
+ 'triggerHandler': (1, 2, (('string', 'object'), ('any',))),
+ 'unbind': (0, 2, (('string', 'object'), ('function', 'boolean'))),
+ 'undelegate': (0, 3, (('selector', 'string'), ('string', 'object'), ('function',))),
+ 'unwrap': (0, 1, (('selector',),)),
+ 'val': (0, 1, (('any',),)),
+ 'width': (0, 1, (('number', 'string', 'function'),)),
+ 'wrap': (1, 1, (('selector', 'content', 'function'),)),
+ 'wrapAll': (1, 1, (('selector', 'content', 'function'),)),
+ 'wrapInner': (1, 1, (('selector', 'content', 'function'),))}
@@ -0,0 +1,304 @@
+'''
+The jQuery methods ElementNode knows about, one line per method:
+
+    name    argument argument ...
+
+Each argument is the kinds of value it takes, joined with '|'.  An argument
+ending in '?' is optional and one ending in '*' takes any number of values,
+it can only be the last.  '-' means the method takes no arguments.
+
+The table is only read by the generator.  What ElementNode loads is
+coffeepot/jquery/methods.py, built from it with:
+
+    python -m coffeepot.jquery.spec
+
+Run it again after changing the table ('--check' only tells whether
+methods.py is out of date).  Each method becomes a descriptor
+
+    (minimum arguments, maximum arguments or None, kinds)
+
+where kinds holds one tuple of kind names per argument.
+
+jQuery methods whose names are node attributes (parent, queue, load) are
+left out of the table, they can only be added with add_method(name=...).
+'''
+import optparse
+import os
+import pprint
+import sys
+
+from coffeepot.core.exception import JSLibraryError
+
+KINDS = frozenset([
+    'any', 'array', 'boolean', 'content', 'element', 'function',
+    'number', 'object', 'selector', 'string',
+])
+
+# Arguments shared by groups of methods
+_EVENT = 'object|function? function?'
+_EFFECT = 'number|string|object? string|function? function?'
+_CONTENT = 'content|function content*'
+_TARGET = 'selector|content'
+_FILTER = 'selector?'
+_UNTIL = 'selector|element? selector?'
+_DIMENSION = 'number|string|function?'
+_OUTER = 'number|string|boolean|function? boolean?'
+
+SPEC = '''
+# Attributes and CSS
+addClass            string|array|function
+attr                string|object any?
+css                 string|array|object any?
+data                string|object? any?
+hasClass            string
+height              %(dimension)s
+html                string|function?
+innerHeight         %(dimension)s
+innerWidth          %(dimension)s
+offset              object|function?
+outerHeight         %(outer)s
+outerWidth          %(outer)s
+position            -
+prop                string|object any?
+removeAttr          string
+removeClass         string|array|function?
+removeData          string|array?
+removeProp          string
+scrollLeft          number?
+scrollTop           number?
+toggleClass         string|array|function|boolean? boolean?
+val                 any?
+width               %(dimension)s
+
+# Effects
+animate             object number|string|object? string|function? function?
+clearQueue          string?
+delay               number string?
+dequeue             string?
+fadeIn              %(effect)s
+fadeOut             %(effect)s
+fadeTo              number|string number string|function? function?
+fadeToggle          %(effect)s
+finish              string?
+hide                %(effect)s
+promise             string? object?
+show                %(effect)s
+slideDown           %(effect)s
+slideToggle         %(effect)s
+slideUp             %(effect)s
+stop                string|boolean? boolean? boolean?
+toggle              number|string|object|boolean? string|function? function?
+
+# Events
+bind                string|object any? function|boolean?
+blur                %(event)s
+change              %(event)s
+click               %(event)s
+contextmenu         %(event)s
+dblclick            %(event)s
+delegate            selector string|object any? function?
+focus               %(event)s
+focusin             %(event)s
+focusout            %(event)s
+hover               function function?
+keydown             %(event)s
+keypress            %(event)s
+keyup               %(event)s
+mousedown           %(event)s
+mouseenter          %(event)s
+mouseleave          %(event)s
+mousemove           %(event)s
+mouseout            %(event)s
+mouseover           %(event)s
+mouseup             %(event)s
+off                 string|object? selector|function? function?
+on                  string|object any? any? function?
+one                 string|object any? any? function?
+ready               function
+resize              %(event)s
+scroll              %(event)s
+select              %(event)s
+submit              %(event)s
+trigger             string|object any?
+triggerHandler      string|object any?
+unbind              string|object? function|boolean?
+undelegate          selector|string? string|object? function?
+
+# Ajax
+ajaxComplete        function
+ajaxError           function
+ajaxSend            function
+ajaxStart           function
+ajaxStop            function
+ajaxSuccess         function
+serialize           -
+serializeArray      -
+
+# Manipulation
+after               %(content)s
+append              %(content)s
+appendTo            %(target)s
+before              %(content)s
+clone               boolean? boolean?
+detach              %(filter)s
+empty               -
+insertAfter         %(target)s
+insertBefore        %(target)s
+prepend             %(content)s
+prependTo           %(target)s
+remove              %(filter)s
+replaceAll          %(target)s
+replaceWith         content|function
+text                string|number|boolean|function?
+unwrap              %(filter)s
+wrap                selector|content|function
+wrapAll             selector|content|function
+wrapInner           selector|content|function
+
+# Traversing
+add                 selector|element|content element?
+addBack             %(filter)s
+children            %(filter)s
+closest             selector|element element?
+contents            -
+each                function
+end                 -
+eq                  number
+even                -
+filter              selector|function|element
+find                selector|element
+first               -
+get                 number?
+has                 selector|element
+index               selector|element?
+is                  selector|function|element
+last                -
+map                 function
+next                %(filter)s
+nextAll             %(filter)s
+nextUntil           %(until)s
+not                 selector|function|element
+odd                 -
+offsetParent        -
+parents             %(filter)s
+parentsUntil        %(until)s
+prev                %(filter)s
+prevAll             %(filter)s
+prevUntil           %(until)s
+siblings            %(filter)s
+slice               number number?
+toArray             -
+''' % {
+    'event': _EVENT,
+    'effect': _EFFECT,
+    'content': _CONTENT,
+    'target': _TARGET,
+    'filter': _FILTER,
+    'until': _UNTIL,
+    'dimension': _DIMENSION,
+    'outer': _OUTER,
+}
+
+# Where the generated descriptors go
+METHODS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'methods.py')
+
+HEADER = '''\
+# Generated from coffeepot/jquery/spec.py by 'python -m coffeepot.jquery.spec',
+# don't edit it by hand.
+#
+# name -> (minimum arguments, maximum arguments or None, kinds of each argument)
+
+METHODS = '''
+
+
+def parse_arguments(name, arguments):
+    '''
+    Returns the descriptor for one line of the table.
+    '''
+    if arguments == ['-']:
+        return (0, 0, ())
+
+    minimum = 0
+    maximum = 0
+    optional = False
+    kinds = []
+    for i, argument in enumerate(arguments):
+        marker = argument[-1]
+        if marker in '?*':
+            argument = argument[:-1]
+
+        if marker == '*':
+            if i != len(arguments) - 1:
+                raise JSLibraryError('%s: only the last argument can repeat' % name)
+            maximum = None
+        elif marker == '?':
+            optional = True
+            maximum += 1
+        elif optional:
+            raise JSLibraryError('%s: a required argument follows an optional one' % name)
+        else:
+            minimum += 1
+            maximum += 1
+
+        alternatives = tuple(argument.split('|'))
+        for kind in alternatives:
+            if kind not in KINDS:
+                raise JSLibraryError('%s: unknown argument kind %r' % (name, kind))
+        kinds.append( alternatives )
+
+    return (minimum, maximum, tuple(kinds))
+
+
+def parse(spec=SPEC):
+    '''
+    Returns {name: descriptor} for every method in the table.
+    '''
+    methods = {}
+    for line in spec.splitlines():
+        line = line.split('#', 1)[0].split()
+        if not line:
+            continue
+        name, arguments = line[0], line[1:]
+        if name in methods:
+            raise JSLibraryError('%s is listed twice' % name)
+        if not arguments:
+            raise JSLibraryError("%s: no arguments given, use '-' for none" % name)
+        methods[name] = parse_arguments(name, arguments)
+    return methods
+
+
+def generate(spec=SPEC):
+    '''
+    Returns the source of methods.py.
+    '''
+    return HEADER + pprint.pformat(parse(spec), width=100) + '\n'
+
+
+def main(argv=None):
+    parser = optparse.OptionParser(usage='%prog [options]',
+                                   description='Writes coffeepot/jquery/methods.py from the method table.')
+    parser.add_option('-o', '--output', default=METHODS_FILE, help='where to write (default: %default)')
+    parser.add_option('--check', action='store_true', default=False,
+                      help="don't write anything, exit with 1 if the file is out of date")
+    options, args = parser.parse_args(argv)
+
+    source = generate()
+    try:
+        with open(options.output) as f:
+            current = f.read()
+    except (IOError, OSError):
+        current = None
+
+    if options.check:
+        if current != source:
+            sys.stderr.write('%s is out of date\n' % options.output)
+            sys.exit(1)
+        return
+
+    if current != source:
+        with open(options.output, 'w') as f:
+            f.write(source)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+import unittest
+from coffeepot.benchmarks.load import Sampler, drive, rss_kb
+
+try:
+    import django
+except ImportError:
+    django = None
+
+
+class LoadTestCase(unittest.TestCase):
+
+    def test_drive(self):
+        paths = []
+
+        def client():
+            def fetch(path):
+                paths.append( path )
+                return 500 if len(paths) == 3 else 200
+            return fetch
+
+        latencies, errors, seconds = drive(client, '/small/', 20, 4)
+        self.assertEqual(len(latencies), 20)
+        self.assertEqual(paths, ['/small/'] * 20)
+        self.assertEqual(errors, 1)
+
+    def test_sampler(self):
+        sampler = Sampler(interval=0.01)
+        sampler.start()
+        samples = sampler.stop()
+        self.assertTrue(len(samples) >= 2)
+        self.assertTrue(rss_kb() is None or samples[-1][1] > 0)
+
+    @unittest.skipIf(django is None, 'needs Django')
+    def test_views(self):
+        from coffeepot.benchmarks.load import run
+        results = run(['small', 'template'], 10, 2, warmup=1)
+        self.assertEqual(results['small']['errors'], 0)
+        self.assertEqual(results['template']['errors'], 0)
@@ -0,0 +1,18 @@
+import unittest
+from coffeepot.benchmarks import Benchmark
+from coffeepot.benchmarks.runner import compare, measure
+from coffeepot.benchmarks.shapes import mixed_page
+
+
+class RunnerTestCase(unittest.TestCase):
+
+    def test_measure(self):
+        result = measure(Benchmark('mixed_page', lambda: mixed_page(5), lambda g: g.render()), repeat=1)
+        self.assertTrue(result['build_s'] > 0)
+        self.assertTrue(result['output_bytes'] > 0)
+
+    def test_compare(self):
+        baseline = {'results': {'a': {'build_s': 1.0, 'run_s': 1.0, 'peak_kb': 100}}}
+        current = {'results': {'a': {'build_s': 1.05, 'run_s': 1.5, 'peak_kb': None},
+                               'b': {'build_s': 9.0, 'run_s': 9.0, 'peak_kb': 900}}}
+        self.assertEqual(compare(baseline, current, 0.1), [('a', 'run_s', 1.0, 1.5)])
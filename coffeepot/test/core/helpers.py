@@ -0,0 +1,10 @@
+class Foreign(object):
+    '''
+    Something with a render() method that isn't a node, so the tree can't
+    follow it.
+    '''
+
+    value = 'foreign()'
+
+    def render(self):
+        return self.value
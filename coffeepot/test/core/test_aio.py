@@ -0,0 +1,81 @@
+import threading
+import unittest
+from coffeepot.jquery.lib import Generator
+from coffeepot.core.node import _Node, FunctionNode
+
+try:
+    import asyncio
+except ImportError:     # Python 2
+    asyncio = None
+
+
+class SleepyNode(_Node):
+    '''
+    Stands in for a template, it notes the thread it was rendered in and
+    waits at barrier for the others when there is one.
+    '''
+    cacheable = False
+    blocking = True
+
+    def __init__(self, script, barrier=None):
+        super(SleepyNode, self).__init__()
+        self.script = script
+        self.barrier = barrier
+        self.threads = []
+
+    def _generate(self, child, minify):
+        self.threads.append( threading.current_thread() )
+        if self.barrier is not None:
+            self.barrier.wait()
+        yield self.script
+
+
+@unittest.skipIf(asyncio is None, 'needs asyncio')
+class AsyncRenderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.g = Generator()
+        self.sleepy = []
+        for i in range(4):
+            f = self.g.add_function('f%d' % i)
+            f.add_element('#e%d' % i).hide()
+            self.sleepy.append( f.add_to_queue( SleepyNode('s%d()' % i) ) )
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def assertOffLoop(self, node):
+        self.assertTrue(node.threads)
+        for thread in node.threads:
+            self.assertFalse(thread is threading.current_thread())
+
+    def test_same_output_as_render(self):
+        result = self.loop.run_until_complete(self.g.arender(minify=True))
+        self.assertEqual(result, self.g.render(minify=True))
+
+    def test_blocking_children_run_concurrently(self):
+        # Rendered one after the other the first wait would time out
+        barrier = threading.Barrier(len(self.sleepy), timeout=5)
+        for node in self.sleepy:
+            node.barrier = barrier
+        self.loop.run_until_complete(self.g.arender())
+        for node in self.sleepy:
+            self.assertOffLoop(node)
+
+    def test_blocking_method_argument_leaves_the_loop(self):
+        g = Generator()
+        callback = FunctionNode()
+        sleepy = callback.add_to_queue( SleepyNode('s()') )
+        g.add_element('#a').click(callback)
+        result = self.loop.run_until_complete(g.arender())
+        self.assertOffLoop(sleepy)
+        self.assertEqual(result, g.render())
+
+    def test_blocking_lazy_build_leaves_the_loop(self):
+        g = Generator()
+        sleepy = SleepyNode('s()')
+        g.add_lazy(lambda: sleepy)
+        result = self.loop.run_until_complete(g.arender())
+        self.assertEqual(result, 's();')
+        self.assertOffLoop(sleepy)
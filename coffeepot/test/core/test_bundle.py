@@ -0,0 +1,93 @@
+import unittest
+from coffeepot.jquery.lib import Generator
+from coffeepot.core.bundle import Bundle, BASE64_DIGITS, track, vlq
+
+
+def decode(mappings):
+    '''
+    Returns {(line, column): (source, line, column)} from source map mappings.
+    '''
+    result = {}
+    state = [0, 0, 0, 0, 0]
+    for line, text in enumerate(mappings.split(';')):
+        state[0] = 0
+        for segment in filter(None, text.split(',')):
+            values = []
+            value = shift = 0
+            for c in segment:
+                digit = BASE64_DIGITS.index(c)
+                value += (digit & 31) << shift
+                shift += 5
+                if not digit & 32:
+                    values.append( -(value >> 1) if value & 1 else value >> 1 )
+                    value = shift = 0
+            for i, v in enumerate(values):
+                state[i] += v
+            result[(line, state[0])] = tuple(state[1:4])
+    return result
+
+
+def page(selector):
+    g = Generator()
+    g.add_function('shared').add_element('#a').hide()
+    g.add_script('lib()').idempotent = True
+    g.add_element(selector).show()
+    return g
+
+
+class BundleTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.bundle = Bundle()
+        self.bundle.add(page('#x'), 'one.js')
+        self.bundle.add(page('#y'), 'two.js')
+
+    def test_vlq(self):
+        self.assertEqual([vlq(v) for v in (0, 1, -1, 16, 123456)], ['A', 'C', 'D', 'gB', 'gkxH'])
+
+    def test_duplicates_are_left_out(self):
+        self.assertEqual(self.bundle.render(minify=True),
+                         'shared:function(){$("#a").hide()};lib();$("#x").show();$("#y").show();')
+        self.assertEqual(self.bundle.duplicates, 2)
+
+    def test_statements_are_kept(self):
+        bundle = Bundle()
+        for selector in ('#a', '#b'):
+            g = Generator()
+            g.add_script('counter++')
+            g.add_element(selector).show()
+            g.add_script('counter++')
+            g.add_function('f').add_script('x()')
+            g.add_function('f').add_script('x()')
+            bundle.add(g)
+        self.assertEqual(bundle.render(minify=True),
+                         'counter++;$("#a").show();counter++;f:function(){x()};f:function(){x()};'
+                         'counter++;$("#b").show();counter++;')
+        self.assertEqual(bundle.duplicates, 2)
+
+    def test_empty_statements(self):
+        g = Generator()
+        f = g.add_function('f')
+        f.add_script('a()')
+        f.add_if(False, None)
+        b = f.add_script('b()')
+        g.add_if(False, None)
+        bundle = Bundle()
+        bundle.add(g)
+        self.assertEqual(bundle.render(minify=True), 'f:function(){a();b()};')
+
+        text, spans = track(g, False)
+        start, end = [(s, e) for x, s, e in spans if x is b][0]
+        self.assertEqual(text[start:end], 'b()')
+
+    def test_source_map(self):
+        text, source_map = self.bundle.render_with_map(minify=True, file='page.js', url='page.js.map')
+        self.assertTrue(text.endswith('\n//# sourceMappingURL=page.js.map'))
+        self.assertEqual(source_map['sources'], ['one.js', 'two.js'])
+        self.assertEqual(source_map['sourcesContent'][1], page('#y').render())
+
+        mappings = decode(source_map['mappings'])
+        # $("#y") comes from line 3 of two.js, .show() right after it
+        self.assertEqual(mappings[(0, text.index('$("#y")'))], (1, 2, 0))
+        self.assertEqual(mappings[(0, text.index('show()', text.index('#y')))], (1, 2, 8))
+        self.assertEqual(mappings[(0, text.index('hide'))], (0, 0, 29))
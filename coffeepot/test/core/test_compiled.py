@@ -0,0 +1,38 @@
+import unittest
+from coffeepot.jquery.lib import Generator
+from coffeepot.core.helper import Placeholder
+from coffeepot.core.exception import PlaceholderError
+
+
+class CompiledScriptTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.g = Generator()
+        f = self.g.add_function('steve')
+        f.add_element('#bob').hide(Placeholder('speed'), t=Placeholder('msg'))
+        self.g.add_script('x(%s)' % Placeholder('target', raw=True))
+
+    def test_render_fills_placeholders(self):
+        script = self.g.compile()
+        self.assertEqual(script.render(speed=3, msg='hi', target='window'),
+                         'steve: function() { $("#bob").hide(3, { t:"hi" }); };\nx(window);')
+
+    def test_missing_value(self):
+        script = self.g.compile()
+        self.assertRaises(PlaceholderError, script.render, speed=3)
+
+    def test_placeholder_in_a_selector(self):
+        g = Generator()
+        g.add_element(Placeholder('id')).hide()
+        g.add_element('#row-%s' % Placeholder('row')).show()
+        for minify in (False, True):
+            script = g.compile(minify)
+            self.assertEqual(script.render(id='#foo', row=5),
+                             '$("#foo").hide();%s$("#row-5").show();' % ('' if minify else '\n'))
+            self.assertEqual(script.render(id='a"b', row='</x>'),
+                             '$("a\\"b").hide();%s$("#row-<\\/x>").show();' % ('' if minify else '\n'))
+
+    def test_raw_values_that_are_not_strings(self):
+        g = Generator()
+        g.add_script('x(%s)' % Placeholder('n', raw=True))
+        self.assertEqual(g.compile().render(n=3), 'x(3);')
@@ -0,0 +1,67 @@
+import unittest
+from coffeepot.jquery.lib import Generator
+from coffeepot.core.node import ScriptNode
+from coffeepot.core.diff import apply_changes
+from coffeepot.test.core.helpers import Foreign
+
+
+class CountingScript(ScriptNode):
+
+    generated = 0
+
+    def _generate(self, child, minify):
+        CountingScript.generated += 1
+        yield self.script
+
+
+class SnapshotTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.g = Generator()
+        self.f = self.g.add_function('steve')
+        self.e = self.f.add_element('#a')
+        self.e.hide()
+        self.g.add_to_queue( CountingScript('x()') )
+
+    def test_changed_span(self):
+        snapshot = self.g.snapshot()
+        old = snapshot.text
+        self.assertEqual(snapshot.update(), [])
+
+        self.e.show(3)
+        changes = snapshot.update()
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0].text, '$("#a").hide().show(3)')
+        self.assertEqual(old[changes[0].old_start:changes[0].old_end], '$("#a").hide()')
+        self.assertEqual(snapshot.text, self.g.render())
+        self.assertEqual(apply_changes(old, changes), snapshot.text)
+
+    def test_only_changed_nodes_are_generated(self):
+        snapshot = self.g.snapshot(minify=True)
+        CountingScript.generated = 0
+        self.f.add_script('y()')
+        snapshot.update()
+        self.assertEqual(CountingScript.generated, 0)
+        self.assertEqual(snapshot.text, self.g.render(minify=True))
+
+    def test_untracked_objects(self):
+        foreign = Foreign()
+        self.g.add_to_queue( foreign )
+        snapshot = self.g.snapshot()
+        foreign.value = 'b()'
+        changes = snapshot.update()
+        self.assertEqual([c.text for c in changes], ['b()'])
+        self.assertEqual(snapshot.text, self.g.render())
+
+    def test_callback(self):
+        cb = self.g.function()
+        cb.add_script('a()')
+        self.e.click(cb)
+        snapshot = self.g.snapshot()
+        old = snapshot.text
+
+        cb.add_script('b()')
+        changes = snapshot.update()
+        self.assertEqual([c.text for c in changes], ['click(function() { a(); b(); })'])
+        self.assertEqual(snapshot.text, self.g.render())
+        self.assertEqual(apply_changes(old, changes), snapshot.text)
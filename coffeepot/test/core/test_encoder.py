@@ -0,0 +1,75 @@
+import array
+import base64
+import unittest
+from coffeepot.core.encoder import JSEncoder
+from coffeepot.core.exception import CircularReferenceError
+from coffeepot.core.helper import arg_string_for_js, convertValue
+
+
+class Point(object):
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class EncoderTestCase(unittest.TestCase):
+
+    def test_nested_values(self):
+        self.assertEqual(arg_string_for_js('one', [1, None], opts={'a-b': [1.5]}),
+                         '"one", [1, null], { opts:{ "a-b":[1.5] } }')
+
+    def test_string_escaping(self):
+        self.assertEqual(convertValue('say "hi"</script>\n'), '"say \\"hi\\"<\\/script>\\n"')
+
+    def test_cycle(self):
+        value = {}
+        value['self'] = value
+        self.assertRaises(CircularReferenceError, convertValue, value)
+
+    def test_repeated_value_is_not_a_cycle(self):
+        shared = [1]
+        self.assertEqual(convertValue([shared, shared]), '[[1], [1]]')
+
+    def test_register(self):
+        class PointEncoder(JSEncoder):
+            pass
+        PointEncoder.register(Point, lambda encoder, value, write, encode: write('new Point(%d, %d)' % (value.x, value.y)))
+        self.assertEqual(PointEncoder().encode([Point(1, 2)]), '[new Point(1, 2)]')
+        # Registering on a sub class leaves the default table alone
+        self.assertEqual(JSEncoder().encode(Point(1, 2))[0], '"')
+
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TypedArrayTestCase(unittest.TestCase):
+
+    def decode(self, text, name):
+        prefix = 'new %s(Uint8Array.from(atob("' % name
+        self.assertTrue(text.startswith(prefix))
+        return base64.b64decode(text[len(prefix):text.index('"', len(prefix))])
+
+    def test_array(self):
+        value = array.array('d', [i * 0.5 for i in range(100)])
+        data = self.decode(convertValue(value), 'Float64Array')
+        self.assertEqual(array.array('d', data).tolist(), value.tolist())
+
+    def test_short_and_unsupported_arrays_are_lists(self):
+        self.assertEqual(convertValue(array.array('i', [1, 2])), '[1, 2]')
+        self.assertEqual(convertValue(array.array('u', u'x' * 100))[:10], '["x", "x",')
+
+    def test_memoryview(self):
+        value = memoryview(bytearray(b'x' * 100))
+        self.assertEqual(self.decode(convertValue(value), 'Uint8Array'), b'x' * 100)
+
+    @unittest.skipIf(numpy is None, 'needs NumPy')
+    def test_numpy(self):
+        value = numpy.arange(100, dtype='>i4')
+        data = self.decode(convertValue(value), 'Int32Array')
+        self.assertEqual(numpy.frombuffer(data, dtype='<i4').tolist(), list(range(100)))
+        self.assertEqual(convertValue(numpy.arange(100, dtype='i8'))[:18], 'new Float64Array(U')
+        self.assertEqual(convertValue(numpy.ones((2, 2))), '[[1.0, 1.0], [1.0, 1.0]]')
+        self.assertEqual(convertValue(numpy.int64(3)), '3')
@@ -0,0 +1,36 @@
+import sys
+import unittest
+from coffeepot.jquery.lib import Generator
+from coffeepot.core.helper import convertValue
+from coffeepot.benchmarks.depth import deep_callbacks
+from coffeepot.test.core.helpers import Foreign
+
+
+class EngineTestCase(unittest.TestCase):
+
+    def test_same_output(self):
+        g = Generator()
+        callback = g.function()
+        callback.add_element('#x').hide()
+        f = g.add_function('steve', indent=2)
+        f.add_element('#a').click(callback).show(opts=[callback])
+        g.add_to_queue( Foreign() )
+
+        self.assertEqual(g.render_iterative(), g.render())
+        self.assertEqual(g.render_iterative(minify=True), g.render(minify=True))
+        self.assertTrue('click(function(){$("#x").hide()})' in g.render_iterative(minify=True))
+        # Nothing is left in the cache of the uncacheable nodes
+        self.assertEqual(g._rendered, None)
+
+    def test_deeper_than_the_recursion_limit(self):
+        depth = sys.getrecursionlimit()
+        text = deep_callbacks(depth).render_iterative()
+        self.assertTrue(text.startswith('function() { $("#level-%d").click(' % (depth - 1)))
+        self.assertEqual(text.count('.click('), depth)
+
+    def test_deep_data(self):
+        value = []
+        for i in range(sys.getrecursionlimit() * 2):
+            value = [{'a': value}]
+        self.assertEqual(len(convertValue(value)), len('[{ a:') * 2 * sys.getrecursionlimit() + 2
+                         + len(' }]') * 2 * sys.getrecursionlimit())
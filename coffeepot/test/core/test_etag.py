@@ -0,0 +1,88 @@
+import unittest
+from coffeepot.jquery.lib import Generator
+from coffeepot.core.node import accepts_gzip, cache_stats, etag_matches, _content_etag
+
+try:
+    import django
+except ImportError:
+    django = None
+
+
+class FakeRequest(object):
+    def __init__(self, **meta):
+        self.META = meta
+
+
+class ETagTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.g = Generator()
+        self.s = self.g.add_script('x()')
+
+    def test_etag_follows_content(self):
+        etag = self.g.etag()
+        self.assertTrue(etag.startswith('"') and etag.endswith('"'))
+        other = Generator()
+        other.add_script('x()')
+        self.assertEqual(other.etag(), etag)
+        self.s.script = 'y()'
+        self.assertNotEqual(self.g.etag(), etag)
+
+    def test_cached_etag_does_not_render(self):
+        self.assertEqual(self.g.cached_etag(), None)
+        etag = self.g.etag()
+        cache_stats.reset()
+        cache_stats.enable()
+        try:
+            self.assertEqual(self.g.cached_etag(), etag)
+        finally:
+            cache_stats.disable()
+        self.assertEqual(cache_stats.misses + cache_stats.hits, 0)
+
+    def test_etag_matches(self):
+        self.assertTrue(etag_matches('"a", W/"b"', '"b"'))
+        self.assertTrue(etag_matches('*', '"b"'))
+        self.assertFalse(etag_matches('"a"', '"b"'))
+        self.assertFalse(etag_matches(None, '"b"'))
+
+    def test_accepts_gzip(self):
+        self.assertTrue(accepts_gzip('gzip, deflate, br'))
+        self.assertTrue(accepts_gzip('deflate;q=1.0, GZIP;q=0.5'))
+        self.assertTrue(accepts_gzip('*'))
+        self.assertFalse(accepts_gzip('gzip;q=0, deflate'))
+        self.assertFalse(accepts_gzip('gzip; q=0.000'))
+        self.assertFalse(accepts_gzip('*, gzip;q=0'))
+        self.assertFalse(accepts_gzip('identity'))
+        self.assertFalse(accepts_gzip(''))
+        self.assertFalse(accepts_gzip(None))
+
+
+@unittest.skipIf(django is None, 'needs Django')
+class ResponseETagTestCase(unittest.TestCase):
+
+    def setUp(self):
+        from coffeepot.benchmarks.load import configure
+        configure()
+        versions = iter(['v1()', 'v2()', 'v3()', 'v4()'])
+        self.g = Generator()
+        # Not memoized, every build gives new output
+        self.g.add_lazy(lambda: self.g.script(next(versions)))
+
+    def test_etag_is_the_hash_of_the_body(self):
+        response = self.g.render_to_response()
+        self.assertEqual(response.content, b'v1();')
+        self.assertEqual(response['ETag'], _content_etag('v1();'))
+
+    def test_compress_needs_a_request_that_takes_gzip(self):
+        for request in (None, FakeRequest(HTTP_ACCEPT_ENCODING='gzip;q=0, deflate')):
+            response = self.g.render_to_response(compress=True, request=request)
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertTrue(response.content.startswith(b'v'))
+            self.assertEqual(response['ETag'], _content_etag(response.content.decode('ascii')))
+
+    def test_compressed_body_matches_its_etag(self):
+        import gzip, io
+        response = self.g.render_to_response(compress=True, request=FakeRequest(HTTP_ACCEPT_ENCODING='gzip'))
+        body = gzip.GzipFile(fileobj=io.BytesIO(response.content)).read()
+        self.assertEqual(body, b'v1();')
+        self.assertEqual(response['ETag'], _content_etag('v1();')[:-1] + '-gzip"')
@@ -0,0 +1,53 @@
+import unittest
+from coffeepot.jquery.lib import Generator
+from coffeepot.core.flat import FlatGenerator
+from coffeepot.core.node import FunctionNode, ScriptNode
+
+
+def build(g):
+    callback = g.function()
+    callback.add_element('#x').hide()
+    f = g.add_function('steve', indent=2)
+    e = f.add_element('#a')
+    f.add_script('y()')
+    # Added to after a sibling, must still come first
+    e.hide(3, t=2).click(callback)
+    f.add_function('inner').add_element('#b').show(opts={'a': [1]})
+    g.add_element('#empty')
+    g.add_script('x()')
+    g.add_to_queue( ScriptNode('z()') )
+    return g
+
+
+class FlatGeneratorTestCase(unittest.TestCase):
+
+    def test_same_output_as_nodes(self):
+        nodes = build(Generator())
+        flat = build(FlatGenerator())
+        self.assertEqual(flat.render(), nodes.render())
+        self.assertEqual(flat.render(minify=True), nodes.render(minify=True))
+        self.assertTrue('click(function(){$("#x").hide()})' in flat.render(minify=True))
+
+    def test_cache(self):
+        g = FlatGenerator()
+        g.add_script('x()')
+        self.assertEqual(g.render(), 'x();')
+        g.add_element('#a').add_method(name='show')
+        self.assertEqual(g.render(), 'x();\n$("#a").show();')
+
+    def test_foreign_nodes_changed_after_render(self):
+        flats, trees = FlatGenerator(), Generator()
+        for g in (flats, trees):
+            fn = FunctionNode()
+            g.add_to_queue( fn )
+            callback = FunctionNode()
+            g.add_element('#a').click(callback)
+            g.render()
+            fn.add_script('late()')
+            callback.add_script('clicked()')
+        self.assertEqual(flats.render(), trees.render())
+        self.assertTrue('function() { late(); }' in flats.render())
+        self.assertTrue('clicked()' in flats.render())
+
+    def test_unknown_method(self):
+        self.assertRaises(AttributeError, getattr, FlatGenerator().add_element('#a'), 'nope')
@@ -0,0 +1,73 @@
+import threading
+import unittest
+from coffeepot.jquery.lib import Generator
+from coffeepot.core.node import cache_stats
+
+
+class ForkTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.base = Generator()
+        f = self.base.add_function('steve')
+        f.add_element('#a').hide()
+        self.base.add_script('x()')
+        self.text = self.base.render()
+
+    def test_fork_shares_until_changed(self):
+        fork = self.base.fork()
+        self.assertTrue(fork.queue is self.base.queue)
+        self.assertEqual(fork.render(), self.text)
+
+        fork.add_script('y()')
+        self.assertEqual(fork.render(), self.text[:-1] + ';\ny();')
+        self.assertEqual(self.base.render(), self.text)
+        self.assertEqual(len(self.base.queue), 2)
+
+    def test_fork_child(self):
+        fork = self.base.fork()
+        function = fork.fork_child(0)
+        function.add_element('#b').show()
+
+        cache_stats.reset()
+        cache_stats.enable()
+        try:
+            text = fork.render()
+        finally:
+            cache_stats.disable()
+        self.assertEqual(text, 'steve: function() { $("#a").hide(); $("#b").show(); };\nx();')
+        # The shared element chain comes from the base's cache, scripts
+        # aren't cached at all
+        self.assertEqual(cache_stats.hits, 1)
+        self.assertEqual(self.base.render(), self.text)
+        self.assertEqual(len(self.base.queue[0].queue), 1)
+
+    def test_base_changes_reach_forks(self):
+        fork = self.base.fork()
+        fork.fork_child(0).add_script('z()')
+        fork.render()
+        self.base.queue[1].script = 'w()'
+        self.assertTrue(fork.render().endswith('w();'))
+
+    def test_stale_base_changes_reach_forks(self):
+        fork = self.base.fork()
+        self.base.queue[1].script = 'w()'
+        self.assertTrue(fork.render().endswith('w();'))
+        # The base is still stale (not rendered since), the fork is not
+        self.base.queue[1].script = 'v()'
+        self.assertTrue(fork.render().endswith('v();'))
+
+    def test_threads(self):
+        results = []
+
+        def work(i):
+            fork = self.base.fork()
+            fork.add_script('user(%d)' % i)
+            results.append( fork.render() == self.text[:-1] + ';\nuser(%d);' % i )
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, [True] * 20)
+        self.assertEqual(self.base.render(), self.text)
@@ -0,0 +1,54 @@
+import array
+import unittest
+from coffeepot.jquery.lib import Generator
+from coffeepot.core.helper import Placeholder
+from coffeepot.core.exception import IRError
+from coffeepot.test.core.helpers import Foreign
+
+
+class IRTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.g = Generator()
+        callback = self.g.function()
+        callback.add_element('#x').hide()
+        f = self.g.add_function('steve', indent=2)
+        f.add_element('#bob').hide(3, {'a': [1, (2, 3)]}, t=Placeholder('msg')).click(callback)
+        self.g.add_script('x()')
+
+    def test_round_trip(self):
+        loaded = Generator.load(self.g.dump())
+        self.assertTrue(isinstance(loaded, Generator))
+        self.assertEqual(loaded.render(), self.g.render())
+        self.assertEqual(loaded.render(minify=True), self.g.render(minify=True))
+        self.assertEqual(loaded.compile().render(msg='hi'), self.g.compile().render(msg='hi'))
+
+    def test_loaded_tree_can_be_changed(self):
+        loaded = Generator.load(self.g.dump())
+        loaded.render()
+        loaded.queue[0].add_element('#new').show()
+        self.assertTrue(loaded.render().endswith('$("#new").show(); };\nx();'))
+
+    def test_each(self):
+        each = self.g.add_each([{'id': 1, 'label': 'One'}, {'id': 2, 'label': 'Two'}], '#row-%(id)s')
+        each.html(each.field('label')).css('width', each.field()).show()
+        loaded = Generator.load(self.g.dump())
+        self.assertEqual(loaded.render(), self.g.render())
+        self.assertEqual(loaded.render(minify=True), self.g.render(minify=True))
+
+    def test_buffers(self):
+        e = self.g.add_element('#chart')
+        long_one = array.array('d', [i / 4.0 for i in range(100)])
+        e.add_method(array.array('i', [1, 2, 3]), long_one, name='plot')
+        e.add_method(memoryview(bytearray(range(100))), memoryview(b'ab'), name='plot')
+        loaded = Generator.load(self.g.dump())
+        self.assertEqual(loaded.render(), self.g.render())
+        self.assertEqual(loaded.render(minify=True), self.g.render(minify=True))
+        args = loaded.queue[-1].queue[0].args
+        self.assertEqual(args[0], array.array('i', [1, 2, 3]))
+        self.assertEqual(args[1], long_one)
+
+    def test_errors(self):
+        self.g.add_to_queue( Foreign() )
+        self.assertRaises(IRError, self.g.dump)
+        self.assertRaises(IRError, Generator.load, b'nonsense')
@@ -0,0 +1,75 @@
+import unittest
+from coffeepot.jquery.lib import Generator
+from coffeepot.core.diff import apply_changes
+
+
+class LazyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.g = Generator()
+        self.g.add_script('x()')
+        self.calls = 0
+
+    def build(self):
+        self.calls += 1
+        f = self.g.function('menu')
+        f.add_element('#menu').show()
+        return f
+
+    def test_built_on_render(self):
+        self.g.add_lazy(self.build)
+        self.assertEqual(self.calls, 0)
+        self.assertEqual(self.g.render(), 'x();\nmenu: function() { $("#menu").show(); };')
+        self.g.render()
+        self.assertEqual(self.calls, 2)
+
+    def test_memoize(self):
+        lazy = self.g.add_lazy(self.build, memoize=True)
+        self.g.render()
+        self.assertEqual(self.g.render(minify=True), 'x();menu:function(){$("#menu").show()};')
+        self.assertEqual(self.calls, 1)
+        lazy.built().add_script('y()')
+        self.assertTrue(self.g.render().endswith('y(); };'))
+        lazy.reset()
+        self.g.render()
+        self.assertEqual(self.calls, 2)
+
+    def test_if(self):
+        show = []
+        self.g.add_if(lambda: show, self.build)
+        self.assertEqual(self.g.render(), 'x();')
+        self.assertEqual(self.calls, 0)
+        show.append( True )
+        self.assertTrue(self.g.render().endswith('$("#menu").show(); };'))
+        self.assertEqual(self.calls, 1)
+
+    def test_false_if_has_no_separator(self):
+        f = self.g.add_function('f')
+        f.add_if(False, self.build)
+        self.assertEqual(self.g.render(), 'x();\nf: function() { };')
+        f.add_script('a()')
+        f.add_if(False, self.build)
+        f.add_script('b()')
+        self.g.add_if(False, self.build)
+        for minify in (False, True):
+            self.g.clear_cache()
+            text = self.g.render(minify)
+            self.assertEqual("".join(self.g.iter_render(minify)), text)
+        self.assertEqual(text, 'x();f:function(){a();b()};')
+        self.assertEqual(self.g.render(), 'x();\nf: function() { a(); b(); };')
+
+    def test_snapshot(self):
+        show = []
+        self.g.add_if(lambda: show, self.build)
+        snapshot = self.g.snapshot()
+        old = snapshot.text
+        show.append( True )
+        changes = snapshot.update()
+        # The separator before the menu comes with it, so the generator
+        # around it is the change
+        self.assertEqual([c.text for c in changes], ['x();\nmenu: function() { $("#menu").show(); };'])
+        self.assertEqual(apply_changes(old, changes), self.g.render())
+
+        show.pop()
+        old = snapshot.text
+        self.assertEqual(apply_changes(old, snapshot.update()), 'x();')
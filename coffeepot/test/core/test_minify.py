@@ -0,0 +1,34 @@
+import gzip
+import unittest
+from io import BytesIO
+from coffeepot.jquery.lib import Generator
+
+
+class MinifyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.g = Generator()
+        f = self.g.add_function('steve')
+        f.add_element('#bob').hide(3, t=2)
+        f.add_script('go()')
+        self.g.add_script('x()')
+
+    def test_minified_render(self):
+        self.assertEqual(self.g.render(minify=True), 'steve:function(){$("#bob").hide(3,{t:2});go()};x();')
+
+    def test_minified_callback(self):
+        callback = self.g.function()
+        callback.add_element('#b').hide(1, t=2)
+        self.g.add_element('#a').click(callback)
+        self.assertTrue(self.g.render(minify=True).endswith(';$("#a").click(function(){$("#b").hide(1,{t:2})});'))
+        self.assertTrue(self.g.render().endswith(';\n$("#a").click(function() { $("#b").hide(1, { t:2 }); });'))
+
+    def test_minify_on_generator(self):
+        self.g.minify = True
+        self.assertEqual(self.g.render(), self.g.render(minify=True))
+        self.assertNotEqual(self.g.render(), self.g.render(minify=False))
+
+    def test_render_gzip_is_cached(self):
+        data = self.g.render_gzip(minify=True)
+        self.assertTrue(data is self.g.render_gzip(minify=True))
+        self.assertEqual(gzip.GzipFile(fileobj=BytesIO(data)).read().decode('utf-8'), self.g.render(minify=True))
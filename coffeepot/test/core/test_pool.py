@@ -0,0 +1,44 @@
+import re
+import unittest
+from coffeepot.jquery.lib import Generator
+
+
+class PoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.g = Generator()
+        for i in range(5):
+            f = self.g.add_function('handler%d' % i)
+            callback = self.g.function()
+            callback.add_element('#results').html('loading /api/items/list')
+            f.add_element('#results').append('/api/items/list', {'cls': ['highlighted', i]}, done=callback)
+
+    def expand(self, pooled):
+        '''
+        Puts the literals back in place of the constants.
+        '''
+        text = pooled.text[pooled.text.index(';') + 1:].lstrip('\n')
+        for name, literal, uses in pooled.constants:
+            text = re.sub(re.escape(name) + '(?![0-9a-z])', lambda match: literal, text)
+        return text
+
+    def test_pooled(self):
+        for minify in (False, True):
+            pooled = self.g.render_pooled(minify=minify)
+            self.assertEqual(self.expand(pooled), self.g.render(minify))
+            self.assertEqual(pooled.saved, len(self.g.render(minify)) - len(pooled.text))
+            self.assertTrue(pooled.saved > 0)
+
+        pooled = self.g.render_pooled(minify=True)
+        self.assertTrue(pooled.text.startswith('var $k0="loading /api/items/list",$k1="#results",'))
+        self.assertEqual(pooled.constants[1], ('$k1', '"#results"', 10))
+
+    def test_names_dont_clash(self):
+        self.g.add_script('var $k0 = 1')
+        self.assertTrue(self.g.render_pooled().text.startswith('var $k_0 = '))
+
+    def test_nothing_to_pool(self):
+        g = Generator()
+        g.add_element('#a').html('once')
+        self.assertEqual(g.render_pooled().text, g.render())
+        self.assertEqual(g.render_pooled().saved, 0)
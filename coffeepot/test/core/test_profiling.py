@@ -0,0 +1,41 @@
+import unittest
+from coffeepot.jquery.lib import Generator
+from coffeepot.core import node
+from coffeepot.core.profiling import Profiler
+
+
+class ProfilerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.g = Generator()
+        f = self.g.add_function('steve')
+        f.add_element('#a').hide().show(3)
+        f.add_element('#b').hide()
+
+    def test_counts(self):
+        with Profiler() as profiler:
+            self.g.render()
+
+        self.assertEqual(profiler.classes['ElementNode'].count, 2)
+        self.assertEqual(profiler.methods['hide'].count, 2)
+        self.assertEqual(profiler.methods['show'].bytes, len('show(3)'))
+        function = profiler.classes['FunctionNode']
+        self.assertTrue(function.seconds >= function.own_seconds)
+        self.assertTrue('hide' in profiler.report(sort='count'))
+        self.assertRaises(ValueError, profiler.report, sort='nope')
+
+    def test_callbacks(self):
+        callback = node.FunctionNode()
+        callback.add_element('#c').hide()
+        self.g.add_element('#d').click(callback)
+        with Profiler() as profiler:
+            self.g.render()
+
+        self.assertEqual(profiler.classes['FunctionNode'].count, 2)
+        self.assertEqual(profiler.classes['ElementNode'].count, 4)
+        self.assertEqual(profiler.methods['click'].count, 1)
+
+    def test_hook_is_removed(self):
+        with Profiler():
+            pass
+        self.assertTrue(node._child_renderer is node._render_child)
@@ -0,0 +1,116 @@
+import unittest
+from coffeepot.jquery.lib import Generator
+from coffeepot.core.node import cache_stats, ElementNode
+
+
+class Upper(ElementNode):
+    '''
+    Only overrides _generate(), render() has to go through it.
+    '''
+    def _generate(self, child, minify):
+        for chunk in super(Upper, self)._generate(child, minify):
+            yield chunk.upper()
+
+
+class RenderCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.g = Generator()
+        self.f = self.g.add_function('steve')
+        self.e = self.f.add_element('#bob').hide(3, t=2)
+        self.s = self.g.add_script('x()')
+        self.g.render()
+        cache_stats.reset()
+        cache_stats.enable()
+
+    def tearDown(self):
+        cache_stats.disable()
+
+    def test_unchanged_tree_is_a_hit(self):
+        self.g.render()
+        self.assertEqual(cache_stats.hits, 1)
+        self.assertEqual(cache_stats.misses, 0)
+
+    def test_attribute_change_invalidates_parents(self):
+        self.s.script = 'y()'
+        self.assertTrue(self.g.render().endswith('y();'))
+        # Only the root is rendered again, scripts aren't cached at all
+        self.assertEqual(cache_stats.misses, 1)
+        self.assertEqual(cache_stats.hits, 1)
+
+    def test_add_method_invalidates_parents(self):
+        self.e.show()
+        self.assertEqual(self.g.render(), 'steve: function() { $("#bob").hide(3, { t:2 }).show(); };\nx();')
+
+    def test_shared_callback(self):
+        g = Generator()
+        cb = g.function()
+        cb.add_script('a()')
+        a = g.add_element('#a').click(cb)
+        b = g.add_element('#b').click(cb)
+        self.assertEqual(a.render(), '$("#a").click(function() { a(); })')
+        self.assertEqual(b.render(), '$("#b").click(function() { a(); })')
+
+        cb.add_script('b()')
+        self.assertEqual(a.render(), '$("#a").click(function() { a(); b(); })')
+        self.assertEqual(b.render(), '$("#b").click(function() { a(); b(); })')
+        self.assertEqual(g.render(), '$("#a").click(function() { a(); b(); });\n'
+                                     '$("#b").click(function() { a(); b(); });')
+
+    def test_node_in_two_generators(self):
+        f = Generator().function('shared')
+        one = Generator()
+        two = Generator()
+        one.add_to_queue( f )
+        two.add_to_queue( f )
+        self.assertEqual(one.render(), two.render())
+
+        f.add_script('x()')
+        self.assertEqual(one.render(), 'shared: function() { x(); };')
+        self.assertEqual(two.render(), 'shared: function() { x(); };')
+
+    def test_changes_before_a_render(self):
+        # The second change finds the nodes already stale and stops early
+        self.e.show()
+        self.e.fadeIn()
+        self.s.script = 'z()'
+        self.assertEqual(self.g.render(), 'steve: function() { $("#bob").hide(3, { t:2 }).show().fadeIn(); };\nz();')
+
+    def test_change_after_clear_cache(self):
+        # Clearing the cache below a cached node doesn't make it stale, so
+        # a change still reaches the root
+        self.f.clear_cache()
+        self.e.show()
+        self.assertEqual(self.g.render(), 'steve: function() { $("#bob").hide(3, { t:2 }).show(); };\nx();')
+
+    def test_new_nodes_are_not_invalidated(self):
+        g = Generator()
+        f = g.add_function()
+        version = f._version
+        f.add_element('#a').show()
+        f.add_script('x()')
+        self.assertEqual(f._version, version)
+        g.render()
+        f.add_script('y()')
+        self.assertNotEqual(f._version, version)
+
+    def test_own_change_after_a_change_below(self):
+        # The function is already stale from the chain below it, its own
+        # change must still count as one (Snapshot relies on it)
+        version = self.f._self_version
+        self.e.show()
+        self.assertEqual(self.f._self_version, version)
+        self.f.add_script('y()')
+        self.assertNotEqual(self.f._self_version, version)
+
+    def test_render_matches_streaming(self):
+        g = Generator()
+        g.add_function('f', indent=2).add_element('#a').show().hide()
+        g.add_function()
+        g.add_each(range(3), '#x%s', var='n').hide()
+        g.add_lazy(lambda: g.script('lazy()'))
+        g.add_to_queue( Upper('#up') ).show()
+        for minify in (False, True):
+            self.assertEqual(g.render(minify), "".join(g.iter_render(minify)))
+            g.clear_cache()
+        self.assertTrue(g.render().endswith('$("#UP").SHOW();'))
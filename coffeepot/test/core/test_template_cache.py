@@ -0,0 +1,99 @@
+import os
+import tempfile
+import time
+import unittest
+from coffeepot.core.node import TemplateCache, TemplateNode, Generator
+
+try:
+    import django
+except ImportError:
+    django = None
+
+
+class FakeOrigin(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeTemplate(object):
+    '''
+    Looks enough like a compiled Django template for the cache.
+    '''
+    def __init__(self, source, name=None):
+        self.source = source
+        self.origin = FakeOrigin(name)
+
+
+class ContextTemplate(object):
+    '''
+    Renders the context value 'name'.
+    '''
+    def render(self, context):
+        return 'hello(%s)' % context.get('name', 'nobody')
+
+
+class TemplateCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = TemplateCache(maxsize=2)
+
+    def test_source_hit(self):
+        first = self.cache.get_source('{{ a }}', FakeTemplate)
+        self.assertTrue(self.cache.get_source('{{ a }}', FakeTemplate) is first)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_lru_eviction(self):
+        a = self.cache.get_source('a', FakeTemplate)
+        self.cache.get_source('b', FakeTemplate)
+        self.cache.get_source('a', FakeTemplate)
+        self.cache.get_source('c', FakeTemplate)    # pushes out 'b'
+        self.assertTrue(self.cache.get_source('a', FakeTemplate) is a)
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+        self.assertEqual(len(self.cache), 2)
+
+    def test_path_mtime_invalidation(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            load = lambda p: FakeTemplate(open(p).read(), p)
+            first = self.cache.get_path(path, load)
+            self.assertTrue(self.cache.get_path(path, load) is first)
+
+            later = time.time() + 10
+            os.utime(path, (later, later))
+            self.assertFalse(self.cache.get_path(path, load) is first)
+            self.assertEqual(self.cache.stats()['invalidations'], 1)
+        finally:
+            os.remove(path)
+
+
+@unittest.skipIf(django is None, 'needs Django')
+class TemplateNodeTestCase(unittest.TestCase):
+
+    def test_minify_is_not_the_context(self):
+        g = Generator()
+        g.add_to_queue( TemplateNode(ContextTemplate(), {'name': 'bob'}) )
+        self.assertEqual(g.render(), 'hello(bob);')
+        self.assertEqual(g.render(minify=True), 'hello(bob);')
+        self.assertEqual("".join(g.iter_render(True)), 'hello(bob);')
+        self.assertEqual(TemplateNode(ContextTemplate()).render(True), 'hello(nobody)')
+
+    def test_context_as_first_argument(self):
+        from django.template import Context
+        self.assertEqual(TemplateNode(ContextTemplate()).render({'name': 'bob'}), 'hello(bob)')
+        self.assertEqual(TemplateNode(ContextTemplate()).render(Context({'name': 'al'})), 'hello(al)')
+        self.assertEqual("".join(TemplateNode(ContextTemplate()).iter_render({'name': 'jo'})), 'hello(jo)')
+
+    def test_path_or_source(self):
+        from django.template import TemplateDoesNotExist
+        from coffeepot.benchmarks.load import configure
+        configure()
+
+        # Without template tags, as the first argument this would be taken
+        # for a path
+        g = Generator()
+        g.add_to_queue( TemplateNode(source='init()') )
+        g.add_to_queue( TemplateNode(source='load("{{ url }}")', context={'url': '/a/'}) )
+        self.assertEqual(g.render(), 'init();\nload("/a/");')
+        self.assertRaises(TemplateDoesNotExist, TemplateNode, path='{missing}.js')
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# Seconds 'import coffeepot.jquery.lib' may take, measured inside a fresh
+# interpreter so the interpreter start up isn't counted.
+IMPORT_BUDGET = float(os.environ.get('COFFEEPOT_IMPORT_BUDGET', '0.05'))
+
+SCRIPT = '''
+import sys, time
+start = time.time()
+import coffeepot.jquery.lib
+print(time.time() - start)
+print('django' in sys.modules)
+print('coffeepot.jquery.methods' in sys.modules)
+'''
+
+
+class ImportTestCase(unittest.TestCase):
+
+    def run_import(self):
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = root + os.pathsep + env.get('PYTHONPATH', '')
+        output = subprocess.check_output([sys.executable, '-c', SCRIPT], env=env)
+        seconds, django_loaded, methods_loaded = output.decode('ascii').split()
+        return float(seconds), django_loaded == 'True', methods_loaded == 'True'
+
+    def test_import_budget(self):
+        # Best of three to keep a busy machine from failing the build
+        seconds = min([self.run_import()[0] for i in range(3)])
+        self.assertTrue(seconds < IMPORT_BUDGET,
+                        'import coffeepot.jquery.lib took %.3fs, the budget is %.3fs' % (seconds, IMPORT_BUDGET))
+
+    def test_django_is_not_imported(self):
+        self.assertFalse(self.run_import()[1])
+
+    def test_methods_are_not_loaded(self):
+        # The jQuery method descriptors are loaded on first use
+        self.assertFalse(self.run_import()[2])
@@ -0,0 +1,98 @@
+import unittest
+
+from coffeepot.core.exception import JSLibraryError
+from coffeepot.core.node import ElementNode, FunctionNode, _MethodNode, attach_methods, library_methods, methodList
+from coffeepot.jquery import spec
+from coffeepot.jquery.lib import Generator
+from coffeepot.jquery.methods import METHODS
+
+
+class SpecTestCase(unittest.TestCase):
+
+    def test_generated_file_is_current(self):
+        self.assertEqual(METHODS, spec.parse())
+
+    def test_descriptors(self):
+        self.assertEqual(spec.parse('hide number|string|object? string|function? function?'),
+                         {'hide': (0, 3, (('number', 'string', 'object'), ('string', 'function'), ('function',)))})
+        self.assertEqual(spec.parse('append content|function content*')['append'][:2], (1, None))
+        self.assertEqual(spec.parse('empty -   # no arguments'), {'empty': (0, 0, ())})
+
+    def test_bad_spec(self):
+        self.assertRaises(JSLibraryError, spec.parse, 'hide number? string')
+        self.assertRaises(JSLibraryError, spec.parse, 'append content* content')
+        self.assertRaises(JSLibraryError, spec.parse, 'hide strnig')
+        self.assertRaises(JSLibraryError, spec.parse, 'hide -\nhide -')
+        self.assertRaises(JSLibraryError, spec.parse, 'hide')
+
+    def test_every_entry_is_a_method(self):
+        # Nothing in the table may be hidden by a node attribute
+        e = ElementNode('#a')
+        for name in METHODS:
+            self.assertEqual(getattr(e, name).descriptor, METHODS[name], name)
+
+    def test_covers_old_methods(self):
+        for name in methodList:
+            self.assertTrue(name in METHODS, name)
+
+
+class MethodTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.g = Generator()
+
+    def test_chain(self):
+        self.g.add_element('#a').addClass('on').fadeTo(200, 0.5).closest('form').find('input').val('x')
+        self.assertEqual(self.g.render(), '$("#a").addClass("on").fadeTo(200, 0.5).closest("form").find("input").val("x");')
+
+    def test_same_output_as_add_method(self):
+        e = ElementNode('#a')
+        e.add_method(200, name='hide', easing='swing')
+        self.assertEqual(ElementNode('#a').hide(200, easing='swing').render(), e.render())
+        self.assertEqual(ElementNode('#a').hide(200, easing='swing').render(True), e.render(True))
+
+    def test_too_many_arguments(self):
+        e = self.g.add_element('#a')
+        self.assertRaises(JSLibraryError, e.eq, 1, 2)
+        self.assertRaises(JSLibraryError, e.empty, 1)
+        # Nothing was queued
+        self.assertEqual(e.queue, [])
+        # Repeating arguments have no maximum
+        e.append('<p>', '<p>', '<p>', '<p>', '<p>')
+
+    def test_method_node(self):
+        f = FunctionNode()
+        e = ElementNode('#a').click(f)
+        node = e.queue[0]
+        self.assertTrue(isinstance(node, _MethodNode))
+        self.assertEqual((node.name, node.args, node.kwargs), ('click', (f,), {}))
+        self.assertTrue(f.parent is node)
+        self.assertTrue(node.parent is e)
+
+    def test_cache(self):
+        e = self.g.add_element('#a').show()
+        self.assertEqual(self.g.render(), '$("#a").show();')
+        e.hide()
+        self.assertEqual(self.g.render(), '$("#a").show().hide();')
+
+    def test_descriptor(self):
+        ElementNode('#a').slice(1)
+        self.assertEqual(ElementNode.__dict__['slice'].descriptor, (1, 2, (('number',), ('number',))))
+
+    def test_unknown(self):
+        e = ElementNode('#a')
+        self.assertRaises(AttributeError, getattr, e, 'fadeInn')
+        self.assertRaises(AttributeError, getattr, e, '_private')
+        self.assertEqual(library_methods('prototype'), None)
+
+    def test_attach_methods(self):
+        attach_methods('jquery')
+        e = ElementNode('#a')
+        for name in METHODS:
+            self.assertTrue(name in ElementNode.__dict__, name)
+        # Node attributes with the name of a jQuery method aren't in the
+        # table, and are left alone
+        self.assertEqual(e.parent, None)
+        self.assertEqual(e.queue, [])
+        e.add_method('fx', name='queue')
+        self.assertEqual(e.render(), '$("#a").queue("fx")')
@@ -1,4 +1,9 @@
 import unittest
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
 from coffeepot.jquery.lib import Generator
 
 
@@ -32,6 +37,35 @@ class MyTestCase(unittest.TestCase):
         e = f.add_element(self.elementName).hide(3, t=2)
         self.assertEqual(self.g.render(), '%s: function() { $("%s").hide(3, { t:2 }); };' % (self.functionName, self.elementName) )
 
+    # STREAMING TESTS
+    def test_iter_render_matches_render(self):
+        self.g.reset_queue()
+        f = self.g.add_function(self.functionName)
+        f.add_element(self.elementName).hide(3, t=2)
+        self.g.add_script('x()')
+        self.assertEqual(''.join(self.g.iter_render()), self.g.render())
+
+    def test_render_to(self):
+        self.g.reset_queue()
+        f = self.g.add_function(self.functionName)
+        f.add_element(self.elementName).hide(3, t=2)
+        out = StringIO()
+        self.g.render_to(out, chunk_size=4)
+        self.assertEqual(out.getvalue(), self.g.render())
+
+    # BULK TESTS
+    def test_each(self):
+        self.g.reset_queue()
+        each = self.g.add_each([{'id': 1, 'label': 'One'}, {'id': 2, 'label': 'Two'}], '#row-%(id)s')
+        each.html(each.field('label')).show()
+        self.assertEqual(self.g.render(), '$.each([{ id:1, label:"One" }, { id:2, label:"Two" }], '
+                         'function(i, row) { $("#row-" + row.id).html(row.label).show(); });')
+
+    def test_each_minified(self):
+        self.g.reset_queue()
+        self.g.add_each(range(3), '#x%s .a', var='n').hide()
+        self.assertEqual(self.g.render(minify=True), '$.each([0,1,2],function(i,n){$("#x"+n+" .a").hide()});')
+
 
 '''
 from coffeepot.jquery.lib import Generator
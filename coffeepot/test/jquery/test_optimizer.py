@@ -0,0 +1,41 @@
+import unittest
+from coffeepot.jquery.lib import Generator
+
+
+class OptimizerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.g = Generator()
+
+    def test_merge_consecutive_chains(self):
+        self.g.add_element('#a').hide()
+        self.g.add_element('#a').show()
+        self.assertEqual(self.g.render(), '$("#a").hide();\n$("#a").show();')
+        self.assertEqual(self.g.optimize().render(), '$("#a").hide().show();')
+
+    def test_hoist_repeated_selector_in_function(self):
+        f = self.g.add_function('steve')
+        f.add_element('#a').hide()
+        f.add_element('#b').show()
+        f.add_element('#a').show()
+        self.assertEqual(self.g.render(),
+                         'steve: function() { $("#a").hide(); $("#b").show(); $("#a").show(); };')
+        self.assertEqual(self.g.optimize().render(),
+                         'steve: function() { var $cp0 = $("#a"); $cp0.hide(); $("#b").show(); $cp0.show(); };')
+
+    def test_dom_changes_end_the_cache(self):
+        f = self.g.add_function('steve')
+        f.add_element('#a').append('<p>')
+        f.add_element('#a').hide()
+        f.add_script('go()')
+        f.add_element('#b').hide()
+        f.add_element('#b').hide()
+        self.assertEqual(self.g.optimize().render(), self.g.render().replace('$("#b").hide(); $("#b").hide()', '$("#b").hide().hide()'))
+
+    def test_original_is_unchanged(self):
+        self.g.add_element('#a').hide()
+        self.g.add_element('#a').show()
+        before = self.g.render()
+        self.g.optimize()
+        self.assertEqual(self.g.render(), before)
+        self.assertEqual(len(self.g.queue), 2)
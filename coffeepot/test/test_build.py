@@ -0,0 +1,70 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from coffeepot import build
+from coffeepot.jquery.lib import Generator
+
+
+def hello():
+    g = Generator()
+    g.add_element('#hello').show()
+    return g
+
+
+class FakeEntryPoint(object):
+    name = 'test_entry'
+
+    def load(self):
+        return hello
+
+
+class BuildTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.input = os.path.join(self.dir, 'input.txt')
+        with open(self.input, 'w') as f:
+            f.write('one')
+        build.register('test_hello', inputs=[self.input])(hello)
+        self.out = os.path.join(self.dir, 'out')
+
+    def tearDown(self):
+        build.FACTORIES.pop('test_hello', None)
+        build.FACTORIES.pop('test_entry', None)
+        shutil.rmtree(self.dir)
+
+    def test_build_writes_hashed_file_and_manifest(self):
+        built, skipped, errors = build.build(self.out, ['test_hello'], jobs=1)
+        self.assertEqual((built, skipped, errors), (['test_hello'], [], {}))
+
+        with open(os.path.join(self.out, build.MANIFEST)) as f:
+            entry = json.load(f)['test_hello']
+        self.assertEqual(entry['file'], 'test_hello.%s.js' % entry['hash'])
+        with open(os.path.join(self.out, entry['file'])) as f:
+            self.assertEqual(f.read(), hello().render())
+
+    def test_unchanged_inputs_are_skipped(self):
+        build.build(self.out, ['test_hello'], jobs=1)
+        self.assertEqual(build.build(self.out, ['test_hello'], jobs=1)[1], ['test_hello'])
+
+        with open(self.input, 'w') as f:
+            f.write('two')
+        self.assertEqual(build.build(self.out, ['test_hello'], jobs=1)[0], ['test_hello'])
+
+    def test_entry_point_factory_in_a_fresh_worker(self):
+        entry_points = build._entry_points
+        build._entry_points = lambda: [FakeEntryPoint()]
+        try:
+            build.discover()
+            factory = build.FACTORIES.pop('test_entry')
+            # A spawned worker starts without the parent's registry, the
+            # job tells it where the factory came from
+            os.makedirs(self.out)
+            job = ('test_entry', factory.module, factory.entry_point, self.out, False)
+            name, filename, content_hash, error = build.build_one(job)
+        finally:
+            build._entry_points = entry_points
+        self.assertEqual(error, None)
+        self.assertTrue(os.path.exists(os.path.join(self.out, filename)))
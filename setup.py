@@ -30,5 +30,7 @@ JavaScript generator that can be used in web based frameworks.  Contains tools f
       ],
       entry_points="""
       # -*- Entry points: -*-
+      [console_scripts]
+      coffeepot-build = coffeepot.build:main
       """,
       )